@@ -1,11 +1,16 @@
-import gfootball.env as football_env
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import CheckpointCallback, BaseCallback
-from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import VecNormalize
 import gym
 import os
 
+from ambientes import monitorar
+from avaliacao_assincrona import AsyncEvalCallback
+from checkpoint_assincrono import CheckpointAssincrono
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from vec_env_paralelo import criar_vec_env
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
 # Adaptador simples apenas para converter formatos, sem mexer na recompensa
 class GfootballAdapter(gym.Env):
     def __init__(self, env):
@@ -25,26 +30,6 @@ class GfootballAdapter(gym.Env):
     def step(self, action):
         return self.env.step(action)
 
-# Callback simples para logar gols no console
-class GoalCounter(BaseCallback):
-    def __init__(self):
-        super().__init__()
-        self.goals = 0
-
-    def _on_step(self) -> bool:
-        # Verifica se houve recompensa positiva (gol) nos infos
-        # O gfootball com rewards='scoring' retorna reward=1 no gol
-        rewards = self.locals.get('rewards', [])
-        if rewards is not None:
-             # Soma quantos ambientes tiveram reward > 0 (gol) neste step
-             self.goals += sum(1 for r in rewards if r > 0)
-        return True
-
-    def _on_rollout_end(self) -> None:
-        self.logger.record('rollout/goals', self.goals)
-        print(f"📊 Gols neste Rollout: {self.goals}")
-        self.goals = 0
-
 if __name__ == "__main__":
     log_dir = os.path.expanduser("~/gfootball_logs/FASE1_CORRIGIDO")
     models_dir = f"{log_dir}/models"
@@ -55,6 +40,8 @@ if __name__ == "__main__":
     print("=" * 80 + "\n")
 
     def make_env():
+        # Importado aqui: com GFOOTBALL_MOCK=1 o script roda sem o jogo instalado
+        import gfootball.env as football_env
         # rewards='scoring' já garante +1 no gol e 0 no resto
         env = football_env.create_environment(
             env_name='academy_empty_goal_close',
@@ -64,11 +51,13 @@ if __name__ == "__main__":
             render=False
         )
         env = GfootballAdapter(env)
-        env = Monitor(env) # Monitora recompensas puras
+        env = monitorar(env) # Monitora recompensas puras
         return env
 
-    # Criação dos ambientes
-    vec_env = DummyVecEnv([make_env for _ in range(8)])
+    # Criação dos ambientes (um processo por núcleo, ver vec_env_paralelo.py)
+    # copiar_obs=False: o VecNormalize logo abaixo já copia, lemos a memória compartilhada direto
+    # VecSanitize troca NaN/inf do lote inteiro de uma vez (float32, sem alocar por passo)
+    vec_env = VecSanitize(criar_vec_env(make_env, n_envs=8, copiar_obs=False))
     
     # IMPORTANTE: Normalização das observações e recompensas
     # Isso ajuda a rede neural a entender os dados do simple115
@@ -92,8 +81,12 @@ if __name__ == "__main__":
     )
 
     callbacks = [
-        CheckpointCallback(save_freq=50_000, save_path=models_dir, name_prefix='ckpt'),
-        GoalCounter(),
+        CheckpointAssincrono(save_freq=50_000, pasta=models_dir, prefixo='ckpt'),
+        AsyncEvalCallback(eval_freq=50_000, pasta=f"{log_dir}/melhor_modelo", cenario='academy_empty_goal_close'),
+        EpisodeMetrics(verbose=1),
+        NonFiniteCounter(),
+        # GFOOTBALL_PERFIL=1: tempo de cada etapa no TensorBoard + log_dir/perfil.json
+        *perfil_opcional(log_dir),
     ]
 
     print("\n🎯 TREINANDO...")
@@ -1,11 +1,16 @@
-import gfootball.env as football_env
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import CheckpointCallback, BaseCallback
-from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import VecNormalize
 import gym
 import os
 
+from ambientes import monitorar
+from avaliacao_assincrona import AsyncEvalCallback
+from checkpoint_assincrono import CheckpointAssincrono
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from vec_env_paralelo import criar_vec_env
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
 # === CONFIGURAÇÕES ===
 # Onde está o modelo da Fase 1 (o "cérebro" inteligente)
 # IMPORTANTE: Confirme se o nome do arquivo zip está correto na sua pasta
@@ -36,21 +41,10 @@ class GfootballAdapter(gym.Env):
     def reset(self): return self.env.reset()
     def step(self, action): return self.env.step(action)
 
-# === CONTADOR DE GOLS ===
-class GoalCounter(BaseCallback):
-    def __init__(self):
-        super().__init__()
-        self.goals = 0
-    def _on_step(self) -> bool:
-        rewards = self.locals.get('rewards', [])
-        if rewards is not None: self.goals += sum(1 for r in rewards if r > 0)
-        return True
-    def _on_rollout_end(self) -> None:
-        self.logger.record('rollout/goals', self.goals)
-        self.goals = 0
-
 # === CRIAÇÃO DO AMBIENTE ===
 def make_env():
+    # Importado aqui: com GFOOTBALL_MOCK=1 o script roda sem o jogo instalado
+    import gfootball.env as football_env
     env = football_env.create_environment(
         env_name='academy_run_to_score_with_keeper', 
         stacked=True,
@@ -60,12 +54,12 @@ def make_env():
         render=False
     )
     env = GfootballAdapter(env)
-    env = Monitor(env)
+    env = monitorar(env)
     return env
 
 if __name__ == "__main__":
     # 1. Cria 8 ambientes paralelos
-    vec_env = DummyVecEnv([make_env for _ in range(8)])
+    vec_env = VecSanitize(criar_vec_env(make_env, n_envs=8, copiar_obs=False))
     
     # 2. Cria nova normalização
     # Não carregamos a normalização antiga (pkl) porque o campo/distâncias mudaram.
@@ -86,8 +80,12 @@ if __name__ == "__main__":
     model.tensorboard_log = log_dir
 
     callbacks = [
-        CheckpointCallback(save_freq=50_000, save_path=models_dir, name_prefix='ckpt_fase2'),
-        GoalCounter(),
+        CheckpointAssincrono(save_freq=50_000, pasta=models_dir, prefixo='ckpt_fase2'),
+        AsyncEvalCallback(eval_freq=50_000, pasta=f"{log_dir}/melhor_modelo", cenario='academy_run_to_score_with_keeper'),
+        EpisodeMetrics(),
+        NonFiniteCounter(),
+        # GFOOTBALL_PERFIL=1: tempo de cada etapa no TensorBoard + log_dir/perfil.json
+        *perfil_opcional(log_dir),
     ]
 
     print("\n🥊 TREINANDO CONTRA O GOLEIRO (1 Milhão de steps)...")
@@ -1,11 +1,17 @@
-import gfootball.env as football_env
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import CheckpointCallback, BaseCallback
-from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import VecNormalize
 import gym
 import os
 
+from ambientes import monitorar
+from avaliacao_assincrona import AsyncEvalCallback
+from checkpoint_assincrono import CheckpointAssincrono
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from recompensas import ShapingLogger, VecRewardShaping
+from vec_env_paralelo import criar_vec_env
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
 # === CONFIGURAÇÕES ===
 # Carregamos o modelo "Driblador" da Fase 3
 # Ajuste o caminho para onde está o FASE3_FINAL no seu servidor
@@ -16,6 +22,16 @@ log_dir = os.path.expanduser("~/gfootball_logs/FASE4_PASSE")
 models_dir = f"{log_dir}/models"
 os.makedirs(models_dir, exist_ok=True)
 
+# === MOLDAGEM DA RECOMPENSA (recompensas.py) ===
+# Pesos pequenos: um gol (1.0) e os checkpoints do motor continuam mandando.
+# O passe_ao_vazio pune o passe "para farmar" que termina com o rival na bola.
+TERMOS_RECOMPENSA = {
+    'posse': 0.001,
+    'progressao': 0.2,
+    'pressao': 0.05,
+    'passe_ao_vazio': 0.05,
+}
+
 print("\n" + "=" * 80)
 print("🚀 FASE 4 - O JOGO COLETIVO (Passe e Chute) 🚀")
 print("   Objetivo: Aprender que passar a bola facilita o gol.")
@@ -35,23 +51,10 @@ class GfootballAdapter(gym.Env):
     def reset(self): return self.env.reset()
     def step(self, action): return self.env.step(action)
 
-# === CONTADOR DE GOLS ===
-class GoalCounter(BaseCallback):
-    def __init__(self):
-        super().__init__()
-        self.goals = 0
-    def _on_step(self) -> bool:
-        rewards = self.locals.get('rewards', [])
-        if rewards is not None: 
-            # Soma gol se recompensa for alta (ignora checkpoints)
-            self.goals += sum(1 for r in rewards if r > 0.8)
-        return True
-    def _on_rollout_end(self) -> None:
-        self.logger.record('rollout/goals', self.goals)
-        self.goals = 0
-
 # === AMBIENTE ===
 def make_env():
+    # Importado aqui: com GFOOTBALL_MOCK=1 o script roda sem o jogo instalado
+    import gfootball.env as football_env
     env = football_env.create_environment(
         # CENÁRIO NOVO: Focado em tocar a bola
         env_name='academy_pass_and_shoot_with_keeper', 
@@ -61,11 +64,12 @@ def make_env():
         render=False
     )
     env = GfootballAdapter(env)
-    env = Monitor(env)
+    env = monitorar(env)
     return env
 
 if __name__ == "__main__":
-    vec_env = DummyVecEnv([make_env for _ in range(8)])
+    vec_env = VecSanitize(criar_vec_env(make_env, n_envs=8, copiar_obs=False))
+    vec_env = VecRewardShaping(vec_env, TERMOS_RECOMPENSA, cenario='academy_pass_and_shoot_with_keeper')
     
     # Normalização
     vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=False, clip_obs=10.)
@@ -88,8 +92,14 @@ if __name__ == "__main__":
     model.tensorboard_log = log_dir
 
     callbacks = [
-        CheckpointCallback(save_freq=50_000, save_path=models_dir, name_prefix='ckpt_fase4'),
-        GoalCounter(),
+        CheckpointAssincrono(save_freq=50_000, pasta=models_dir, prefixo='ckpt_fase4'),
+        AsyncEvalCallback(eval_freq=50_000, pasta=f"{log_dir}/melhor_modelo", cenario='academy_pass_and_shoot_with_keeper'),
+        EpisodeMetrics(),
+        NonFiniteCounter(),
+        # recompensa/<termo> no TensorBoard: qual termo está sendo explorado
+        ShapingLogger(),
+        # GFOOTBALL_PERFIL=1: tempo de cada etapa no TensorBoard + log_dir/perfil.json
+        *perfil_opcional(log_dir),
     ]
 
     print("\n⚽ TREINANDO COLETIVO (2 Milhões de steps)...")
@@ -1,11 +1,19 @@
-import gfootball.env as football_env
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import CheckpointCallback, BaseCallback
-from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import VecNormalize
 import gym
 import os
 
+from agendador_dificuldade import AgendadorDificuldade
+from ambientes import DificuldadeAjustavel, monitorar
+from avaliacao_assincrona import AsyncEvalCallback
+from checkpoint_assincrono import CheckpointAssincrono, retomar
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from replay_cenarios import BancoCenarios, ReplayCallback, ReplayCenarios, VecReplayCenarios, fracao_replay
+from rollout_compacto import compactar_rollout
+from vec_env_paralelo import criar_vec_env
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
 # === CONFIGURAÇÕES ===
 # Carregamos o modelo "Coletivo" da Fase 4
 # AJUSTE ESTE CAMINHO conforme seus logs anteriores
@@ -34,22 +42,10 @@ class GfootballAdapter(gym.Env):
     def reset(self): return self.env.reset()
     def step(self, action): return self.env.step(action)
 
-# === CONTADOR DE GOLS ===
-class GoalCounter(BaseCallback):
-    def __init__(self):
-        super().__init__()
-        self.goals = 0
-    def _on_step(self) -> bool:
-        rewards = self.locals.get('rewards', [])
-        if rewards is not None: 
-            self.goals += sum(1 for r in rewards if r > 0.8)
-        return True
-    def _on_rollout_end(self) -> None:
-        self.logger.record('rollout/goals', self.goals)
-        self.goals = 0
-
 # === AMBIENTE ===
 def make_env():
+    # Importado aqui: com GFOOTBALL_MOCK=1 o script roda sem o jogo instalado
+    import gfootball.env as football_env
     env = football_env.create_environment(
         # O CENÁRIO REAL: Futebol 5 contra 5
         env_name='5_vs_5', 
@@ -60,43 +56,80 @@ def make_env():
         rewards='scoring,checkpoints', 
         render=False
     )
+    # Deixa o AgendadorDificuldade mudar o bot deste ambiente no próximo reset
+    env = DificuldadeAjustavel(env)
     env = GfootballAdapter(env)
-    env = Monitor(env)
+    # GFOOTBALL_REPLAY=0.25: guarda o estado do motor antes de cada falha e deixa
+    # recomeçar dele (replay_cenarios.py)
+    if fracao_replay():
+        env = ReplayCenarios(env)
+    env = monitorar(env)
     return env
 
 if __name__ == "__main__":
     # Vamos aumentar para 16 ambientes em paralelo se o servidor aguentar
     # Se der erro de memória, volte para 8.
+    # Para escolher pelo número em vez de tentativa e erro (passos/s e MB por env):
+    #   python3 src/benchmark_suite.py --real --cenarios 5_vs_5 --secoes vec_env
     n_envs = 8 
-    vec_env = DummyVecEnv([make_env for _ in range(n_envs)])
-    
-    vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=False, clip_obs=10.)
-
-    print(f"🧠 Carregando o Jogador Completo da Fase 4: {modelo_anterior}")
-    
-    try:
-        model = PPO.load(modelo_anterior, env=vec_env, device="auto")
-        print("✅ Modelo carregado! O jogo vai começar...")
-    except Exception as e:
-        print(f"❌ ERRO: Não achei o modelo da Fase 4: {e}")
-        exit()
-    
-    # === AJUSTES FINAIS ===
-    # Mantemos learning rate baixo para refinar a estratégia
-    model.learning_rate = 0.00005 
-    model.ent_coef = 0.02 # Levemente menor, queremos menos "loucura" e mais consistência
-    model.n_steps = 2048
-    model.tensorboard_log = log_dir
+    vec_env = VecSanitize(criar_vec_env(make_env, n_envs=n_envs, copiar_obs=False))
+    banco_replay = None
+    if fracao_replay():
+        # Parte dos ambientes recomeça de onde o agente errou (gol sofrido, chute perdido, perda de posse)
+        banco_replay = BancoCenarios.carregar(f"{log_dir}/replay_cenarios.pkl")
+        vec_env = VecReplayCenarios(vec_env, banco_replay, fracao=fracao_replay())
+
+    # Se o treino caiu no meio, continua do último checkpoint (modelo, Adam e
+    # VecNormalize do mesmo passo) em vez de recomeçar da Fase 4
+    model, vec_env = retomar(models_dir, 'ckpt_5v5', vec_env, device="auto")
+    retomado = model is not None
+
+    if not retomado:
+        vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=False, clip_obs=10.)
+
+        print(f"🧠 Carregando o Jogador Completo da Fase 4: {modelo_anterior}")
+
+        try:
+            model = PPO.load(modelo_anterior, env=vec_env, device="auto")
+            print("✅ Modelo carregado! O jogo vai começar...")
+        except Exception as e:
+            print(f"❌ ERRO: Não achei o modelo da Fase 4: {e}")
+            exit()
+
+        # === AJUSTES FINAIS ===
+        # Mantemos learning rate baixo para refinar a estratégia
+        # (na retomada já vêm no checkpoint)
+        model.learning_rate = 0.00005
+        model.ent_coef = 0.02 # Levemente menor, queremos menos "loucura" e mais consistência
+        model.n_steps = 2048
+        model.tensorboard_log = log_dir
+
+    # O rollout guarda só o quadro novo de cada passo (a pilha de 4 é remontada
+    # nos lotes do PPO): ~4x menos memória por ambiente no buffer
+    compactar_rollout(model)
 
     callbacks = [
-        # Salvamos com menos frequência pois o treino é longo
-        CheckpointCallback(save_freq=100_000, save_path=models_dir, name_prefix='ckpt_5v5'),
-        GoalCounter(),
+        # Salvamos com menos frequência pois o treino é longo (em segundo plano, com o
+        # vec_normalize do mesmo passo; ficam os 3 últimos + o melhor)
+        CheckpointAssincrono(save_freq=100_000, pasta=models_dir, prefixo='ckpt_5v5'),
+        # Avalia em segundo plano e guarda o best_model.zip + vec_normalize.pkl
+        AsyncEvalCallback(eval_freq=100_000, pasta=f"{log_dir}/melhor_modelo", cenario='5_vs_5'),
+        # Sobe/desce a dificuldade de cada ambiente pela taxa de vitória recente
+        AgendadorDificuldade(inicial=0.05, verbose=1),
+        EpisodeMetrics(),
+        NonFiniteCounter(),
+        # GFOOTBALL_PERFIL=1: tempo de cada etapa no TensorBoard + log_dir/perfil.json
+        *perfil_opcional(log_dir),
+        # GFOOTBALL_REPLAY: banco de cenários no TensorBoard (replay/*), salvo no fim do treino
+        *([ReplayCallback(banco_replay, f"{log_dir}/replay_cenarios.pkl", verbose=1)]
+          if banco_replay is not None else []),
     ]
 
     print("\n🏆 TREINANDO A PARTIDA FINAL (3 Milhões de steps)...")
     # Isso vai demorar algumas horas, mas é o teste final
-    model.learn(total_timesteps=3_000_000, callback=callbacks, progress_bar=True)
+    total_timesteps = 3_000_000
+    model.learn(total_timesteps=total_timesteps - model.num_timesteps if retomado else total_timesteps,
+                callback=callbacks, progress_bar=True, reset_num_timesteps=not retomado)
 
     model.save(f"{models_dir}/CAMPEAO_5V5")
     vec_env.save(f"{models_dir}/vec_normalize_5v5.pkl")
@@ -0,0 +1,132 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from collections import deque
+import numpy as np
+
+# ==============================================================================
+# DIFICULDADE DO BOT AUTOMÁTICA (por ambiente, pela taxa de vitória recente)
+# ==============================================================================
+# Antes: treinar numa dificuldade fixa, rodar o visualizar_partida.py e subir a
+# dificuldade à mão num novo treino. Aqui cada ambiente do pool tem a própria
+# dificuldade e uma janela com os últimos episódios dele:
+#
+#   vitórias >= subir_acima   e saldo médio > 0  -> dificuldade + passo
+#   vitórias <= descer_abaixo e saldo médio < 0  -> dificuldade - passo
+#
+# A troca vai para o ambiente com env_method('definir_dificuldade') e vale no
+# próximo reset dele (ambientes.DificuldadeAjustavel), sem reiniciar processo.
+# O episódio que já começou na dificuldade antiga não entra na janela nova.
+#
+# Cada troca vai para o TensorBoard (dificuldade/*) e o estado do agendador é
+# guardado no próprio modelo (model.agenda_dificuldade), então todo checkpoint
+# .zip leva as dificuldades e o histórico de trocas; ao carregar um checkpoint o
+# agendador continua de onde parou.
+#
+#   callbacks = [..., AgendadorDificuldade(inicial=0.05)]
+
+HISTORICO_MAX = 1000
+
+
+class AgendadorDificuldade(BaseCallback):
+    def __init__(self, inicial=0.05, minimo=0.0, maximo=1.0, passo=0.05, janela=20,
+                 subir_acima=0.6, descer_abaixo=0.3, verbose=0):
+        super().__init__(verbose)
+        self.inicial = inicial
+        self.minimo = minimo
+        self.maximo = maximo
+        self.passo = passo
+        self.janela = janela
+        self.subir_acima = subir_acima
+        self.descer_abaixo = descer_abaixo
+        self.dificuldades = None
+        self.historico = []
+
+    def _on_training_start(self) -> None:
+        n = self.training_env.num_envs
+        salvo = getattr(self.model, 'agenda_dificuldade', None)
+        if salvo and len(salvo['dificuldades']) == n:
+            # Retomando de um checkpoint: mesmas dificuldades por ambiente
+            self.dificuldades = np.asarray(salvo['dificuldades'], dtype=np.float64)
+            self.historico = list(salvo['historico'])
+        else:
+            self.dificuldades = np.full(n, self.inicial, dtype=np.float64)
+        self._resultados = [deque(maxlen=self.janela) for _ in range(n)]
+        self._gols_pro = np.zeros(n, dtype=np.int64)
+        self._gols_contra = np.zeros(n, dtype=np.int64)
+        # Os episódios em andamento começaram antes da dificuldade ser aplicada
+        self._descartar = np.ones(n, dtype=bool)
+        for i, d in enumerate(self.dificuldades):
+            self.training_env.env_method('definir_dificuldade', float(d), indices=[i])
+        self._guardar_no_modelo()
+        self._registrar_geral()
+
+    def _guardar_no_modelo(self):
+        # Vai junto no .zip do model.save (CheckpointCallback, best_model, final)
+        self.model.agenda_dificuldade = {
+            'dificuldades': [float(d) for d in self.dificuldades],
+            'historico': self.historico[-HISTORICO_MAX:],
+            'config': {'minimo': self.minimo, 'maximo': self.maximo, 'passo': self.passo,
+                       'janela': self.janela, 'subir_acima': self.subir_acima,
+                       'descer_abaixo': self.descer_abaixo},
+        }
+
+    def _registrar_geral(self):
+        self.logger.record('dificuldade/media', float(self.dificuldades.mean()))
+        self.logger.record('dificuldade/min', float(self.dificuldades.min()))
+        self.logger.record('dificuldade/max', float(self.dificuldades.max()))
+
+    def _trocar(self, i, nova, taxa, saldo):
+        antiga = float(self.dificuldades[i])
+        self.dificuldades[i] = nova
+        self.training_env.env_method('definir_dificuldade', float(nova), indices=[i])
+        self._resultados[i].clear()
+        self._descartar[i] = True
+        self.historico.append({'passo': int(self.num_timesteps), 'env': int(i), 'de': antiga, 'para': float(nova),
+                               'taxa_vitoria': taxa, 'saldo_medio': saldo})
+        self.logger.record(f'dificuldade/env_{i}', float(nova))
+        self.logger.record('dificuldade/trocas', len(self.historico))
+        self._registrar_geral()
+        self._guardar_no_modelo()
+        if self.verbose:
+            seta = "⬆️" if nova > antiga else "⬇️"
+            print(f"{seta} env {i}: dificuldade {antiga:.2f} -> {nova:.2f} "
+                  f"(vitórias {taxa:.0%}, saldo {saldo:+.2f})")
+
+    def _avaliar(self, i):
+        resultados = self._resultados[i]
+        if len(resultados) < self.janela:
+            return
+        saldos = np.array(resultados)
+        taxa = float((saldos > 0).mean())
+        saldo = float(saldos.mean())
+        d = self.dificuldades[i]
+        if taxa >= self.subir_acima and saldo > 0 and d < self.maximo:
+            self._trocar(i, min(self.maximo, round(d + self.passo, 4)), taxa, saldo)
+        elif taxa <= self.descer_abaixo and saldo < 0 and d > self.minimo:
+            self._trocar(i, max(self.minimo, round(d - self.passo, 4)), taxa, saldo)
+
+    def _on_step(self) -> bool:
+        infos = self.locals.get('infos', [])
+        for i, info in enumerate(infos):
+            gol = info.get('score_reward', 0)
+            self._gols_pro[i] += gol > 0
+            self._gols_contra[i] += gol < 0
+        dones = self.locals.get('dones')
+        if dones is None:
+            return True
+        for i in np.flatnonzero(dones):
+            saldo = int(self._gols_pro[i] - self._gols_contra[i])
+            self._gols_pro[i] = self._gols_contra[i] = 0
+            if self._descartar[i]:
+                self._descartar[i] = False
+                continue
+            self._resultados[i].append(saldo)
+            self._avaliar(i)
+        return True
+
+    def _on_rollout_end(self) -> None:
+        self._registrar_geral()
+        cheias = [r for r in self._resultados if r]
+        if cheias:
+            saldos = np.concatenate([np.array(r) for r in cheias])
+            self.logger.record('dificuldade/taxa_vitoria_janela', float((saldos > 0).mean()))
+            self.logger.record('dificuldade/saldo_medio_janela', float(saldos.mean()))
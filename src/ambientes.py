@@ -0,0 +1,386 @@
+import gym
+import gymnasium
+import numpy as np
+import os
+import pickle
+import time
+
+# ==============================================================================
+# AMBIENTES COMPARTILHADOS
+# ==============================================================================
+# Tudo que os módulos de infraestrutura (rollout paralelo, avaliação, benchmark)
+# precisam para criar um ambiente fica aqui. Os scripts de treino numerados
+# continuam com seus próprios adapters/make_env.
+
+# Formato da observação 'simple115' empilhada (stacked=True): 4 quadros de 115
+DIM_QUADRO = 115
+N_QUADROS = 4
+N_ACOES = 19
+
+# Jogadores (esquerda, direita) de cada cenário, goleiros inclusos
+JOGADORES_POR_CENARIO = {
+    'academy_empty_goal_close': (2, 1),
+    'academy_run_to_score_with_keeper': (2, 6),
+    'academy_3_vs_1_with_keeper': (4, 2),
+    'academy_pass_and_shoot_with_keeper': (3, 2),
+    '5_vs_5': (5, 5),
+}
+
+# Liga o modo "sem jogo" (MockFootballEnv) sem mexer nos scripts:
+#   GFOOTBALL_MOCK=1 python3 src/01_treino_artilheiro.py
+def modo_mock():
+    return os.environ.get("GFOOTBALL_MOCK", "0").lower() in ("1", "true", "sim", "yes")
+
+
+# === ADAPTER (Igual aos scripts de treino) ===
+class GfootballAdapter(gym.Env):
+    def __init__(self, env):
+        self.env = env
+        obs_space = env.observation_space
+        self.observation_space = gym.spaces.Box(
+            low=obs_space.low, high=obs_space.high,
+            shape=obs_space.shape, dtype='float32'
+        )
+        act_space = env.action_space
+        self.action_space = gym.spaces.Discrete(act_space.n)
+    def reset(self): return self.env.reset()
+    def step(self, action): return self.env.step(action)
+    def close(self): return self.env.close()
+
+
+# === DIFICULDADE DO BOT AJUSTÁVEL SEM REINICIAR ===
+# O 'difficulty' do other_config_options não chega ao motor: a cada reset o
+# cenário é montado de novo e escreve o próprio right_team_difficulty (o
+# 5_vs_5 fixa 0.05). Aqui o NewScenario da config é embrulhado para
+# sobrescrever o valor logo depois da montagem. Mudar vale no próximo reset:
+#   vec_env.env_method('definir_dificuldade', 0.6, indices=[3])
+class DificuldadeAjustavel(gym.Wrapper):
+    def __init__(self, env, dificuldade=None):
+        super().__init__(env)
+        self.dificuldade = dificuldade
+        config = env.unwrapped._config
+        montar = config.NewScenario
+
+        def novo_cenario(inc=1):
+            montar(inc=inc)
+            if self.dificuldade is not None:
+                config.ScenarioConfig().right_team_difficulty = float(self.dificuldade)
+        config.NewScenario = novo_cenario
+
+    def definir_dificuldade(self, dificuldade):
+        self.dificuldade = dificuldade
+
+
+# === ADAPTER DOS DOIS LADOS (self-play) ===
+# Um jogador controlado em cada time: obs (2, 460), ação MultiDiscrete([19, 19]).
+# O gfootball já espelha a observação do time direito (ele se vê atacando para a
+# direita), então a mesma política joga dos dois lados. A recompensa que sai é a
+# do lado esquerdo (o learner); a do direito vai no info.
+class GfootballDoisLadosAdapter(gym.Env):
+    def __init__(self, env):
+        self.env = env
+        obs_space = env.observation_space
+        self.observation_space = gym.spaces.Box(
+            low=obs_space.low, high=obs_space.high,
+            shape=obs_space.shape, dtype='float32'
+        )
+        self.action_space = gym.spaces.MultiDiscrete(env.action_space.nvec)
+    def reset(self): return self.env.reset()
+    def step(self, action):
+        obs, reward, done, info = self.env.step(list(action))
+        reward = np.asarray(reward, dtype=np.float32)
+        info['recompensa_direita'] = float(reward[1])
+        return obs, float(reward[0]), done, info
+    def close(self): return self.env.close()
+
+
+# === ADAPTER DE TODOS OS JOGADORES (multiagente) ===
+# number_of_left_players_agent_controls=N: obs (N, 460), uma linha por jogador
+# (cada uma com o próprio "jogador ativo" no one-hot), ação MultiDiscrete([19]*N)
+# e recompensa por jogador (o checkpoints só vai para quem está com a bola).
+# O Monitor recebe a média; a recompensa de cada jogador vai no info em chaves
+# escalares (recompensa_jogador_0, ...), que o SharedMemoryVecEnv leva a cada passo.
+def chaves_recompensa(jogadores):
+    return tuple(f'recompensa_jogador_{j}' for j in range(jogadores))
+
+
+# Quantos jogadores do time esquerdo o agente pode controlar: o goleiro dos
+# cenários não é controlável, e pedir mais que isso o motor recusa
+def jogadores_controlaveis(env_name, mock=None):
+    if mock is None:
+        mock = modo_mock()
+    if mock:
+        return max(JOGADORES_POR_CENARIO.get(env_name, (2, 2))[0] - 1, 1)
+    from gfootball.env import config
+    return config.Config({'level': env_name}).ScenarioConfig().controllable_left_players
+
+
+class GfootballTodosJogadoresAdapter(gym.Env):
+    def __init__(self, env):
+        self.env = env
+        obs_space = env.observation_space
+        self.observation_space = gym.spaces.Box(
+            low=obs_space.low, high=obs_space.high,
+            shape=obs_space.shape, dtype='float32'
+        )
+        self.action_space = gym.spaces.MultiDiscrete(env.action_space.nvec)
+    def reset(self): return self.env.reset()
+    def step(self, action):
+        obs, reward, done, info = self.env.step(list(action))
+        reward = np.asarray(reward, dtype=np.float32).reshape(-1)
+        info.update(zip(chaves_recompensa(len(reward)), reward.tolist()))
+        return obs, float(reward.mean()), done, info
+    def close(self): return self.env.close()
+
+
+# === API ANTIGA DO GYM -> GYMNASIUM (antes do Monitor) ===
+# Os adapters e o mock seguem o gym 0.21 (reset -> obs, step -> 4 valores); o
+# Monitor do SB3 >= 2.0 é um wrapper do gymnasium. O done vira terminated, ou
+# truncated quando o info traz TimeLimit.truncated. self.env fica exposto para o
+# env_method/get_attr dos vec envs acharem os métodos das camadas de baixo.
+def converter_espaco(espaco):
+    if isinstance(espaco, gymnasium.spaces.Space):
+        return espaco
+    if isinstance(espaco, gym.spaces.Box):
+        return gymnasium.spaces.Box(low=espaco.low, high=espaco.high,
+                                    shape=espaco.shape, dtype=espaco.dtype)
+    if isinstance(espaco, gym.spaces.Discrete):
+        return gymnasium.spaces.Discrete(int(espaco.n))
+    if isinstance(espaco, gym.spaces.MultiDiscrete):
+        return gymnasium.spaces.MultiDiscrete(espaco.nvec)
+    raise NotImplementedError(f"Espaço não suportado: {espaco}")
+
+
+class ParaGymnasium(gymnasium.Env):
+    def __init__(self, env):
+        self.env = env
+        self.observation_space = converter_espaco(env.observation_space)
+        self.action_space = converter_espaco(env.action_space)
+
+    def reset(self, seed=None, options=None):
+        if seed is not None and hasattr(self.env, 'seed'):
+            self.env.seed(seed)
+        return self.env.reset(), {}
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        truncado = bool(info.get('TimeLimit.truncated', False))
+        return obs, reward, done and not truncado, done and truncado, info
+
+    def close(self):
+        return self.env.close()
+
+
+def monitorar(env):
+    # Monitor do SB3 em cima de um ambiente da API antiga. Importado aqui: os
+    # workers do rollout importam este módulo e não precisam do SB3/torch
+    from stable_baselines3.common.monitor import Monitor
+    return Monitor(env if isinstance(env, gymnasium.Env) else ParaGymnasium(env))
+
+
+# === MOCK DO MOTOR ===
+# Ambiente falso e determinístico com o mesmo layout do simple115 empilhado.
+# Serve para testar rollout/normalização/callbacks sem o binário do GFootball.
+# Layout de cada quadro (igual ao simple115 do gfootball):
+#   [0:22] posições do time esquerdo   [22:44] direções do time esquerdo
+#   [44:66] posições do time direito   [66:88] direções do time direito
+#   [88:91] bola (x, y, z)             [91:94] direção da bola
+#   [94:97] dono da bola (ninguém, esquerda, direita)
+#   [97:108] jogador ativo (one-hot)   [108:115] modo de jogo (one-hot)
+# Com lados=2 o time direito também é controlado (mesmo contrato do
+# GfootballDoisLadosAdapter): obs (2, 460) com a 2ª linha espelhada.
+# Com jogadores=N controla N jogadores do time esquerdo (contrato do
+# GfootballTodosJogadoresAdapter): a ação que vale é a de quem está com a bola.
+# get_state/set_state imitam os do motor (replay_cenarios.py): bytes opacos, e
+# o set_state não devolve observação (a pilha de quadros só volta nos passos).
+class MockFootballEnv(gym.Env):
+    def __init__(self, env_name='mock', rewards='scoring', seed=0,
+                 duracao=400, custo_step_us=0, lados=1, dificuldade=None, jogadores=1):
+        if lados == 2 and jogadores > 1:
+            raise ValueError("MockFootballEnv: use lados=2 ou jogadores>1, não os dois")
+        self.env_name = env_name
+        self.rewards = rewards
+        self.duracao = duracao
+        self.lados = lados
+        self.jogadores = jogadores
+        # Como no DificuldadeAjustavel: o bot mais forte marca mais; vale no próximo reset
+        self.dificuldade = dificuldade
+        self._dificuldade_atual = 0.25 if dificuldade is None else dificuldade
+        # Simula o custo de CPU de um step do motor (espera ocupada)
+        self.custo_step_us = custo_step_us
+        linhas = 2 if lados == 2 else jogadores
+        formato = (DIM_QUADRO * N_QUADROS,) if linhas == 1 else (linhas, DIM_QUADRO * N_QUADROS)
+        self.observation_space = gym.spaces.Box(
+            low=-np.inf, high=np.inf, shape=formato, dtype='float32'
+        )
+        if linhas == 1:
+            self.action_space = gym.spaces.Discrete(N_ACOES)
+        else:
+            self.action_space = gym.spaces.MultiDiscrete([N_ACOES] * linhas)
+        self._rng = np.random.RandomState(seed)
+        self._quadros = np.zeros((N_QUADROS, DIM_QUADRO), dtype=np.float32)
+        self._passos = 0
+        self._checkpoints = 0
+        self._com_bola = 0
+
+    def seed(self, seed=None):
+        self._rng = np.random.RandomState(seed)
+        return [seed]
+
+    def get_state(self):
+        return pickle.dumps((self._bola_x, self._bola_y, self._dono, self._com_bola, self._passos,
+                             self._checkpoints, self._dificuldade_atual, self._quadros.copy()))
+
+    def set_state(self, state):
+        (self._bola_x, self._bola_y, self._dono, self._com_bola, self._passos,
+         self._checkpoints, self._dificuldade_atual, quadros) = pickle.loads(state)
+        self._quadros[:] = quadros
+        return {}
+
+    def definir_dificuldade(self, dificuldade):
+        self.dificuldade = dificuldade
+
+    def _novo_quadro(self):
+        q = self._rng.uniform(-1.0, 1.0, size=DIM_QUADRO).astype(np.float32)
+        q[88:91] = (self._bola_x, self._bola_y, 0.0)
+        q[94:97] = 0.0
+        q[94 + self._dono] = 1.0
+        q[97:108] = 0.0
+        q[97] = 1.0
+        q[108:115] = 0.0
+        q[108] = 1.0
+        return q
+
+    def _empilhada(self):
+        if self.jogadores > 1:
+            # Uma linha por jogador controlado: muda só o one-hot do jogador ativo
+            n = self.jogadores
+            todos = np.repeat(self._quadros[None], n, axis=0)
+            todos[:, :, 97:108] = 0.0
+            todos[np.arange(n), :, 97 + np.arange(n)] = 1.0
+            return todos.reshape(n, -1)
+        esquerda = self._quadros.reshape(-1).copy()
+        if self.lados == 1:
+            return esquerda
+        # Visão do time direito: bola espelhada e dono da bola trocado
+        direita = self._quadros.copy()
+        direita[:, 88:90] *= -1.0
+        direita[:, [95, 96]] = direita[:, [96, 95]]
+        return np.stack([esquerda, direita.reshape(-1)])
+
+    def _observacao(self):
+        self._quadros[:-1] = self._quadros[1:]
+        self._quadros[-1] = self._novo_quadro()
+        return self._empilhada()
+
+    def reset(self):
+        self._passos = 0
+        self._checkpoints = 0
+        if self.dificuldade is not None:
+            self._dificuldade_atual = self.dificuldade
+        self._bola_x, self._bola_y = 0.0, 0.0
+        self._dono = 1
+        self._com_bola = 0
+        # Igual ao FrameStack do gfootball: o reset repete o primeiro quadro
+        self._quadros[:] = self._novo_quadro()
+        return self._empilhada()
+
+    def step(self, action):
+        if self.custo_step_us:
+            fim = time.perf_counter_ns() + self.custo_step_us * 1000
+            while time.perf_counter_ns() < fim:
+                pass
+        self._passos += 1
+        if self.lados == 2:
+            action, rival = (int(a) for a in action)
+        elif self.jogadores > 1:
+            action, rival = int(np.asarray(action).reshape(-1)[self._com_bola]), None
+        else:
+            action, rival = int(action), None
+        com_bola = self._com_bola
+        # Direções 1..8 empurram a bola; o time direito rouba a bola às vezes
+        if self._dono == 1 and 1 <= action <= 8:
+            self._bola_x += 0.02 * np.cos((action - 1) * np.pi / 4)
+            self._bola_y += 0.02 * np.sin((action - 1) * np.pi / 4)
+        elif self._dono == 2 and rival is not None and 1 <= rival <= 8:
+            # O direito ataca para a esquerda: a direção dele vem espelhada
+            self._bola_x -= 0.02 * np.cos((rival - 1) * np.pi / 4)
+            self._bola_y -= 0.02 * np.sin((rival - 1) * np.pi / 4)
+        if self._rng.rand() < 0.01:
+            self._dono = 2 if self._dono == 1 else 1
+        if self.jogadores > 1 and self._dono == 1 and action in (9, 10, 11):
+            # Passe: a bola vai para o próximo jogador controlado
+            self._com_bola = (self._com_bola + 1) % self.jogadores
+        score = 0
+        if self._dono == 1 and action == 12 and self._bola_x > 0.7:
+            score = 1 if self._rng.rand() < 0.5 else 0
+        elif self._dono == 2 and rival is None and self._rng.rand() < 0.008 * self._dificuldade_atual:
+            score = -1
+        elif self._dono == 2 and rival == 12 and self._bola_x < -0.7:
+            score = -1 if self._rng.rand() < 0.5 else 0
+        reward = float(score)
+        if 'checkpoints' in self.rewards and self._dono == 1:
+            alvo = int(max(0.0, self._bola_x) * 10)
+            if alvo > self._checkpoints:
+                reward += 0.1 * (alvo - self._checkpoints)
+                self._checkpoints = alvo
+        done = score != 0 or self._passos >= self.duracao
+        if score != 0:
+            self._bola_x, self._bola_y, self._dono = 0.0, 0.0, 1
+        self._bola_x = float(np.clip(self._bola_x, -1.0, 1.0))
+        self._bola_y = float(np.clip(self._bola_y, -0.42, 0.42))
+        info = {'score_reward': score}
+        if self.lados == 2:
+            # Como no GfootballDoisLadosAdapter (o checkpoints do direito fica de fora)
+            info['recompensa_direita'] = float(-score)
+        if self.jogadores > 1:
+            # Como no GfootballTodosJogadoresAdapter: o checkpoints é de quem estava com a bola
+            por_jogador = np.full(self.jogadores, float(score), dtype=np.float32)
+            por_jogador[com_bola] = reward
+            info.update(zip(chaves_recompensa(self.jogadores), por_jogador.tolist()))
+            reward = float(por_jogador.mean())
+        return self._observacao(), reward, done, info
+
+    def close(self):
+        pass
+
+
+# === FÁBRICA DE AMBIENTES ===
+# Mesma receita dos scripts de treino: simple115 empilhado, sem render, Monitor.
+# dois_lados=True controla também um jogador do time direito (self-play).
+# jogadores=N controla N jogadores do time esquerdo (multiagente.py).
+# dificuldade=None deixa a do cenário; dá para mudar depois com definir_dificuldade.
+def criar_env(env_name='academy_empty_goal_close', rewards='scoring', mock=None,
+              seed=0, monitor=True, dois_lados=False, dificuldade=None, jogadores=1, **kwargs):
+    if dois_lados and jogadores > 1:
+        raise ValueError("criar_env: dois_lados e jogadores>1 não combinam")
+    if mock is None:
+        mock = modo_mock()
+    if mock:
+        env = MockFootballEnv(env_name=env_name, rewards=rewards, seed=seed, lados=2 if dois_lados else 1,
+                              dificuldade=dificuldade, jogadores=jogadores)
+    else:
+        import gfootball.env as football_env
+        if dois_lados:
+            kwargs.update(number_of_left_players_agent_controls=1,
+                          number_of_right_players_agent_controls=1)
+        elif jogadores > 1:
+            kwargs.update(number_of_left_players_agent_controls=jogadores)
+        env = football_env.create_environment(
+            env_name=env_name,
+            stacked=True,
+            representation='simple115',
+            rewards=rewards,
+            render=False,
+            **kwargs
+        )
+        env = DificuldadeAjustavel(env, dificuldade)
+        if dois_lados:
+            env = GfootballDoisLadosAdapter(env)
+        elif jogadores > 1:
+            env = GfootballTodosJogadoresAdapter(env)
+        else:
+            env = GfootballAdapter(env)
+    if monitor:
+        env = monitorar(env)
+    return env
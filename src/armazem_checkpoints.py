@@ -0,0 +1,553 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import time
+import zipfile
+import zlib
+import numpy as np
+
+from politica_numpy import FORMATO as FORMATO_NUMPY, VERSAO as VERSAO_NUMPY, PoliticaNumpy, arrays_normalizador
+
+# ==============================================================================
+# ARMAZÉM DE CHECKPOINTS (blobs por hash, delta entre checkpoints, leitura preguiçosa)
+# ==============================================================================
+# Cada zip do SB3 tem uns 900 KB sem compressão: 280 KB de policy, 560 KB do
+# Adam (que avaliação nenhuma usa) e 70 KB de 'data' (observation_space,
+# policy_class, ... quase sempre iguais). O PPO.load abre tudo isso para o
+# torneio/avaliador escolherem ações. Aqui o checkpoint é quebrado em pedaços:
+#
+#   politica     um blob por tensor do policy.pth (bytes crus + dtype/forma)
+#   dados        um blob por chave do 'data' (o que não muda fica guardado 1 vez)
+#   outros       otimizador, pytorch_variables, versão, ... (blob opaco cada)
+#   normalizador o vec_normalize_*.pkl que acompanha o modelo
+#
+# Cada blob fica em blobs/<sha256> (do conteúdo): o que é igual entre
+# checkpoints existe uma vez só. Com delta, um tensor pode ser guardado como
+# XOR contra o mesmo tensor do checkpoint anterior da série (pesos vizinhos
+# repetem sinal/expoente: sobram zeros, que o zlib espreme); a cadeia de
+# deltas tem no máximo PROFUNDIDADE_MAX elos. O manifesto (checkpoints/<nome>.json)
+# só aponta para os hashes, então abrir um checkpoint não lê nada além dele e
+# a política para avaliação lê só os tensores da policy e a normalização.
+# O <nome> é o caminho do modelo a partir da pasta importada
+# (FASE5_FINAL/models/CAMPEAO_5V5): dois treinos com o mesmo models/CAMPEAO_5V5
+# não dividem um manifesto; se mesmo assim o nome já for de outro arquivo, o
+# novo ganha um sufixo (~<hash do caminho>) em vez de sobrescrever.
+#
+#   python3 src/armazem_checkpoints.py importar ~/gfootball_logs src      # zips + ckpt_* (com delta)
+#   python3 src/armazem_checkpoints.py estatisticas
+#   python3 src/armazem_checkpoints.py tempo modelos_fase5/CAMPEAO_5V5
+#   python3 src/armazem_checkpoints.py exportar modelos_fase5/CAMPEAO_5V5 /tmp/CAMPEAO_5V5.zip
+#   python3 src/torneio.py --armazem ~/gfootball_logs/armazem --com-ckpt
+#   python3 src/avaliador.py armazem:$HOME/gfootball_logs/armazem#modelos_fase5/CAMPEAO_5V5
+
+ARMAZEM_PADRAO = os.path.expanduser("~/gfootball_logs/armazem")
+FORMATO = 'armazem_checkpoints'
+VERSAO = 1
+
+# Cabeçalho do blob: mágico, tipo (completo/xor), largura do elemento e, no xor, o hash da base
+MAGICO = b'GFB1'
+COMPLETO, XOR = b'C', b'X'
+TAMANHO_CABECALHO = len(MAGICO) + 2
+PROFUNDIDADE_MAX = 8
+# O delta só fica se sair menor que isso x o blob completo
+GANHO_MIN_DELTA = 0.9
+NIVEL_ZLIB = 6
+
+ATIVACOES_SB3 = {'tanh': 'tanh', 'relu': 'relu', 'identity': 'identidade'}
+
+
+# === CODIFICAÇÃO DOS BLOBS ===
+def _embaralhar(dados, largura):
+    # Junta o byte k de todos os elementos: os bytes de sinal/expoente ficam
+    # lado a lado e o zlib acha as repetições
+    if largura <= 1 or len(dados) % largura:
+        return dados
+    return np.frombuffer(dados, np.uint8).reshape(-1, largura).T.tobytes()
+
+
+def _desembaralhar(dados, largura):
+    if largura <= 1 or len(dados) % largura:
+        return dados
+    return np.frombuffer(dados, np.uint8).reshape(largura, -1).T.tobytes()
+
+
+def _xor(a, b):
+    return np.bitwise_xor(np.frombuffer(a, np.uint8), np.frombuffer(b, np.uint8)).tobytes()
+
+
+def _salvar_atomico(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(conteudo)
+    os.replace(tmp, caminho)
+
+
+def _hash(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+# === ARMAZÉM ===
+class Armazem:
+    def __init__(self, raiz=ARMAZEM_PADRAO):
+        self.raiz = os.path.abspath(os.path.expanduser(raiz))
+        self.pasta_blobs = os.path.join(self.raiz, 'blobs')
+        self.pasta_checkpoints = os.path.join(self.raiz, 'checkpoints')
+
+    # --- blobs ---
+    def _caminho_blob(self, h):
+        return os.path.join(self.pasta_blobs, h[:2], h)
+
+    def tem_blob(self, h):
+        return os.path.exists(self._caminho_blob(h))
+
+    def _cabecalho(self, h):
+        with open(self._caminho_blob(h), 'rb') as f:
+            cabecalho = f.read(TAMANHO_CABECALHO + 32)
+        if cabecalho[:len(MAGICO)] != MAGICO:
+            raise ValueError(f"Blob corrompido: {h}")
+        tipo = cabecalho[len(MAGICO):len(MAGICO) + 1]
+        base = cabecalho[TAMANHO_CABECALHO:].hex() if tipo == XOR else None
+        return tipo, base
+
+    def profundidade(self, h):
+        # Quantos deltas é preciso desfazer para ler o blob
+        n = 0
+        _, base = self._cabecalho(h)
+        while base is not None:
+            n += 1
+            _, base = self._cabecalho(base)
+        return n
+
+    def gravar_blob(self, conteudo, largura=1, base=None):
+        h = _hash(conteudo)
+        if self.tem_blob(h):
+            return h
+        corpo = MAGICO + COMPLETO + bytes([largura]) + zlib.compress(_embaralhar(conteudo, largura), NIVEL_ZLIB)
+        if base is not None and base != h and self.tem_blob(base) and self.profundidade(base) < PROFUNDIDADE_MAX:
+            anterior = self.ler_blob(base)
+            if len(anterior) == len(conteudo):
+                delta = zlib.compress(_embaralhar(_xor(conteudo, anterior), largura), NIVEL_ZLIB)
+                if len(delta) + 32 < GANHO_MIN_DELTA * len(corpo):
+                    corpo = MAGICO + XOR + bytes([largura]) + bytes.fromhex(base) + delta
+        _salvar_atomico(self._caminho_blob(h), corpo)
+        return h
+
+    def ler_blob(self, h):
+        with open(self._caminho_blob(h), 'rb') as f:
+            corpo = f.read()
+        if corpo[:len(MAGICO)] != MAGICO:
+            raise ValueError(f"Blob corrompido: {h}")
+        tipo, largura = corpo[len(MAGICO):len(MAGICO) + 1], corpo[len(MAGICO) + 1]
+        if tipo == COMPLETO:
+            return _desembaralhar(zlib.decompress(corpo[TAMANHO_CABECALHO:]), largura)
+        base = corpo[TAMANHO_CABECALHO:TAMANHO_CABECALHO + 32].hex()
+        delta = _desembaralhar(zlib.decompress(corpo[TAMANHO_CABECALHO + 32:]), largura)
+        return _xor(delta, self.ler_blob(base))
+
+    # --- manifestos ---
+    def _caminho_manifesto(self, nome):
+        return os.path.join(self.pasta_checkpoints, f"{nome}.json")
+
+    def checkpoints(self):
+        nomes = []
+        for pasta, _, arquivos in os.walk(self.pasta_checkpoints):
+            for arquivo in arquivos:
+                if arquivo.endswith('.json'):
+                    nomes.append(os.path.relpath(os.path.join(pasta, arquivo[:-5]), self.pasta_checkpoints))
+        return sorted(nomes)
+
+    def existe(self, nome):
+        return os.path.exists(self._caminho_manifesto(nome))
+
+    def abrir(self, nome):
+        caminho = self._caminho_manifesto(nome)
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(f"Checkpoint {nome!r} não está no armazém {self.raiz}")
+        with open(caminho) as f:
+            return Checkpoint(self, json.load(f))
+
+    def remover(self, nome):
+        # Os blobs ficam até o coletar_lixo (podem ser base de delta de outro checkpoint)
+        os.remove(self._caminho_manifesto(nome))
+
+    # --- importação ---
+    def importar(self, modelo, normalizador=None, nome=None, base=None, hash_origem=None):
+        # base: Checkpoint anterior da mesma série (delta) ou None (tudo completo)
+        import torch
+        from torneio import zip_de_pasta
+        nome = nome or nome_padrao(modelo)
+        anteriores = base.manifesto if base is not None else {}
+        outros_base = dict(anteriores.get('outros', []))
+
+        zip_sb3 = modelo if os.path.isfile(modelo) else zip_de_pasta(modelo)
+        politica, dados, outros, passo = {}, [], [], None
+        with zipfile.ZipFile(zip_sb3) as z:
+            for membro in z.namelist():
+                conteudo = z.read(membro)
+                if membro == 'data':
+                    valores = json.loads(conteudo)
+                    passo = valores.get('num_timesteps')
+                    dados = [[chave, self.gravar_blob(json.dumps(valor).encode())] for chave, valor in valores.items()]
+                elif membro == 'policy.pth':
+                    estado = torch.load(io.BytesIO(conteudo), map_location='cpu')
+                    tensores_base = anteriores.get('politica', {})
+                    for chave, tensor in estado.items():
+                        arr = tensor.detach().cpu().contiguous().numpy()
+                        ref = tensores_base.get(chave)
+                        mesmo = ref is not None and ref['dtype'] == arr.dtype.str and ref['forma'] == list(arr.shape)
+                        politica[chave] = {
+                            'hash': self.gravar_blob(arr.tobytes(), arr.dtype.itemsize, ref['hash'] if mesmo else None),
+                            'dtype': arr.dtype.str,
+                            'forma': list(arr.shape),
+                        }
+                else:
+                    outros.append([membro, self.gravar_blob(conteudo, base=outros_base.get(membro))])
+        if not politica:
+            raise ValueError(f"Sem policy.pth: {modelo} não parece um modelo do SB3")
+
+        h_norm = None
+        if normalizador:
+            with open(normalizador, 'rb') as f:
+                h_norm = self.gravar_blob(f.read(), base=anteriores.get('normalizador'))
+
+        conteudo_id = json.dumps([dados, politica, outros, h_norm], sort_keys=True).encode()
+        manifesto = {
+            'formato': FORMATO,
+            'versao': VERSAO,
+            'nome': nome,
+            'serie': os.path.dirname(nome),
+            'passo': passo,
+            'id': _hash(conteudo_id),
+            'hash_origem': hash_origem,
+            'origem': os.path.abspath(modelo),
+            'normalizador_origem': os.path.abspath(normalizador) if normalizador else None,
+            'bytes_origem': _tamanho(modelo) + (os.path.getsize(normalizador) if normalizador else 0),
+            'importado_em': time.time(),
+            'base': base.nome if base is not None else None,
+            'dados': dados,
+            'politica': politica,
+            'outros': outros,
+            'normalizador': h_norm,
+        }
+        _salvar_atomico(self._caminho_manifesto(nome), json.dumps(manifesto, indent=2).encode())
+        return Checkpoint(self, manifesto)
+
+    def importar_pastas(self, pastas, incluir_ckpt=True, delta=True):
+        from torneio import descobrir_modelos, hash_conteudo
+        series, vistos = {}, set()
+        for raiz in pastas:
+            for m in descobrir_modelos([raiz], incluir_ckpt=incluir_ckpt):
+                if os.path.abspath(m['modelo']) in vistos:
+                    continue
+                vistos.add(os.path.abspath(m['modelo']))
+                m['nome'] = nome_padrao(m['modelo'], raiz)
+                series.setdefault(os.path.dirname(m['modelo']), []).append(m)
+        importados = []
+        for serie in sorted(series):
+            base = None
+            # Em ordem de passo: cada checkpoint vira delta do anterior da série
+            for m in sorted(series[serie], key=lambda m: _ordem(m['modelo'])):
+                h = hash_conteudo(m['modelo'], m['normalizador'])
+                nome = self._nome_livre(m['nome'], m['modelo'], h)
+                existente = self.abrir(nome) if self.existe(nome) else None
+                if existente is not None and existente.manifesto.get('hash_origem') == h:
+                    print(f"♻️  Já no armazém: {nome}")
+                    base = existente if delta else None
+                    continue
+                try:
+                    checkpoint = self.importar(m['modelo'], m['normalizador'], nome=nome, base=base, hash_origem=h)
+                except Exception as e:
+                    print(f"❌ Não consegui importar {m['modelo']}: {e}")
+                    continue
+                print(f"📥 {nome}" + (f"  (delta de {base.nome})" if base is not None else ""))
+                importados.append(checkpoint)
+                base = checkpoint if delta else None
+        return importados
+
+    def _nome_livre(self, nome, modelo, h):
+        # O nome já é de outro arquivo com outro conteúdo (outra raiz, outro treino):
+        # em vez de sobrescrever, ganha um sufixo fixo do caminho de origem
+        if not self.existe(nome):
+            return nome
+        manifesto = self.abrir(nome).manifesto
+        if manifesto.get('origem') == os.path.abspath(modelo) or manifesto.get('hash_origem') == h:
+            return nome
+        livre = f"{nome}~{_hash(os.path.abspath(modelo).encode())[:8]}"
+        print(f"⚠️ {nome} já é de {manifesto.get('origem')}: {modelo} entra como {livre}")
+        return livre
+
+    # --- manutenção ---
+    def coletar_lixo(self):
+        # Blob vivo: citado por algum manifesto ou base de delta de um blob vivo
+        vivos = set()
+        for nome in self.checkpoints():
+            vivos.update(self.abrir(nome).hashes())
+        pendentes = list(vivos)
+        while pendentes:
+            _, base = self._cabecalho(pendentes.pop())
+            if base is not None and base not in vivos:
+                vivos.add(base)
+                pendentes.append(base)
+        removidos, liberados = 0, 0
+        for pasta, _, arquivos in os.walk(self.pasta_blobs):
+            for arquivo in arquivos:
+                # .tmp é blob sendo gravado agora por outro processo
+                if arquivo not in vivos and not arquivo.endswith('.tmp'):
+                    caminho = os.path.join(pasta, arquivo)
+                    liberados += os.path.getsize(caminho)
+                    os.remove(caminho)
+                    removidos += 1
+        return removidos, liberados
+
+    def estatisticas(self):
+        nomes = self.checkpoints()
+        origem = sum(self.abrir(n).manifesto.get('bytes_origem', 0) for n in nomes)
+        blobs, deltas, bytes_blobs = 0, 0, 0
+        for pasta, _, arquivos in os.walk(self.pasta_blobs):
+            for arquivo in arquivos:
+                if arquivo.endswith('.tmp'):
+                    continue
+                blobs += 1
+                bytes_blobs += os.path.getsize(os.path.join(pasta, arquivo))
+                deltas += self._cabecalho(arquivo)[0] == XOR
+        manifestos = sum(os.path.getsize(self._caminho_manifesto(n)) for n in nomes)
+        disco = bytes_blobs + manifestos
+        return {
+            'checkpoints': len(nomes),
+            'blobs': blobs,
+            'blobs_delta': deltas,
+            'bytes_origem': origem,
+            'bytes_disco': disco,
+            'reducao': origem / disco if disco else None,
+        }
+
+
+# === CHECKPOINT (só o manifesto em memória; o resto é lido sob demanda) ===
+class Checkpoint:
+    def __init__(self, armazem, manifesto):
+        if manifesto.get('formato') != FORMATO:
+            raise ValueError("Manifesto não é do armazem_checkpoints.py")
+        if manifesto['versao'] > VERSAO:
+            raise ValueError(f"Versão {manifesto['versao']} do manifesto é mais nova que o código ({VERSAO})")
+        self.armazem = armazem
+        self.manifesto = manifesto
+        self.nome = manifesto['nome']
+        self.passo = manifesto.get('passo')
+
+    @property
+    def endereco(self):
+        return f"armazem:{self.armazem.raiz}#{self.nome}"
+
+    def hashes(self):
+        hashes = [h for _, h in self.manifesto['dados']] + [h for _, h in self.manifesto['outros']]
+        hashes += [t['hash'] for t in self.manifesto['politica'].values()]
+        if self.manifesto['normalizador']:
+            hashes.append(self.manifesto['normalizador'])
+        return hashes
+
+    def dados(self, *chaves):
+        # Só as chaves pedidas (todas se nenhuma) do 'data' do SB3
+        indice = dict(self.manifesto['dados'])
+        chaves = chaves or list(indice)
+        return {c: json.loads(self.armazem.ler_blob(indice[c])) for c in chaves if c in indice}
+
+    def tensor(self, chave):
+        meta = self.manifesto['politica'][chave]
+        conteudo = self.armazem.ler_blob(meta['hash'])
+        return np.frombuffer(conteudo, dtype=np.dtype(meta['dtype'])).reshape(meta['forma'])
+
+    def estado_politica(self):
+        # state_dict da policy (torch), para policy.load_state_dict
+        import collections
+        import torch
+        return collections.OrderedDict((chave, torch.from_numpy(self.tensor(chave).copy()))
+                                       for chave in self.manifesto['politica'])
+
+    def normalizador_bytes(self):
+        h = self.manifesto['normalizador']
+        return self.armazem.ler_blob(h) if h else None
+
+    def normalizador(self):
+        # VecNormalize sem venv (igual ao pickle.load do VecNormalize.load, antes do set_venv)
+        conteudo = self.normalizador_bytes()
+        return pickle.loads(conteudo) if conteudo is not None else None
+
+    def _camadas(self, rede, cabeca):
+        prefixo = f"mlp_extractor.{rede}."
+        indices = sorted({int(c[len(prefixo):].split('.')[0]) for c in self.manifesto['politica']
+                          if c.startswith(prefixo)})
+        nomes = [f"{prefixo}{i}" for i in indices] + [cabeca]
+        return [(self.tensor(f"{n}.weight").T.astype(np.float32), self.tensor(f"{n}.bias").astype(np.float32))
+                for n in nomes]
+
+    def _ativacao(self):
+        kwargs = self.dados('policy_kwargs').get('policy_kwargs') or {}
+        ativacao = kwargs.get('activation_fn')
+        if ativacao is None:
+            return 'tanh'  # padrão do ActorCriticPolicy
+        # O SB3 guarda a classe como texto legível ao lado do pickle: "<class '...Tanh'>"
+        nome = str(ativacao).rsplit('.', 1)[-1].strip("'>").lower()
+        if nome not in ATIVACOES_SB3:
+            raise ValueError(f"Ativação não suportada: {ativacao}")
+        return ATIVACOES_SB3[nome]
+
+    def politica_numpy(self):
+        # Mesma PoliticaNumpy do politica_numpy.py, montada direto dos blobs:
+        # não abre o otimizador nem o 'data' inteiro (só o policy_kwargs)
+        validas = ('mlp_extractor.', 'action_net.', 'value_net.')
+        estranhas = [c for c in self.manifesto['politica'] if not c.startswith(validas)]
+        if estranhas:
+            raise ValueError(f"Só políticas MLP (FlattenExtractor) viram PoliticaNumpy: {estranhas}")
+        arrays = {}
+        for ramo, rede, cabeca in (('pi', 'policy_net', 'action_net'), ('vf', 'value_net', 'value_net')):
+            camadas = self._camadas(rede, cabeca)
+            for k, (W, b) in enumerate(camadas):
+                arrays[f'{ramo}_W{k}'] = W
+                arrays[f'{ramo}_b{k}'] = b
+            arrays[f'{ramo}_n'] = np.array(len(camadas))
+        norm = self.normalizador()
+        norm = arrays_normalizador(norm) if norm is not None else None
+        if norm is not None:
+            arrays.update(norm)
+        arrays['meta'] = np.array(json.dumps({
+            'formato': FORMATO_NUMPY,
+            'versao': VERSAO_NUMPY,
+            'ativacao': self._ativacao(),
+            'n_acoes': int(arrays[f"pi_W{int(arrays['pi_n']) - 1}"].shape[1]),
+            'dim_obs': int(arrays['pi_W0'].shape[0]),
+            'normalizado': norm is not None,
+            'origem': {'armazem': self.armazem.raiz, 'checkpoint': self.nome},
+        }))
+        return PoliticaNumpy(arrays)
+
+    def exportar(self, destino, destino_normalizador=None):
+        # Remonta o zip do SB3 (PPO.load aceita; destino pode ser um BytesIO)
+        import torch
+        pth = io.BytesIO()
+        torch.save(self.estado_politica(), pth)
+        with zipfile.ZipFile(destino, 'w') as z:
+            z.writestr('data', json.dumps(self.dados(), indent=4))
+            z.writestr('policy.pth', pth.getvalue())
+            for membro, h in self.manifesto['outros']:
+                z.writestr(membro, self.armazem.ler_blob(h))
+        if destino_normalizador and self.manifesto['normalizador']:
+            _salvar_atomico(os.path.abspath(destino_normalizador), self.normalizador_bytes())
+        return destino
+
+
+# === ENDEREÇOS E AJUDANTES ===
+def eh_armazem(modelo):
+    return isinstance(modelo, str) and modelo.startswith('armazem:')
+
+
+def abrir_endereco(endereco):
+    # "armazem:<raiz>#<nome>" (raiz vazia = ARMAZEM_PADRAO)
+    raiz, _, nome = endereco[len('armazem:'):].partition('#')
+    return Armazem(raiz or ARMAZEM_PADRAO).abrir(nome)
+
+
+def modelos_do_armazem(raiz, incluir_ckpt=False):
+    # No formato do torneio.descobrir_modelos, já com o hash (sem ler os blobs)
+    armazem = Armazem(raiz)
+    modelos = []
+    for nome in armazem.checkpoints():
+        if os.path.basename(nome).startswith('ckpt') and not incluir_ckpt:
+            continue
+        checkpoint = armazem.abrir(nome)
+        modelos.append({'modelo': checkpoint.endereco, 'normalizador': None,
+                        'hash': checkpoint.manifesto.get('hash_origem') or checkpoint.manifesto['id']})
+    return modelos
+
+
+def nome_padrao(modelo, raiz=None):
+    # <caminho a partir da raiz da importação, sem .zip> (FASE5_FINAL/models/CAMPEAO_5V5);
+    # sem raiz, ou direto nela: <pasta do modelo>/<nome>. A pasta vira a série do delta
+    caminho = os.path.abspath(modelo)
+    if caminho.endswith('.zip'):
+        caminho = caminho[:-4]
+    if raiz is not None:
+        relativo = os.path.relpath(caminho, os.path.abspath(raiz))
+        if not relativo.startswith(os.pardir) and os.path.dirname(relativo):
+            return relativo.replace(os.sep, '/')
+    return f"{os.path.basename(os.path.dirname(caminho))}/{os.path.basename(caminho)}"
+
+
+def _ordem(modelo):
+    # ckpt_5v5_2000000_steps.zip -> 2000000; sem número vai para o fim (o final do treino)
+    numeros = re.findall(r'(\d+)_steps', os.path.basename(modelo))
+    return (0, int(numeros[-1])) if numeros else (1, os.path.getmtime(modelo))
+
+
+def _tamanho(caminho):
+    if os.path.isfile(caminho):
+        return os.path.getsize(caminho)
+    return sum(os.path.getsize(os.path.join(p, a)) for p, _, arqs in os.walk(caminho) for a in arqs)
+
+
+def medir_carga(checkpoint):
+    # Política para avaliação direto do armazém x PPO.load do zip remontado
+    from stable_baselines3 import PPO
+    inicio = time.perf_counter()
+    checkpoint.politica_numpy()
+    armazem = time.perf_counter() - inicio
+    buf = io.BytesIO()
+    checkpoint.exportar(buf)
+    buf.seek(0)
+    inicio = time.perf_counter()
+    PPO.load(buf, device="cpu")
+    return {'armazem_ms': armazem * 1000, 'ppo_load_ms': (time.perf_counter() - inicio) * 1000}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Armazém de checkpoints com deduplicação e leitura preguiçosa.")
+    parser.add_argument('--armazem', default=ARMAZEM_PADRAO)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_imp = sub.add_parser('importar', help="Importa os modelos (e ckpt_*) destas pastas")
+    p_imp.add_argument('pastas', nargs='+')
+    p_imp.add_argument('--sem-ckpt', action='store_true')
+    p_imp.add_argument('--sem-delta', action='store_true')
+    sub.add_parser('listar')
+    sub.add_parser('estatisticas')
+    p_exp = sub.add_parser('exportar', help="Remonta o zip do SB3 (e o vec_normalize)")
+    p_exp.add_argument('nome')
+    p_exp.add_argument('destino')
+    p_exp.add_argument('--normalizador', default=None, help="Onde gravar o vec_normalize .pkl")
+    p_tempo = sub.add_parser('tempo', help="Tempo de carga: armazém x PPO.load")
+    p_tempo.add_argument('nome')
+    p_rem = sub.add_parser('remover')
+    p_rem.add_argument('nomes', nargs='+')
+    sub.add_parser('coletar', help="Apaga os blobs que nenhum checkpoint usa")
+    args = parser.parse_args()
+
+    armazem = Armazem(args.armazem)
+    if args.comando == 'importar':
+        importados = armazem.importar_pastas(args.pastas, incluir_ckpt=not args.sem_ckpt, delta=not args.sem_delta)
+        print(f"📦 {len(importados)} checkpoints importados em {armazem.raiz}")
+    elif args.comando == 'listar':
+        for nome in armazem.checkpoints():
+            m = armazem.abrir(nome).manifesto
+            normalizado = "🧮" if m['normalizador'] else "  "
+            print(f"   {normalizado} {nome:60s} passo {m['passo'] or '-':>10}  {m['bytes_origem'] / 1024:8.0f} KB")
+    elif args.comando == 'estatisticas':
+        e = armazem.estatisticas()
+        print(f"📦 {e['checkpoints']} checkpoints, {e['blobs']} blobs ({e['blobs_delta']} em delta)")
+        print(f"   Original: {e['bytes_origem'] / 2 ** 20:.1f} MB  ->  armazém: {e['bytes_disco'] / 2 ** 20:.1f} MB"
+              + (f"  (x{e['reducao']:.1f} menor)" if e['reducao'] else ""))
+    elif args.comando == 'exportar':
+        armazem.abrir(args.nome).exportar(args.destino, args.normalizador)
+        print(f"💾 {args.destino}" + (f" + {args.normalizador}" if args.normalizador else ""))
+    elif args.comando == 'tempo':
+        t = medir_carga(armazem.abrir(args.nome))
+        print(f"⏱️  Armazém (só a policy): {t['armazem_ms']:.1f} ms   PPO.load: {t['ppo_load_ms']:.1f} ms")
+    elif args.comando == 'remover':
+        for nome in args.nomes:
+            armazem.remover(nome)
+        print(f"🗑️  {len(args.nomes)} manifestos removidos (rode 'coletar' para liberar os blobs)")
+    else:
+        removidos, liberados = armazem.coletar_lixo()
+        print(f"🧹 {removidos} blobs apagados, {liberados / 2 ** 20:.1f} MB liberados")
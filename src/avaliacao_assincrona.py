@@ -0,0 +1,176 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecNormalize, unwrap_vec_wrapper
+import json
+import multiprocessing as mp
+import os
+import queue
+import traceback
+
+from checkpoint_assincrono import fotografar, gravar_zip
+
+# ==============================================================================
+# AVALIAÇÃO DURANTE O TREINO SEM PARAR O TREINO
+# ==============================================================================
+# O EvalCallback do SB3 joga os episódios de avaliação no meio do treino e
+# trava os rollouts (minutos no 5_vs_5). Aqui o callback só tira uma foto em
+# memória do modelo e do VecNormalize (o fotografar do checkpoint_assincrono.py)
+# e manda para um processo avaliador em segundo plano. Ele grava o zip/pkl e usa
+# o avaliador.py com o próprio pool de ambientes. O treino continua; quando o
+# resultado volta ele vai para o TensorBoard (eval/*) e, se for o melhor até
+# agora, a foto vira:
+#
+#   <pasta>/best_model.zip + <pasta>/vec_normalize.pkl   (+ best.json com o resumo)
+#
+# No máximo uma avaliação por vez: se a anterior ainda não voltou, a próxima
+# foto é adiada em vez de formar fila.
+#
+# No fim do treino sem esperar_no_fim, o avaliador recebe o sinal de parar: sai
+# do laço de episódios, fecha o pool (workers e memória compartilhada) e
+# termina. O terminate() fica só para quando ele não responde em ESPERA_PARAR_S.
+
+ESPERA_PARAR_S = 60
+
+
+def _processo_avaliador(pedidos, respostas, parar, config):
+    # Importado aqui: o processo principal não precisa carregar o avaliador
+    from avaliador import avaliar
+    while not parar.is_set():
+        pedido = pedidos.get()
+        if pedido is None:
+            break
+        foto = pedido.pop('foto')
+        try:
+            gravar_zip(pedido['modelo'], foto)
+            if pedido['normalizador'] is not None:
+                with open(pedido['normalizador'], 'wb') as f:
+                    f.write(foto['normalizador'])
+            resumo = avaliar(pedido['modelo'], normalizador=pedido['normalizador'], parar=parar, **config)
+            if resumo is None:
+                break
+            respostas.put({**pedido, 'resumo': resumo})
+        except Exception:
+            respostas.put({**pedido, 'erro': traceback.format_exc()})
+
+
+class AsyncEvalCallback(BaseCallback):
+    def __init__(self, eval_freq, pasta, cenario='5_vs_5', n_episodios=100, n_envs=8, seed=0,
+                 dificuldade=None, esperar_no_fim=True, start_method=None, **kwargs):
+        super().__init__()
+        self.eval_freq = eval_freq
+        self.pasta = pasta
+        self.pasta_fotos = os.path.join(pasta, "fotos")
+        self.esperar_no_fim = esperar_no_fim
+        self.config = dict(cenario=cenario, n_episodios=n_episodios, n_envs=n_envs, seed=seed,
+                           dificuldade=dificuldade, **kwargs)
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        self._ctx = mp.get_context(start_method)
+        self._processo = None
+        self._parar = None
+        self._pedidos = None
+        self._respostas = None
+        self._em_andamento = None
+        self._proxima = eval_freq
+        self.melhor_media = -float('inf')
+
+    def _on_training_start(self) -> None:
+        os.makedirs(self.pasta_fotos, exist_ok=True)
+        melhor = os.path.join(self.pasta, "best.json")
+        if os.path.exists(melhor):
+            # Continuando um treino: só troca o best_model se superar o anterior
+            with open(melhor) as f:
+                self.melhor_media = json.load(f)['media']
+        self._vec_normalize = unwrap_vec_wrapper(self.training_env, VecNormalize)
+        self._pedidos = self._ctx.Queue()
+        self._respostas = self._ctx.Queue()
+        self._parar = self._ctx.Event()
+        # Não pode ser daemon: o avaliador abre o próprio pool de processos
+        self._processo = self._ctx.Process(target=_processo_avaliador,
+                                           args=(self._pedidos, self._respostas, self._parar, self.config))
+        self._processo.start()
+        self._proxima = self.num_timesteps + self.eval_freq
+
+    def _tirar_foto(self):
+        # Na thread do treino só a cópia em memória; o zip é gravado pelo avaliador
+        passos = self.num_timesteps
+        foto = fotografar(self.model, self._vec_normalize)
+        modelo = os.path.join(self.pasta_fotos, f"modelo_{passos}.zip")
+        normalizador = None
+        if self._vec_normalize is not None:
+            normalizador = os.path.join(self.pasta_fotos, f"vec_normalize_{passos}.pkl")
+        self._em_andamento = {'passos': passos, 'modelo': modelo, 'normalizador': normalizador}
+        self._pedidos.put({**self._em_andamento, 'foto': foto})
+
+    def _descartar(self, resposta):
+        for caminho in (resposta['modelo'], resposta['normalizador']):
+            if caminho is not None and os.path.exists(caminho):
+                os.remove(caminho)
+
+    def _processar(self, resposta):
+        self._em_andamento = None
+        if 'erro' in resposta:
+            print(f"❌ Avaliação do passo {resposta['passos']} falhou:\n{resposta['erro']}")
+            self._descartar(resposta)
+            return
+        r = resposta['resumo']
+        self.logger.record('eval/saldo_medio', r['media'])
+        self.logger.record('eval/saldo_ic95_inferior', r['ic95'][0])
+        self.logger.record('eval/vitorias', r['vitorias'])
+        self.logger.record('eval/gols_pro', r['gols_pro_medio'])
+        self.logger.record('eval/gols_contra', r['gols_contra_medio'])
+        self.logger.record('eval/passos_medio', r['passos_medio'])
+        self.logger.record('eval/passo_da_foto', resposta['passos'])
+        print(f"\n📊 Avaliação do passo {resposta['passos']}: saldo {r['media']:+.3f} "
+              f"(IC95% {r['ic95'][0]:+.3f} a {r['ic95'][1]:+.3f}), vitórias {r['vitorias']:.1%}")
+        if r['media'] <= self.melhor_media:
+            self._descartar(resposta)
+            return
+        self.melhor_media = r['media']
+        os.replace(resposta['modelo'], os.path.join(self.pasta, "best_model.zip"))
+        destino_norm = os.path.join(self.pasta, "vec_normalize.pkl")
+        if resposta['normalizador'] is not None:
+            os.replace(resposta['normalizador'], destino_norm)
+        elif os.path.exists(destino_norm):
+            os.remove(destino_norm)  # não deixa um normalizador de outro modelo no par
+        with open(os.path.join(self.pasta, "best.json"), 'w') as f:
+            json.dump({'passos': resposta['passos'], **r}, f, indent=2)
+        print(f"🏅 Novo best_model.zip (passo {resposta['passos']})")
+
+    def _coletar(self, bloquear=False):
+        try:
+            resposta = self._respostas.get(block=bloquear)
+        except queue.Empty:
+            return
+        self._processar(resposta)
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps >= self._proxima:
+            if self._em_andamento is not None:
+                self._coletar()
+            if self._em_andamento is None:
+                self._tirar_foto()
+                self._proxima = self.num_timesteps + self.eval_freq
+        return True
+
+    def _on_rollout_end(self) -> None:
+        if self._em_andamento is not None:
+            self._coletar()
+
+    def _on_training_end(self) -> None:
+        if self._em_andamento is not None and self.esperar_no_fim:
+            print("⏳ Esperando a última avaliação terminar...")
+            self._coletar(bloquear=True)
+            self.logger.dump(self.num_timesteps)
+        if self._em_andamento is not None:
+            self._parar.set()
+        self._pedidos.put(None)
+        self._processo.join(timeout=ESPERA_PARAR_S)
+        if self._processo.is_alive():
+            print(f"⚠️ O avaliador não parou em {ESPERA_PARAR_S}s: encerrando à força")
+            self._processo.terminate()
+            self._processo.join()
+        # Uma foto que o avaliador não chegou a ler não pode segurar a saída do processo
+        self._pedidos.cancel_join_thread()
+        if self._em_andamento is not None:
+            self._descartar(self._em_andamento)
+            self._em_andamento = None
@@ -0,0 +1,222 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.utils import set_random_seed
+from stable_baselines3.common.vec_env import VecNormalize
+from functools import partial
+import argparse
+import json
+import time
+import numpy as np
+
+from ambientes import criar_env
+from armazem_checkpoints import abrir_endereco, eh_armazem
+from politica_numpy import PoliticaNumpy, eh_politica_numpy
+from servidor_inferencia import conectar, eh_servidor
+from vec_env_paralelo import SharedMemoryVecEnv
+from vec_sanitize import VecSanitize
+
+# ==============================================================================
+# AVALIAÇÃO EM LOTE (centenas de jogos em paralelo)
+# ==============================================================================
+# Joga N episódios espalhados por um pool de processos. A cada passo a política
+# roda UMA vez para todos os ambientes que ainda têm jogos a cumprir. Cada
+# ambiente recebe uma cota fixa de episódios antes de começar, assim episódios
+# curtos não ficam super-representados no resultado.
+#
+#   python3 src/avaliador.py modelo.zip --normalizador vec_normalize_5v5.pkl \
+#       --episodios 300 --dificuldade 0.25
+#   python3 src/avaliador.py modelo.npz --episodios 300   # exportado pelo politica_numpy.py
+#   python3 src/avaliador.py unix:/tmp/gfootball_inferencia.sock#padrao   # servidor_inferencia.py
+
+
+def criar_vec_avaliacao(cenario, n_envs, seed=0, normalizador=None, dificuldade=None, rewards='scoring',
+                        **kwargs):
+    # 'dificuldade' pode ser um valor só ou uma lista com um valor por ambiente
+    config = dict(kwargs.pop('other_config_options', {}) or {})
+    # O motor ignora o 'difficulty' da config: vira o DificuldadeAjustavel (ambientes.py)
+    padrao = config.pop('difficulty', None)
+    if dificuldade is None:
+        dificuldade = padrao
+    if np.ndim(dificuldade) == 0:
+        dificuldade = [dificuldade] * n_envs
+    env_fns = []
+    for i in range(n_envs):
+        config_env = dict(config, game_engine_random_seed=seed + i)
+        env_fns.append(partial(criar_env, cenario, rewards, seed=seed + i, monitor=False,
+                               dificuldade=dificuldade[i], other_config_options=config_env, **kwargs))
+    vec_env = VecSanitize(SharedMemoryVecEnv(env_fns, copiar_obs=False))
+    vec_env.seed(seed)
+    if normalizador is not None:
+        vec_env = VecNormalize.load(normalizador, vec_env)
+        vec_env.training = False
+        vec_env.norm_reward = False
+    return vec_env
+
+
+def carregar_politica(modelo, normalizador=None):
+    # .npz exportado pelo politica_numpy.py já traz a normalização dentro dele,
+    # e o servidor de inferência ("unix:<socket>#<nome>") também normaliza do lado dele.
+    # Do armazém ("armazem:<raiz>#<nome>") só saem os pesos da policy e a normalização
+    if eh_politica_numpy(modelo) or eh_servidor(modelo) or eh_armazem(modelo):
+        if eh_servidor(modelo):
+            politica = conectar(modelo)
+        elif eh_armazem(modelo):
+            politica = abrir_endereco(modelo).politica_numpy()
+        else:
+            politica = PoliticaNumpy.carregar(modelo)
+        if normalizador is not None and getattr(politica, 'normalizado', True):
+            print("⚠️ A política já normaliza a observação: ignorando o --normalizador")
+            normalizador = None
+        return politica, normalizador
+    if isinstance(modelo, str):
+        modelo = PPO.load(modelo, device="cpu")
+    return modelo, normalizador
+
+
+def _score_reward(infos):
+    return np.fromiter((info.get('score_reward', 0.0) for info in infos), dtype=np.float64, count=len(infos))
+
+
+def dividir_cotas(n_episodios, n_envs):
+    # Cota de episódios por ambiente (difere no máximo em 1)
+    return np.array([len(c) for c in np.array_split(np.arange(n_episodios), n_envs)])
+
+
+def jogar_episodios(model, vec_env, cotas, deterministic=True, parar=None):
+    # parar: Event opcional; quando ligado o laço sai antes de cumprir as cotas
+    n_envs = vec_env.num_envs
+    cotas = np.array(cotas, dtype=np.int64)
+    gols_pro = np.zeros(n_envs, dtype=np.int64)
+    gols_contra = np.zeros(n_envs, dtype=np.int64)
+    passos = np.zeros(n_envs, dtype=np.int64)
+    resultados = []  # (gols_pro, gols_contra, passos, ambiente) por episódio
+
+    acoes = np.zeros((n_envs, *vec_env.action_space.shape), dtype=np.int64)
+    obs = vec_env.reset()
+    while (cotas > 0).any():
+        if parar is not None and parar.is_set():
+            break
+        vivos = cotas > 0
+        acoes[vivos] = model.predict(obs[vivos], deterministic=deterministic)[0]
+        obs, _, dones, infos = vec_env.step(acoes)
+        score = _score_reward(infos)
+        gols_pro += score > 0
+        gols_contra += score < 0
+        passos += 1
+        for i in np.flatnonzero(dones & vivos):
+            resultados.append((gols_pro[i], gols_contra[i], passos[i], i))
+            cotas[i] -= 1
+        gols_pro[dones] = 0
+        gols_contra[dones] = 0
+        passos[dones] = 0
+    return np.array(resultados, dtype=np.int64).reshape(-1, 4)
+
+
+def resumir(resultados, duracao):
+    pro, contra, passos = resultados[:, 0], resultados[:, 1], resultados[:, 2]
+    saldo = (pro - contra).astype(np.float64)
+    n = len(saldo)
+    media = float(saldo.mean())
+    # IC de 95% pela aproximação normal (n grande)
+    margem = 1.96 * float(saldo.std(ddof=1)) / np.sqrt(n) if n > 1 else float('inf')
+    return {
+        'episodios': n,
+        'media': media,
+        'ic95': [media - margem, media + margem],
+        'vitorias': float((saldo > 0).mean()),
+        'empates': float((saldo == 0).mean()),
+        'derrotas': float((saldo < 0).mean()),
+        'gols_pro_medio': float(pro.mean()),
+        'gols_contra_medio': float(contra.mean()),
+        'passos_medio': float(passos.mean()),
+        'segundos': duracao,
+        'episodios_por_seg': n / duracao,
+    }
+
+
+def avaliar(modelo, cenario='5_vs_5', n_episodios=200, n_envs=16, seed=0, normalizador=None,
+            dificuldade=None, deterministic=True, parar=None, **kwargs):
+    # Interrompida pelo 'parar' (avaliacao_assincrona.py): fecha o pool e devolve None
+    set_random_seed(seed)
+    modelo, normalizador = carregar_politica(modelo, normalizador)
+    n_envs = min(n_envs, n_episodios)
+    vec_env = criar_vec_avaliacao(cenario, n_envs, seed=seed, normalizador=normalizador,
+                                  dificuldade=dificuldade, **kwargs)
+    try:
+        inicio = time.perf_counter()
+        resultados = jogar_episodios(modelo, vec_env, dividir_cotas(n_episodios, n_envs),
+                                     deterministic=deterministic, parar=parar)
+        duracao = time.perf_counter() - inicio
+    finally:
+        vec_env.close()
+    if parar is not None and parar.is_set():
+        return None
+    resumo = resumir(resultados, duracao)
+    resumo.update({'cenario': cenario, 'dificuldade': dificuldade, 'seed': seed})
+    return resumo
+
+
+def avaliar_dificuldades(modelo, dificuldades, cenario='5_vs_5', n_episodios=100, n_envs=16, seed=0,
+                         normalizador=None, deterministic=True, **kwargs):
+    # Todas as dificuldades no mesmo pool: os ambientes são divididos entre elas
+    # e a política continua rodando uma vez por passo para o lote inteiro.
+    # Resultado indexado pela dificuldade: repetidas são jogadas uma vez só
+    dificuldades = list(dict.fromkeys(dificuldades))
+    set_random_seed(seed)
+    modelo, normalizador = carregar_politica(modelo, normalizador)
+    n_envs = max(len(dificuldades), min(n_envs, n_episodios * len(dificuldades)))
+    grupos = np.array_split(np.arange(n_envs), len(dificuldades))
+    por_env = [None] * n_envs
+    cotas = np.zeros(n_envs, dtype=np.int64)
+    for d, grupo in zip(dificuldades, grupos):
+        for i in grupo:
+            por_env[i] = d
+        cotas[grupo] = dividir_cotas(n_episodios, len(grupo))
+    vec_env = criar_vec_avaliacao(cenario, n_envs, seed=seed, normalizador=normalizador,
+                                  dificuldade=por_env, **kwargs)
+    try:
+        inicio = time.perf_counter()
+        resultados = jogar_episodios(modelo, vec_env, cotas, deterministic=deterministic)
+        duracao = time.perf_counter() - inicio
+    finally:
+        vec_env.close()
+    resumos = {}
+    for d, grupo in zip(dificuldades, grupos):
+        resumo = resumir(resultados[np.isin(resultados[:, 3], grupo)], duracao)
+        resumo.update({'cenario': cenario, 'dificuldade': d, 'seed': seed})
+        resumos[d] = resumo
+    return resumos
+
+
+def imprimir_relatorio(r):
+    print("-" * 50)
+    print(f"📊 {r['episodios']} jogos em {r['cenario']} (dificuldade {r['dificuldade']}, seed {r['seed']})")
+    print(f"   Saldo médio: {r['media']:.4f}  (IC95%: {r['ic95'][0]:.3f} a {r['ic95'][1]:.3f})")
+    print(f"   Vitórias: {r['vitorias']:.1%}  Empates: {r['empates']:.1%}  Derrotas: {r['derrotas']:.1%}")
+    print(f"   Gols pró/contra por jogo: {r['gols_pro_medio']:.2f} / {r['gols_contra_medio']:.2f}")
+    print(f"   Velocidade: {r['episodios_por_seg']:.2f} episódios/s ({r['segundos']:.0f}s)")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avalia um modelo em centenas de jogos em paralelo.")
+    parser.add_argument('modelo')
+    parser.add_argument('--normalizador', default=None)
+    parser.add_argument('--cenario', default='5_vs_5')
+    parser.add_argument('--episodios', type=int, default=200)
+    parser.add_argument('--n-envs', type=int, default=16)
+    parser.add_argument('--dificuldade', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help="Salva o resumo neste arquivo")
+    parser.add_argument('--dumps', default=None,
+                        help="Grava o .dump de cada gol nesta pasta (vídeo depois: renderizador_replays.py)")
+    args = parser.parse_args()
+
+    extras = {}
+    if args.dumps:
+        extras = dict(write_goal_dumps=True, dump_frequency=1, logdir=args.dumps)
+    resumo = avaliar(args.modelo, cenario=args.cenario, n_episodios=args.episodios, n_envs=args.n_envs,
+                     seed=args.seed, normalizador=args.normalizador, dificuldade=args.dificuldade, **extras)
+    imprimir_relatorio(resumo)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resumo, f, indent=2)
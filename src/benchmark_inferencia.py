@@ -0,0 +1,140 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.policies import ActorCriticPolicy
+from gymnasium import spaces
+import argparse
+import json
+import time
+import numpy as np
+import torch
+
+from ambientes import DIM_QUADRO, N_ACOES, N_QUADROS, MockFootballEnv
+from politica_fundida import PoliticaFundida
+from politica_numpy import PoliticaNumpy, empacotar, ler_normalizador
+
+# ==============================================================================
+# BENCHMARK DE INFERÊNCIA (latência e vazão por tamanho de lote)
+# ==============================================================================
+# Compara, com as mesmas observações cruas:
+#   sb3     -> normalize_obs em NumPy + policy.predict (o que os scripts fazem hoje)
+#   fundida -> PoliticaFundida (normalização dobrada na 1ª camada, torch)
+#   numpy   -> PoliticaNumpy (sem torch)
+#
+# Sem --modelo usa uma política nova do tamanho padrão e um normalizador
+# sintético (o custo não depende dos pesos):
+#   python3 src/benchmark_inferencia.py
+#   python3 src/benchmark_inferencia.py --modelo CAMPEAO_5V5.zip --normalizador vec_normalize_5v5.pkl
+
+LOTES_PADRAO = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+def _normalizador_sintetico(dim_obs, seed=0):
+    rng = np.random.RandomState(seed)
+    return {
+        'obs_media': rng.normal(0, 0.3, dim_obs).astype(np.float32),
+        'obs_var': rng.uniform(0.01, 1.0, dim_obs).astype(np.float32),
+        'clip_obs': np.array(10.0, dtype=np.float32),
+        'epsilon': np.array(1e-8, dtype=np.float32),
+    }
+
+
+def preparar(modelo=None, normalizador=None):
+    dim_obs = DIM_QUADRO * N_QUADROS
+    if modelo is not None:
+        policy = PPO.load(modelo, device="cpu").policy
+        norm = ler_normalizador(normalizador) if normalizador else None
+    else:
+        policy = ActorCriticPolicy(spaces.Box(-np.inf, np.inf, (dim_obs,), np.float32),
+                                   spaces.Discrete(N_ACOES), lr_schedule=lambda _: 0.0)
+        norm = _normalizador_sintetico(dim_obs)
+    policy.set_training_mode(False)
+    arrays = empacotar(policy, norm)
+    fundida = PoliticaFundida.de_arrays(arrays)
+    numpy_ = PoliticaNumpy(arrays)
+
+    def sb3(obs):
+        x = obs
+        if norm is not None:
+            # Igual ao VecNormalize._normalize_obs
+            x = np.clip((obs - norm['obs_media']) / np.sqrt(norm['obs_var'] + norm['epsilon']),
+                        -norm['clip_obs'], norm['clip_obs'])
+        return policy.predict(x, deterministic=True)[0]
+
+    return {
+        'sb3': sb3,
+        'fundida': lambda obs: fundida.agir(obs)[0],
+        'numpy': lambda obs: numpy_.agir(obs),
+    }
+
+
+def observacoes(n, seed=0):
+    # Quadros do MockFootballEnv: mesma forma/faixa da simple115 empilhada
+    env = MockFootballEnv(seed=seed)
+    rng = np.random.RandomState(seed)
+    obs = [env.reset()]
+    while len(obs) < n:
+        o, _, done, _ = env.step(rng.randint(N_ACOES))
+        obs.append(env.reset() if done else o)
+    return np.asarray(obs, dtype=np.float32)
+
+
+def medir(fn, obs, repeticoes=200, aquecimento=20):
+    for _ in range(aquecimento):
+        fn(obs)
+    tempos = np.empty(repeticoes)
+    for k in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(obs)
+        tempos[k] = time.perf_counter() - inicio
+    return {
+        'lote': len(obs),
+        'latencia_mediana_us': float(np.median(tempos) * 1e6),
+        'latencia_p99_us': float(np.percentile(tempos, 99) * 1e6),
+        'obs_por_seg': float(len(obs) / np.median(tempos)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência/vazão da inferência por tamanho de lote.")
+    parser.add_argument('--modelo', default=None)
+    parser.add_argument('--normalizador', default=None)
+    parser.add_argument('--lotes', type=int, nargs='+', default=LOTES_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1, help="torch.set_num_threads (1 = como num worker)")
+    parser.add_argument('--json', default=None, help="Salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    caminhos = preparar(args.modelo, args.normalizador)
+    todas = observacoes(max(args.lotes))
+
+    # As três têm que escolher as mesmas ações antes de comparar velocidade
+    referencia = caminhos['sb3'](todas)
+    for nome, fn in caminhos.items():
+        iguais = float((fn(todas) == referencia).mean())
+        print(f"🔍 {nome:8s} ações iguais ao sb3: {iguais:.2%}")
+
+    print("\n" + "=" * 80)
+    print(f"⏱️  BENCHMARK DE INFERÊNCIA ({'modelo ' + args.modelo if args.modelo else 'política nova'},"
+          f" {args.threads} thread(s))")
+    print("=" * 80)
+    resultados = []
+    for lote in args.lotes:
+        obs = todas[:lote]
+        base = None
+        for nome, fn in caminhos.items():
+            r = medir(fn, obs, repeticoes=args.repeticoes)
+            r['caminho'] = nome
+            base = base or r['latencia_mediana_us']
+            r['ganho_vs_sb3'] = base / r['latencia_mediana_us']
+            resultados.append(r)
+            print(f"   lote={lote:4d}  {nome:8s} {r['latencia_mediana_us']:9.1f} us  "
+                  f"{r['obs_por_seg']:12.0f} obs/s   (x{r['ganho_vs_sb3']:.2f})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"💾 Resultados salvos em: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+from functools import partial
+import argparse
+import datetime
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+import benchmark_vec_env
+from ambientes import JOGADORES_POR_CENARIO, MockFootballEnv, criar_env
+
+# ==============================================================================
+# SUÍTE DE BENCHMARKS (rollout, memória, update do PPO, inferência)
+# ==============================================================================
+# Junta o benchmark_vec_env.py e o benchmark_inferencia.py numa varredura só,
+# com um relatório JSON que dá para comparar entre máquinas e commits:
+#
+#   vec_env     passos/s e memória por env para cada backend x número de envs
+#               x cenário
+#   ppo         tempo do model.train() (as épocas do PPO) por n_steps x batch_size
+#   inferencia  latência/vazão por tamanho de lote (sb3, fundida, numpy)
+#
+# Sem o jogo instalado usa o MockFootballEnv (determinístico pela seed), com um
+# custo artificial por passo proporcional ao número de jogadores do cenário:
+# roda em CI e serve para comparar commits entre si, não para prever o motor.
+#
+#   python3 src/benchmark_suite.py --rapido --saida benchmark.json     # CI
+#   python3 src/benchmark_suite.py --real --saida benchmark_5v5.json   # com o gfootball
+#
+# Com forkserver/spawn cada worker reimporta este script: torch, SB3 e
+# curriculo só são importados dentro das seções, e um worker do 'shm' sobe só
+# com o worker_paralelo e o ambientes. O relatório é regravado a cada medição
+# ('status': 'em andamento' até o fim): se a máquina matar a suíte no meio,
+# o que já foi medido fica no arquivo.
+#
+# Memória: mb_por_env = (PSS dos workers - workers x PSS de um processo parado
+# iniciado do mesmo jeito) / n_envs, ou seja, sem o interpretador e os imports
+# de cada worker (que saem em mb_base_processo). No dummy é o quanto o processo
+# principal cresceu. O mock quase não ocupa memória (fica perto de 0): o número
+# que interessa é o do --real.
+#
+# Escolher n_envs: o maior número antes de os passos/s pararem de crescer ou a
+# memória por env estourar a máquina (em vez de "se der erro volte para 8").
+
+N_ENVS_PADRAO = [1, 2, 4, 8, 16, 32, 64]
+CENARIOS_PADRAO = list(JOGADORES_POR_CENARIO)
+N_STEPS_PADRAO = [512, 1024, 2048]
+BATCH_SIZE_PADRAO = [64, 256, 1024]
+
+# Envs do treino PPO curto (seção do rollout + update)
+PPO_N_ENVS_PADRAO = 8
+
+# Perfil de CI: pouco tempo e pouca memória, mesmas seções (o subproc fica de
+# fora: cada worker dele importa o SB3 e o torch)
+RAPIDO = dict(n_envs=[1, 2, 4], cenarios=['academy_empty_goal_close', '5_vs_5'], backends=['dummy', 'shm'],
+              passos=200, n_steps=[128], batch_size=[64], ppo_n_envs=2, lotes=[1, 16], repeticoes=20)
+
+
+# === MEMÓRIA ===
+def memoria_kb(pid):
+    # PSS (páginas compartilhadas divididas entre os processos) quando o kernel expõe;
+    # senão RSS. Só Linux: em outros sistemas volta None
+    for arquivo, campo in (('smaps_rollup', 'Pss:'), ('status', 'VmRSS:')):
+        try:
+            with open(f"/proc/{pid}/{arquivo}") as f:
+                for linha in f:
+                    if linha.startswith(campo):
+                        return int(linha.split()[1])
+        except OSError:
+            continue
+    return None
+
+
+def memoria_processo_parado_kb(start_method=None):
+    # PSS de um processo que não faz nada, iniciado como os workers (interpretador
+    # + o que o script principal importa): é o piso de cada worker
+    if start_method is None:
+        start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+    processo = mp.get_context(start_method).Process(target=time.sleep, args=(60,), daemon=True)
+    processo.start()
+    try:
+        anterior = None
+        for _ in range(50):
+            time.sleep(0.1)
+            atual = memoria_kb(processo.pid)
+            if atual is not None and atual == anterior:
+                break
+            anterior = atual
+        return atual
+    finally:
+        processo.terminate()
+        processo.join()
+
+
+def _medidor_memoria(base_kb, base_processo_kb):
+    def ao_fim(vec_env):
+        processos = getattr(vec_env, 'processes', None)
+        if processos:
+            kbs = [memoria_kb(p.pid) for p in processos]
+            if None in kbs or base_processo_kb is None:
+                return {'mb_por_env': None}
+            total = sum(kbs)
+            liquido = max(total - len(kbs) * base_processo_kb, 0)
+            shm = getattr(vec_env, '_shm', None)
+            if shm is not None:
+                total += shm.size / 1024
+                liquido += shm.size / 1024
+            extras = {'mb_base_processo': base_processo_kb / 1024}
+        else:
+            atual = memoria_kb(os.getpid())
+            if atual is None or base_kb is None:
+                return {'mb_por_env': None}
+            total = liquido = max(atual - base_kb, 0)
+            extras = {}
+        return {'mb_total': total / 1024, 'mb_por_env': liquido / 1024 / vec_env.num_envs, **extras}
+    return ao_fim
+
+
+# === SEÇÕES ===
+def _fabricas(cenario, n_envs, real, custo_us_por_jogador, seed=0):
+    if real:
+        return [partial(criar_env, cenario, 'scoring', mock=False, monitor=False, seed=seed + i)
+                for i in range(n_envs)]
+    custo = custo_us_por_jogador * sum(JOGADORES_POR_CENARIO.get(cenario, (5, 5)))
+    return [partial(MockFootballEnv, env_name=cenario, seed=seed + i, custo_step_us=custo) for i in range(n_envs)]
+
+
+# Cada seção é um gerador: um resultado por medição, para o relatório ir sendo gravado
+def secao_vec_env(cenarios, n_envs, backends, passos, real=False, custo_us_por_jogador=50, seed=0):
+    base_processo_kb = memoria_processo_parado_kb() if set(backends) - {'dummy'} else None
+    for cenario in cenarios:
+        for n in n_envs:
+            for backend in backends:
+                base_kb = memoria_kb(os.getpid())
+                r = benchmark_vec_env.medir(backend, _fabricas(cenario, n, real, custo_us_por_jogador, seed),
+                                            passos=passos, seed=seed,
+                                            ao_fim=_medidor_memoria(base_kb, base_processo_kb))
+                r['cenario'] = cenario
+                mb = f"{r['mb_por_env']:7.2f} MB/env" if r.get('mb_por_env') is not None else "      - MB/env"
+                print(f"   {cenario:38s} n_envs={n:3d}  {backend:8s} {r['steps_por_seg']:10.0f} steps/s  {mb}")
+                yield r
+
+
+def secao_ppo(n_steps, batch_sizes, n_envs=PPO_N_ENVS_PADRAO, repeticoes=3, device='cpu', seed=0):
+    from stable_baselines3 import PPO
+    from curriculo import PPO_KWARGS
+    from vec_env_paralelo import SharedMemoryVecEnv
+    for ns in n_steps:
+        # Ambientes do mock sem custo artificial: aqui só o update importa
+        env = SharedMemoryVecEnv([partial(MockFootballEnv, seed=seed + i) for i in range(n_envs)])
+        for bs in batch_sizes:
+            if bs > ns * n_envs:
+                continue
+            kwargs = dict(PPO_KWARGS, n_steps=ns, batch_size=bs)
+            model = PPO("MlpPolicy", env, device=device, seed=seed, verbose=0, **kwargs)
+            # Um learn curto enche o rollout buffer; depois só o train() é cronometrado
+            inicio = time.perf_counter()
+            model.learn(total_timesteps=ns * n_envs)
+            coleta = time.perf_counter() - inicio
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                model.train()
+                tempos.append(time.perf_counter() - inicio)
+            amostras = ns * n_envs
+            r = {
+                'n_steps': ns, 'batch_size': bs, 'n_envs': n_envs, 'n_epochs': kwargs['n_epochs'],
+                'device': device,
+                'update_s': float(np.median(tempos)),
+                'amostras_por_seg_update': amostras * kwargs['n_epochs'] / float(np.median(tempos)),
+                'primeira_iteracao_s': coleta,
+            }
+            print(f"   n_steps={ns:5d} batch={bs:5d}  update {r['update_s'] * 1000:9.1f} ms  "
+                  f"({r['amostras_por_seg_update']:10.0f} amostras/s)")
+            yield r
+        env.close()
+
+
+def secao_inferencia(lotes, repeticoes, modelo=None, normalizador=None):
+    import benchmark_inferencia
+    caminhos = benchmark_inferencia.preparar(modelo, normalizador)
+    todas = benchmark_inferencia.observacoes(max(lotes))
+    for lote in lotes:
+        for nome, fn in caminhos.items():
+            r = benchmark_inferencia.medir(fn, todas[:lote], repeticoes=repeticoes)
+            r['caminho'] = nome
+            print(f"   lote={lote:4d}  {nome:8s} {r['latencia_mediana_us']:9.1f} us  {r['obs_por_seg']:12.0f} obs/s")
+            yield r
+
+
+# === AMBIENTE DA MEDIÇÃO (para o relatório ser comparável) ===
+def _commit():
+    try:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(['git', '-C', raiz, 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def maquina():
+    import stable_baselines3
+    import torch
+    return {
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'cpus_disponiveis': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None,
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'stable_baselines3': stable_baselines3.__version__,
+    }
+
+
+# === RELATÓRIO (gravado a cada medição) ===
+def salvar(relatorio, caminho):
+    # Grava ao lado e troca: quem lê o arquivo nunca vê um JSON pela metade
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w') as f:
+        json.dump(relatorio, f, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _coletar(relatorio, chave, medicoes, caminho):
+    relatorio[chave] = []
+    for r in medicoes:
+        relatorio[chave].append(r)
+        salvar(relatorio, caminho)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do rollout, do PPO e da inferência.")
+    parser.add_argument('--saida', default='benchmark.json', help="Relatório JSON")
+    parser.add_argument('--secoes', nargs='+', default=['vec_env', 'ppo', 'inferencia'],
+                        choices=['vec_env', 'ppo', 'inferencia'])
+    parser.add_argument('--rapido', action='store_true', help="Perfil de CI (poucos envs e passos)")
+    parser.add_argument('--real', action='store_true', help="Usa o gfootball em vez do mock")
+    parser.add_argument('--cenarios', nargs='+', default=None)
+    parser.add_argument('--n-envs', type=int, nargs='+', default=None)
+    parser.add_argument('--backends', nargs='+', default=None, choices=list(benchmark_vec_env.BACKENDS))
+    parser.add_argument('--passos', type=int, default=None)
+    parser.add_argument('--custo-us', type=int, default=50, help="Custo do mock por jogador em campo (us/passo)")
+    parser.add_argument('--n-steps', type=int, nargs='+', default=None)
+    parser.add_argument('--batch-size', type=int, nargs='+', default=None)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--modelo', default=None, help="Modelo para a seção de inferência")
+    parser.add_argument('--normalizador', default=None)
+    parser.add_argument('--threads', type=int, default=1, help="torch.set_num_threads")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    perfil = RAPIDO if args.rapido else {}
+    config = {
+        'cenarios': args.cenarios or perfil.get('cenarios', CENARIOS_PADRAO),
+        'n_envs': args.n_envs or perfil.get('n_envs', N_ENVS_PADRAO),
+        'backends': args.backends or perfil.get('backends', list(benchmark_vec_env.BACKENDS)),
+        'passos': args.passos or perfil.get('passos', 2000),
+        'real': args.real,
+        'custo_us_por_jogador': None if args.real else args.custo_us,
+        'n_steps': args.n_steps or perfil.get('n_steps', N_STEPS_PADRAO),
+        'batch_size': args.batch_size or perfil.get('batch_size', BATCH_SIZE_PADRAO),
+        'ppo_n_envs': perfil.get('ppo_n_envs', PPO_N_ENVS_PADRAO),
+        'lotes': perfil.get('lotes', None),
+        'repeticoes': perfil.get('repeticoes', 200),
+        'device': args.device,
+        'seed': args.seed,
+    }
+    if 'inferencia' in args.secoes and config['lotes'] is None:
+        import benchmark_inferencia
+        config['lotes'] = benchmark_inferencia.LOTES_PADRAO
+    import torch
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    relatorio = {'maquina': maquina(), 'config': config, 'status': 'em andamento'}
+    salvar(relatorio, args.saida)
+
+    print("\n" + "=" * 80)
+    print(f"⏱️  SUÍTE DE BENCHMARKS ({'gfootball' if args.real else 'mock'}, seções: {', '.join(args.secoes)})")
+    print("=" * 80)
+    inicio = time.perf_counter()
+    try:
+        if 'vec_env' in args.secoes:
+            print("\n🏃 Vec envs (passos/s e memória por env)")
+            _coletar(relatorio, 'vec_env',
+                     secao_vec_env(config['cenarios'], config['n_envs'], config['backends'], config['passos'],
+                                   real=args.real, custo_us_por_jogador=args.custo_us, seed=args.seed),
+                     args.saida)
+        if 'ppo' in args.secoes:
+            print("\n🧠 Update do PPO (model.train)")
+            _coletar(relatorio, 'ppo',
+                     secao_ppo(config['n_steps'], config['batch_size'], n_envs=config['ppo_n_envs'],
+                               device=args.device, seed=args.seed),
+                     args.saida)
+        if 'inferencia' in args.secoes:
+            print("\n⚡ Inferência por tamanho de lote")
+            _coletar(relatorio, 'inferencia',
+                     secao_inferencia(config['lotes'], config['repeticoes'], args.modelo, args.normalizador),
+                     args.saida)
+        relatorio['status'] = 'completo'
+    except Exception as e:
+        relatorio['status'] = f"erro: {e!r}"
+        raise
+    finally:
+        relatorio['duracao_s'] = time.perf_counter() - inicio
+        salvar(relatorio, args.saida)
+    print(f"\n💾 Relatório salvo em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
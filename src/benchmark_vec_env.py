@@ -0,0 +1,115 @@
+from functools import partial
+import argparse
+import json
+import time
+import numpy as np
+
+from ambientes import MockFootballEnv, criar_env
+
+# ==============================================================================
+# MICRO-BENCHMARK DOS VEC ENVS
+# ==============================================================================
+# Mede passos/segundo de DummyVecEnv, SubprocVecEnv (SB3) e SharedMemoryVecEnv
+# com o mesmo make_env. Por padrão usa o MockFootballEnv (sem o jogo), com um
+# custo artificial por passo para imitar o motor:
+#   python3 src/benchmark_vec_env.py --n-envs 8 16 32 --custo-us 500
+# Com o jogo instalado:
+#   python3 src/benchmark_vec_env.py --cenario 5_vs_5 --real
+
+# SB3 (e com ele o torch) só é importado na hora de criar o vec env: com
+# forkserver/spawn os workers reimportam o script principal, e um worker do
+# 'shm' não precisa de nada além do worker_paralelo e do make_env.
+# Os do 'subproc' importam o SB3 de qualquer jeito (o _worker mora lá).
+def _dummy(fns):
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    return DummyVecEnv(fns)
+
+
+def _subproc(fns):
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+    return SubprocVecEnv(fns)
+
+
+def _shm(fns):
+    from vec_env_paralelo import SharedMemoryVecEnv
+    return SharedMemoryVecEnv(fns)
+
+
+BACKENDS = {'dummy': _dummy, 'subproc': _subproc, 'shm': _shm}
+
+
+def _env_mock(seed, custo_step_us):
+    return MockFootballEnv(seed=seed, custo_step_us=custo_step_us)
+
+
+def fabricas(n_envs, cenario=None, custo_step_us=0):
+    if cenario is None:
+        return [partial(_env_mock, i, custo_step_us) for i in range(n_envs)]
+    return [partial(criar_env, cenario, 'scoring', mock=False, monitor=False) for _ in range(n_envs)]
+
+
+def medir(backend, env_fns, passos=2000, aquecimento=100, seed=0, ao_fim=None):
+    # ao_fim(vec_env) roda antes do close e o dicionário que ele devolve entra no resultado
+    vec_env = BACKENDS[backend](env_fns)
+    extras = {}
+    try:
+        rng = np.random.RandomState(seed)
+        n = vec_env.num_envs
+        acoes = rng.randint(vec_env.action_space.n, size=(aquecimento + passos, n))
+        vec_env.reset()
+        for t in range(aquecimento):
+            vec_env.step(acoes[t])
+        inicio = time.perf_counter()
+        for t in range(aquecimento, aquecimento + passos):
+            vec_env.step(acoes[t])
+        duracao = time.perf_counter() - inicio
+        if ao_fim is not None:
+            extras = ao_fim(vec_env)
+    finally:
+        vec_env.close()
+    return {
+        'backend': backend,
+        'n_envs': n,
+        'passos': passos,
+        'segundos': duracao,
+        'steps_por_seg': passos * n / duracao,
+        **extras,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara backends de vec env (passos/segundo).")
+    parser.add_argument('--n-envs', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--passos', type=int, default=2000)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--custo-us', type=int, default=0,
+                        help="Custo artificial por passo do MockFootballEnv (microssegundos)")
+    parser.add_argument('--cenario', default=None, help="Cenário real do gfootball (ex: 5_vs_5)")
+    parser.add_argument('--real', action='store_true', help="Usa o gfootball em vez do mock")
+    parser.add_argument('--json', default=None, help="Salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    cenario = (args.cenario or '5_vs_5') if args.real else None
+    print("\n" + "=" * 80)
+    print(f"⏱️  BENCHMARK DE VEC ENVS ({cenario or 'mock'}, custo {args.custo_us}us/passo)")
+    print("=" * 80)
+
+    resultados = []
+    for n_envs in args.n_envs:
+        base = None
+        for backend in args.backends:
+            r = medir(backend, fabricas(n_envs, cenario, args.custo_us), passos=args.passos)
+            base = base or r['steps_por_seg']
+            r['ganho_vs_primeiro'] = r['steps_por_seg'] / base
+            resultados.append(r)
+            print(f"   n_envs={n_envs:3d}  {backend:8s} {r['steps_por_seg']:12.0f} steps/s"
+                  f"   (x{r['ganho_vs_primeiro']:.2f})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"💾 Resultados salvos em: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper, VecNormalize, unwrap_vec_wrapper
+from functools import partial
+from collections import Counter
+import argparse
+import gym
+import numpy as np
+import os
+
+from ambientes import criar_env, monitorar
+from checkpoint_assincrono import CheckpointAssincrono
+from vec_env_paralelo import SharedMemoryVecEnv
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
+# ==============================================================================
+# VÁRIOS CENÁRIOS NO MESMO ROLLOUT (multitask)
+# ==============================================================================
+# Cada slot do vec env roda um cenário (env_name + rewards). Os pesos dizem que
+# fração dos slots fica com cada cenário e podem mudar durante o treino: o slot
+# reatribuído troca de cenário no próximo reset dele. Trocar de cenário recria o
+# motor do jogo naquele worker, por isso os pesos viram fatias de slots e não um
+# sorteio a cada episódio.
+#
+#   python3 src/cenarios_mistos.py --modelo ~/gfootball_logs/FASE4_PASSE/models/FASE4_FINAL
+
+CENARIOS_ACADEMIA = {
+    'chute': {'env_name': 'academy_empty_goal_close', 'rewards': 'scoring'},
+    'goleiro': {'env_name': 'academy_run_to_score_with_keeper', 'rewards': 'scoring,checkpoints'},
+    '3v1': {'env_name': 'academy_3_vs_1_with_keeper', 'rewards': 'scoring,checkpoints'},
+    'passe': {'env_name': 'academy_pass_and_shoot_with_keeper', 'rewards': 'scoring,checkpoints'},
+    '5v5': {'env_name': '5_vs_5', 'rewards': 'scoring,checkpoints'},
+}
+
+
+# === AMBIENTE QUE TROCA DE CENÁRIO ===
+class CenarioTrocavel(gym.Env):
+    def __init__(self, cenarios, inicial, seed=0):
+        self.cenarios = cenarios
+        self.seed_base = seed
+        self.cenario = None
+        self._pendente = inicial
+        self.env = None
+        self._trocar()
+        self.observation_space = self.env.observation_space
+        self.action_space = self.env.action_space
+
+    def agendar_cenario(self, nome):
+        # Só vale no próximo reset: não cortamos um episódio no meio
+        self._pendente = nome
+
+    def _trocar(self):
+        if self.env is not None:
+            self.env.close()
+        cfg = self.cenarios[self._pendente]
+        self.env = criar_env(cfg['env_name'], cfg['rewards'], seed=self.seed_base, monitor=False)
+        self.cenario = self._pendente
+
+    def reset(self):
+        if self._pendente != self.cenario:
+            self._trocar()
+        self._gols_pro = 0
+        self._gols_contra = 0
+        return self.env.reset()
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        score = info.get('score_reward', 0)
+        self._gols_pro += score > 0
+        self._gols_contra += score < 0
+        if done:
+            info['cenario'] = self.cenario
+            info['gols_pro'] = self._gols_pro
+            info['gols_contra'] = self._gols_contra
+        return obs, reward, done, info
+
+    def close(self):
+        self.env.close()
+
+
+def criar_env_trocavel(cenarios, inicial, seed=0):
+    return monitorar(CenarioTrocavel(cenarios, inicial, seed=seed))
+
+
+def alocar_slots(pesos, n_slots):
+    # Maiores restos: cada cenário com peso > 0 recebe round(peso * n) slots
+    nomes = [n for n, p in pesos.items() if p > 0]
+    p = np.array([pesos[n] for n in nomes], dtype=np.float64)
+    cotas = p / p.sum() * n_slots
+    inteiros = np.floor(cotas).astype(int)
+    for k in np.argsort(-(cotas - inteiros))[: n_slots - inteiros.sum()]:
+        inteiros[k] += 1
+    return dict(zip(nomes, inteiros.tolist()))
+
+
+# === VEC ENV ===
+class VecCenariosMistos(VecEnvWrapper):
+    def __init__(self, venv, pesos):
+        super().__init__(venv)
+        # Cenário "contratado" de cada slot (o worker aplica no próximo reset)
+        self.alocacao = list(venv.get_attr('_pendente'))
+        self.pesos = {}
+        self.definir_pesos(pesos)
+
+    def definir_pesos(self, pesos):
+        self.pesos = dict(pesos)
+        alvo = alocar_slots(self.pesos, self.num_envs)
+        atual = Counter(self.alocacao)
+        # Slots que já estão num cenário com vaga ficam onde estão
+        sobrando = []
+        vagas = dict(alvo)
+        for i, nome in enumerate(self.alocacao):
+            if vagas.get(nome, 0) > 0:
+                vagas[nome] -= 1
+            else:
+                sobrando.append(i)
+        for nome, n in vagas.items():
+            for _ in range(n):
+                i = sobrando.pop()
+                self.alocacao[i] = nome
+                self.venv.env_method('agendar_cenario', nome, indices=[i])
+        if Counter(self.alocacao) != atual:
+            print(f"🔀 Nova mistura de cenários: {dict(Counter(self.alocacao))}")
+
+    def fracao_slots(self):
+        contagem = Counter(self.alocacao)
+        return {nome: contagem.get(nome, 0) / self.num_envs for nome in self.pesos}
+
+    def reset(self):
+        return self.venv.reset()
+
+    def step_async(self, actions):
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        return self.venv.step_wait()
+
+
+def criar_vec_cenarios_mistos(pesos, cenarios=CENARIOS_ACADEMIA, n_envs=8, **kwargs):
+    iniciais = []
+    for nome, n in alocar_slots(pesos, n_envs).items():
+        iniciais += [nome] * n
+    env_fns = [partial(criar_env_trocavel, cenarios, nome, seed=i) for i, nome in enumerate(iniciais)]
+    return VecCenariosMistos(SharedMemoryVecEnv(env_fns, **kwargs), pesos)
+
+
+# === GOLS POR CENÁRIO NO TENSORBOARD ===
+class CenarioGoalLogger(BaseCallback):
+    def __init__(self):
+        super().__init__()
+        self._mistos = None
+        self._episodios = Counter()
+        self._gols_pro = Counter()
+        self._gols_contra = Counter()
+
+    def _on_training_start(self) -> None:
+        self._mistos = unwrap_vec_wrapper(self.training_env, VecCenariosMistos)
+
+    def _on_step(self) -> bool:
+        dones = self.locals['dones']
+        if dones.any():
+            infos = self.locals['infos']
+            for i in np.flatnonzero(dones):
+                nome = infos[i].get('cenario')
+                if nome is not None:
+                    self._episodios[nome] += 1
+                    self._gols_pro[nome] += infos[i]['gols_pro']
+                    self._gols_contra[nome] += infos[i]['gols_contra']
+        return True
+
+    def _on_rollout_end(self) -> None:
+        for nome, n in self._episodios.items():
+            self.logger.record(f'cenarios/{nome}/gols_por_episodio', self._gols_pro[nome] / n)
+            self.logger.record(f'cenarios/{nome}/gols_sofridos_por_episodio', self._gols_contra[nome] / n)
+            self.logger.record(f'cenarios/{nome}/episodios', n)
+        if self._mistos is not None:
+            for nome, fracao in self._mistos.fracao_slots().items():
+                self.logger.record(f'cenarios/{nome}/fracao_slots', fracao)
+        self._episodios.clear()
+        self._gols_pro.clear()
+        self._gols_contra.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treino multitask com vários cenários no mesmo rollout.")
+    parser.add_argument('--modelo', default=None, help="Modelo inicial (.zip); sem ele começa do zero")
+    parser.add_argument('--timesteps', type=int, default=2_000_000)
+    parser.add_argument('--n-envs', type=int, default=8)
+    args = parser.parse_args()
+
+    log_dir = os.path.expanduser("~/gfootball_logs/MULTITASK_V2")
+    models_dir = f"{log_dir}/models"
+    os.makedirs(models_dir, exist_ok=True)
+
+    print("\n" + "=" * 80)
+    print("🚀 MULTITASK - VÁRIOS CENÁRIOS NO MESMO ROLLOUT 🚀")
+    print("=" * 80 + "\n")
+
+    pesos = {'goleiro': 1.0, '3v1': 1.0, 'passe': 1.0, '5v5': 1.0}
+    vec_env = criar_vec_cenarios_mistos(pesos, n_envs=args.n_envs, copiar_obs=False)
+    vec_env = VecNormalize(VecSanitize(vec_env), norm_obs=True, norm_reward=False, clip_obs=10.)
+
+    if args.modelo:
+        print(f"🧠 Carregando: {args.modelo}")
+        model = PPO.load(args.modelo, env=vec_env, device="auto")
+        model.learning_rate = 0.0001
+        model._setup_lr_schedule()
+        model.ent_coef = 0.03
+        model.tensorboard_log = log_dir
+    else:
+        model = PPO("MlpPolicy", vec_env, learning_rate=0.0003, n_steps=2048, batch_size=256,
+                    n_epochs=4, gamma=0.993, gae_lambda=0.95, clip_range=0.2, ent_coef=0.02,
+                    verbose=1, tensorboard_log=log_dir, device="auto")
+
+    callbacks = [
+        CheckpointAssincrono(save_freq=50_000, pasta=models_dir, prefixo='ckpt_multitask'),
+        CenarioGoalLogger(),
+        NonFiniteCounter(),
+    ]
+    model.learn(total_timesteps=args.timesteps, callback=callbacks, progress_bar=True)
+
+    model.save(f"{models_dir}/MULTITASK_FINAL")
+    vec_env.save(f"{models_dir}/vec_normalize_multitask.pkl")
+    vec_env.close()
+    print("✅ MULTITASK COMPLETO!")
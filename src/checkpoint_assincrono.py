@@ -0,0 +1,322 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import data_to_json, recursive_getattr
+from stable_baselines3.common.utils import get_system_info
+from stable_baselines3.common.vec_env import VecNormalize, unwrap_vec_wrapper
+import stable_baselines3
+import json
+import os
+import pickle
+import queue
+import random
+import shutil
+import threading
+import time
+import traceback
+import zipfile
+import numpy as np
+import torch
+
+# ==============================================================================
+# CHECKPOINT EM SEGUNDO PLANO (modelo + otimizador + VecNormalize, sempre em par)
+# ==============================================================================
+# O CheckpointCallback do SB3 serializa o modelo e o otimizador na thread do
+# treino e não salva o VecNormalize: se o treino cai no meio, nenhum ckpt_*
+# tem o normalizador do mesmo passo. Aqui, na thread do treino, só se copia
+# para a memória da CPU o que o model.save gravaria (pesos, Adam, o 'data'
+# já em JSON), o VecNormalize (pickle, poucos KB) e o estado dos sorteios.
+# Uma thread escritora grava tudo numa pasta temporária, faz fsync e renomeia
+# a pasta de uma vez (o par aparece inteiro ou não aparece):
+#
+#   <pasta>/<prefixo>_<passo>_steps/<prefixo>_<passo>_steps.zip
+#                                   vec_normalize.pkl
+#                                   sorteios.pkl      (random, numpy, torch)
+#   <pasta>/<prefixo>.json          manifesto: checkpoints vivos + o melhor
+#
+# Ficam os `manter` últimos e o melhor pela métrica (padrão: ep_rew_mean do
+# rollout). Um ckpt pendente por vez: se a escrita anterior ainda não acabou,
+# o próximo é adiado em vez de formar fila na memória.
+#
+#   callbacks = [CheckpointAssincrono(save_freq=100_000, pasta=models_dir, prefixo='ckpt_5v5'), ...]
+#
+#   model, vec_env = retomar(models_dir, 'ckpt_5v5', vec_env_sem_normalize)
+#   model.learn(total - model.num_timesteps, callback=callbacks, reset_num_timesteps=False)
+#
+# O estado interno do jogo não dá para salvar: na retomada os ambientes
+# recomeçam do reset, o resto (pesos, Adam, normalização, passo, sorteios)
+# continua de onde parou.
+
+NOME_NORMALIZADOR = "vec_normalize.pkl"
+NOME_SORTEIOS = "sorteios.pkl"
+
+
+# === FOTO NA MEMÓRIA (thread do treino) ===
+def _para_cpu(objeto):
+    # Cópia (nunca referência) de tudo que for tensor, atravessando dicts/listas do state_dict
+    if isinstance(objeto, torch.Tensor):
+        return objeto.detach().to('cpu', copy=True)
+    if isinstance(objeto, dict):
+        return type(objeto)((k, _para_cpu(v)) for k, v in objeto.items())
+    if isinstance(objeto, (list, tuple)):
+        return type(objeto)(_para_cpu(v) for v in objeto)
+    return objeto
+
+
+def estado_sorteios():
+    estado = {'random': random.getstate(), 'numpy': np.random.get_state(), 'torch': torch.get_rng_state()}
+    if torch.cuda.is_available():
+        estado['cuda'] = torch.cuda.get_rng_state_all()
+    return estado
+
+
+def restaurar_sorteios(estado):
+    random.setstate(estado['random'])
+    np.random.set_state(estado['numpy'])
+    torch.set_rng_state(estado['torch'])
+    if 'cuda' in estado and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(estado['cuda'])
+
+
+def fotografar(model, vec_normalize=None):
+    # O mesmo conteúdo do BaseAlgorithm.save, mas só em memória
+    dados = model.__dict__.copy()
+    excluir = set(model._excluded_save_params())
+    nomes_estados, nomes_variaveis = model._get_torch_save_params()
+    for nome in nomes_estados + nomes_variaveis:
+        excluir.add(nome.split('.')[0])
+    for nome in excluir:
+        dados.pop(nome, None)
+    variaveis = None
+    if nomes_variaveis is not None:
+        variaveis = {nome: _para_cpu(recursive_getattr(model, nome)) for nome in nomes_variaveis}
+    return {
+        'passo': int(model.num_timesteps),
+        'dados': data_to_json(dados),
+        'parametros': {nome: _para_cpu(estado) for nome, estado in model.get_parameters().items()},
+        'variaveis': variaveis,
+        'versao_sb3': stable_baselines3.__version__,
+        'sistema': get_system_info(print_info=False)[1],
+        'normalizador': pickle.dumps(vec_normalize) if vec_normalize is not None else None,
+        'sorteios': pickle.dumps(estado_sorteios()),
+    }
+
+
+# === ESCRITA (thread escritora) ===
+def gravar_zip(caminho, foto):
+    # Mesmo layout do save_to_zip_file do SB3 (o PPO.load lê sem saber a diferença)
+    with zipfile.ZipFile(caminho, 'w') as arquivo:
+        arquivo.writestr('data', foto['dados'])
+        if foto['variaveis'] is not None:
+            with arquivo.open('pytorch_variables.pth', mode='w', force_zip64=True) as f:
+                torch.save(foto['variaveis'], f)
+        for nome, estado in foto['parametros'].items():
+            with arquivo.open(f"{nome}.pth", mode='w', force_zip64=True) as f:
+                torch.save(estado, f)
+        arquivo.writestr('_stable_baselines3_version', foto['versao_sb3'])
+        arquivo.writestr('system_info.txt', foto['sistema'])
+
+
+def _fsync(caminho):
+    fd = os.open(caminho, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _salvar_json(caminho, dados):
+    tmp = caminho + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(dados, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, caminho)
+
+
+def _ler_manifesto(caminho):
+    if os.path.exists(caminho):
+        with open(caminho) as f:
+            return json.load(f)
+    return {'checkpoints': [], 'melhor': None}
+
+
+class Escritor:
+    def __init__(self, pasta, prefixo, manter=3):
+        self.pasta = pasta
+        self.prefixo = prefixo
+        self.manter = manter
+        self.caminho_manifesto = os.path.join(pasta, f"{prefixo}.json")
+        os.makedirs(pasta, exist_ok=True)
+        self.manifesto = _ler_manifesto(self.caminho_manifesto)
+        # Restos de uma escrita interrompida (queda no meio do fsync/rename)
+        for item in os.listdir(pasta):
+            if item.startswith(f".tmp_{prefixo}_"):
+                shutil.rmtree(os.path.join(pasta, item), ignore_errors=True)
+        self.fila = queue.Queue(maxsize=1)
+        self.erros = queue.Queue()
+        self.concluidos = queue.Queue()
+        self._thread = threading.Thread(target=self._laco, name=f"checkpoint-{prefixo}", daemon=True)
+        self._thread.start()
+
+    def _laco(self):
+        while True:
+            pedido = self.fila.get()
+            if pedido is None:
+                break
+            try:
+                inicio = time.perf_counter()
+                entrada = self._gravar(*pedido)
+                self.concluidos.put((entrada, time.perf_counter() - inicio))
+            except Exception:
+                self.erros.put(traceback.format_exc())
+
+    def _gravar(self, foto, metrica, final):
+        nome = f"{self.prefixo}_{foto['passo']}_steps"
+        destino = os.path.join(self.pasta, nome)
+        tmp = os.path.join(self.pasta, f".tmp_{nome}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        arquivos = [os.path.join(tmp, f"{nome}.zip")]
+        gravar_zip(arquivos[0], foto)
+        for nome_arquivo, conteudo in ((NOME_NORMALIZADOR, foto['normalizador']), (NOME_SORTEIOS, foto['sorteios'])):
+            if conteudo is not None:
+                arquivos.append(os.path.join(tmp, nome_arquivo))
+                with open(arquivos[-1], 'wb') as f:
+                    f.write(conteudo)
+        for caminho in arquivos + [tmp]:
+            _fsync(caminho)
+        if os.path.exists(destino):
+            shutil.rmtree(destino)  # mesmo passo gravado de novo (ex.: foto final logo após a periódica)
+        os.replace(tmp, destino)
+        _fsync(self.pasta)
+
+        entrada = {
+            'passo': foto['passo'],
+            'pasta': nome,
+            'modelo': os.path.join(nome, f"{nome}.zip"),
+            'normalizador': os.path.join(nome, NOME_NORMALIZADOR) if foto['normalizador'] is not None else None,
+            'metrica': metrica,
+            'final': final,
+            'gravado_em': time.time(),
+        }
+        checkpoints = [c for c in self.manifesto['checkpoints'] if c['pasta'] != nome] + [entrada]
+        checkpoints.sort(key=lambda c: c['passo'])
+        melhor = self.manifesto['melhor']
+        atual = next((c for c in checkpoints if c['pasta'] == melhor), None)
+        if metrica is not None and (atual is None or atual['metrica'] is None or metrica > atual['metrica']):
+            melhor = nome
+        # Rotação: os `manter` mais novos + o melhor
+        vivos = {c['pasta'] for c in checkpoints[-self.manter:]} | {melhor}
+        self.manifesto = {'checkpoints': [c for c in checkpoints if c['pasta'] in vivos], 'melhor': melhor}
+        _salvar_json(self.caminho_manifesto, self.manifesto)
+        # Só apaga depois que o manifesto novo está em disco
+        for c in checkpoints:
+            if c['pasta'] not in vivos:
+                shutil.rmtree(os.path.join(self.pasta, c['pasta']), ignore_errors=True)
+        return entrada
+
+    def enviar(self, foto, metrica=None, final=False, bloquear=False):
+        try:
+            self.fila.put((foto, metrica, final), block=bloquear)
+            return True
+        except queue.Full:
+            return False
+
+    def fechar(self):
+        self.fila.put(None)
+        self._thread.join()
+
+
+# === CALLBACK ===
+def ep_rew_mean(model):
+    if not model.ep_info_buffer:
+        return None
+    return float(np.mean([ep['r'] for ep in model.ep_info_buffer]))
+
+
+class CheckpointAssincrono(BaseCallback):
+    # save_freq conta chamadas (passos do vec env), igual ao CheckpointCallback
+    def __init__(self, save_freq, pasta, prefixo='ckpt', manter=3, metrica=ep_rew_mean, salvar_no_fim=True,
+                 verbose=0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.pasta = pasta
+        self.prefixo = prefixo
+        self.manter = manter
+        self.metrica = metrica
+        self.salvar_no_fim = salvar_no_fim
+        self.escritor = None
+        self._proxima = save_freq
+
+    def _on_training_start(self) -> None:
+        if self.escritor is None:
+            self.escritor = Escritor(self.pasta, self.prefixo, self.manter)
+        self._vec_normalize = unwrap_vec_wrapper(self.training_env, VecNormalize)
+        self._proxima = self.n_calls + self.save_freq
+
+    def _enviar(self, final=False):
+        inicio = time.perf_counter()
+        foto = fotografar(self.model, self._vec_normalize)
+        metrica = self.metrica(self.model) if self.metrica is not None else None
+        enviado = self.escritor.enviar(foto, metrica, final=final, bloquear=final)
+        if enviado:
+            self.logger.record('checkpoint/foto_ms', (time.perf_counter() - inicio) * 1000)
+        return enviado
+
+    def _relatar(self):
+        while not self.escritor.erros.empty():
+            print(f"❌ Checkpoint em segundo plano falhou:\n{self.escritor.erros.get()}")
+        while not self.escritor.concluidos.empty():
+            entrada, segundos = self.escritor.concluidos.get()
+            self.logger.record('checkpoint/escrita_s', segundos)
+            self.logger.record('checkpoint/passo', entrada['passo'])
+            if self.verbose:
+                print(f"💾 Checkpoint do passo {entrada['passo']} gravado em {segundos:.1f}s")
+
+    def _on_step(self) -> bool:
+        if self.n_calls >= self._proxima:
+            if self._enviar():
+                self._proxima = self.n_calls + self.save_freq
+            elif self.verbose > 1:
+                print("⏳ Escrita anterior ainda em andamento: checkpoint adiado")
+        return True
+
+    def _on_rollout_end(self) -> None:
+        self._relatar()
+
+    def _on_training_end(self) -> None:
+        if self.salvar_no_fim:
+            self._enviar(final=True)
+        self.escritor.fechar()
+        self._relatar()
+        self.escritor = None
+
+
+# === RETOMADA ===
+def ultimo_checkpoint(pasta, prefixo):
+    checkpoints = _ler_manifesto(os.path.join(pasta, f"{prefixo}.json"))['checkpoints']
+    return checkpoints[-1] if checkpoints else None
+
+
+def melhor_checkpoint(pasta, prefixo):
+    manifesto = _ler_manifesto(os.path.join(pasta, f"{prefixo}.json"))
+    return next((c for c in manifesto['checkpoints'] if c['pasta'] == manifesto['melhor']), None)
+
+
+def retomar(pasta, prefixo, venv, device="auto", **kwargs):
+    # venv: a pilha SEM o VecNormalize (ele vem do checkpoint, do mesmo passo que o modelo).
+    # Devolve (None, venv) se não há checkpoint para retomar
+    from stable_baselines3 import PPO
+    entrada = ultimo_checkpoint(pasta, prefixo)
+    if entrada is None:
+        return None, venv
+    if entrada['normalizador'] is not None:
+        venv = VecNormalize.load(os.path.join(pasta, entrada['normalizador']), venv)
+    model = PPO.load(os.path.join(pasta, entrada['modelo']), env=venv, device=device, **kwargs)
+    # Os ambientes são novos: o learn tem que começar de um reset, não do _last_obs salvo
+    model._last_obs = None
+    sorteios = os.path.join(pasta, entrada['pasta'], NOME_SORTEIOS)
+    if os.path.exists(sorteios):
+        with open(sorteios, 'rb') as f:
+            restaurar_sorteios(pickle.load(f))
+    print(f"🔁 Retomando do checkpoint {entrada['pasta']} (passo {entrada['passo']})")
+    return model, venv
@@ -0,0 +1,247 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecNormalize
+from functools import partial
+import argparse
+import threading
+import os
+
+from ambientes import criar_env
+from avaliacao_assincrona import AsyncEvalCallback
+from checkpoint_assincrono import CheckpointAssincrono
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from rollout_compacto import compactar_rollout
+from vec_env_paralelo import SharedMemoryVecEnv
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
+# ==============================================================================
+# CURRÍCULO COMPLETO NUM PROCESSO SÓ
+# ==============================================================================
+# Encadeia as fases dos scripts 01..05 sem editar caminhos à mão: o modelo e as
+# estatísticas do VecNormalize passam de uma fase para a outra em memória, e os
+# ambientes da próxima fase são criados em segundo plano enquanto a atual termina.
+#
+#   python3 src/curriculo.py              # roda tudo, da fase 1 à 5
+#   python3 src/curriculo.py --inicio 3   # retoma da fase 3 (lê o final da fase 2 do disco)
+#
+# Cada fase salva no mesmo layout dos scripts: ~/gfootball_logs/<nome>/models/
+# com ckpt_*, <final>.zip e o vec_normalize_*.pkl, e o melhor da avaliação em
+# ~/gfootball_logs/<nome>/melhor_modelo/.
+
+LOG_RAIZ = os.path.expanduser("~/gfootball_logs")
+
+# Hiperparâmetros do PPO da Fase 1 (as outras fases só ajustam lr/entropia)
+PPO_KWARGS = dict(
+    n_steps=2048,
+    batch_size=256,
+    n_epochs=4,
+    gamma=0.993,
+    gae_lambda=0.95,
+    clip_range=0.2,
+)
+
+# === FASES ===
+# 'herdar_normalizacao': False recomeça a normalização do zero (o que o
+# 02_treino_coletivo.py fazia). Por padrão ela é herdada e continua se adaptando.
+FASES = [
+    {
+        'nome': 'FASE1_CORRIGIDO',
+        'cenario': 'academy_empty_goal_close',
+        'rewards': 'scoring',
+        'learning_rate': 0.0003,
+        'ent_coef': 0.02,
+        'timesteps': 500_000,
+        'save_freq': 50_000,
+        'prefixo': 'ckpt',
+        'final': 'FASE1_FINAL',
+        'normalizador': 'vec_normalize.pkl',
+    },
+    {
+        'nome': 'FASE2_GOLEIRO',
+        'cenario': 'academy_run_to_score_with_keeper',
+        'rewards': 'scoring,checkpoints',
+        'learning_rate': 0.0002,
+        'ent_coef': 0.03,
+        'timesteps': 1_000_000,
+        'save_freq': 50_000,
+        'prefixo': 'ckpt_fase2',
+        'final': 'FASE2_FINAL',
+        'normalizador': 'vec_normalize_fase2.pkl',
+    },
+    {
+        'nome': 'FASE3_DRIBLE',
+        'cenario': 'academy_3_vs_1_with_keeper',
+        'rewards': 'scoring,checkpoints',
+        'learning_rate': 0.0001,
+        'ent_coef': 0.03,
+        'timesteps': 1_500_000,
+        'save_freq': 50_000,
+        'prefixo': 'ckpt_fase3',
+        'final': 'FASE3_FINAL',
+        'normalizador': 'vec_normalize_fase3.pkl',
+    },
+    {
+        'nome': 'FASE4_PASSE',
+        'cenario': 'academy_pass_and_shoot_with_keeper',
+        'rewards': 'scoring,checkpoints',
+        'learning_rate': 0.00005,
+        'ent_coef': 0.03,
+        'timesteps': 2_000_000,
+        'save_freq': 50_000,
+        'prefixo': 'ckpt_fase4',
+        'final': 'FASE4_FINAL',
+        'normalizador': 'vec_normalize_fase4.pkl',
+    },
+    {
+        'nome': 'FASE5_FINAL',
+        'cenario': '5_vs_5',
+        'rewards': 'scoring,checkpoints',
+        'learning_rate': 0.00005,
+        'ent_coef': 0.02,
+        'timesteps': 3_000_000,
+        'save_freq': 100_000,
+        'prefixo': 'ckpt_5v5',
+        'final': 'CAMPEAO_5V5',
+        'normalizador': 'vec_normalize_5v5.pkl',
+    },
+]
+
+
+def pastas_da_fase(fase, raiz=LOG_RAIZ):
+    log_dir = os.path.join(raiz, fase['nome'])
+    return log_dir, os.path.join(log_dir, "models")
+
+
+# === POOL DE AMBIENTES ===
+# O pool é o vec env "cru" (sem VecNormalize): é ele que demora para subir
+# (processos + motor do jogo) e é ele que pré-aquecemos.
+def criar_pool(fase, n_envs=8):
+    env_fns = [partial(criar_env, fase['cenario'], fase['rewards'], seed=i) for i in range(n_envs)]
+    return VecSanitize(SharedMemoryVecEnv(env_fns, copiar_obs=False))
+
+
+class PoolFuturo:
+    def __init__(self, fase, n_envs):
+        self._pool = None
+        self._erro = None
+        self._thread = threading.Thread(target=self._criar, args=(fase, n_envs), daemon=True)
+        self._thread.start()
+
+    def _criar(self, fase, n_envs):
+        try:
+            self._pool = criar_pool(fase, n_envs)
+        except Exception as e:
+            self._erro = e
+
+    def resultado(self):
+        self._thread.join()
+        if self._erro is not None:
+            raise self._erro
+        return self._pool
+
+
+# Começa a subir os ambientes da próxima fase quando a atual passa de 'fracao'
+class PreaquecerProximaFase(BaseCallback):
+    def __init__(self, proxima_fase, n_envs, total_timesteps, fracao=0.9):
+        super().__init__()
+        self.proxima_fase = proxima_fase
+        self.n_envs = n_envs
+        self.limite = int(total_timesteps * fracao)
+        self.futuro = None
+
+    def _on_step(self) -> bool:
+        if self.futuro is None and self.proxima_fase is not None and self.num_timesteps >= self.limite:
+            print(f"\n🔥 Pré-aquecendo ambientes da próxima fase: {self.proxima_fase['cenario']}")
+            self.futuro = PoolFuturo(self.proxima_fase, self.n_envs)
+        return True
+
+
+def aplicar_hiperparametros(model, fase, log_dir):
+    model.learning_rate = fase['learning_rate']
+    # Sem isso o PPO carregado continua usando o lr_schedule salvo no zip
+    model._setup_lr_schedule()
+    model.ent_coef = fase['ent_coef']
+    model.tensorboard_log = log_dir
+
+
+def executar_curriculo(fases=FASES, inicio=0, n_envs=8, raiz=LOG_RAIZ):
+    pool = criar_pool(fases[inicio], n_envs)
+    model = None
+    obs_rms = None
+    caminho_modelo = None
+
+    if inicio > 0:
+        # Retomando: o ponto de partida é o final da fase anterior salvo em disco
+        anterior = fases[inicio - 1]
+        _, models_anterior = pastas_da_fase(anterior, raiz)
+        caminho_modelo = os.path.join(models_anterior, anterior['final'])
+        caminho_norm = os.path.join(models_anterior, anterior['normalizador'])
+        if os.path.exists(caminho_norm):
+            obs_rms = VecNormalize.load(caminho_norm, pool).obs_rms
+
+    for k in range(inicio, len(fases)):
+        fase = fases[k]
+        proxima = fases[k + 1] if k + 1 < len(fases) else None
+        log_dir, models_dir = pastas_da_fase(fase, raiz)
+        os.makedirs(models_dir, exist_ok=True)
+
+        print("\n" + "=" * 80)
+        print(f"🚀 FASE {k + 1}/{len(fases)} - {fase['nome']} ({fase['cenario']}) 🚀")
+        print("=" * 80 + "\n")
+
+        vec_env = VecNormalize(pool, norm_obs=True, norm_reward=False, clip_obs=10.)
+        if obs_rms is not None and fase.get('herdar_normalizacao', True):
+            print("📐 Herdando a normalização da fase anterior")
+            vec_env.obs_rms = obs_rms.copy()
+
+        if model is not None:
+            # Mesmo número de ambientes entre as fases: o rollout buffer é reaproveitado
+            model.set_env(vec_env)
+        elif caminho_modelo is not None:
+            print(f"🧠 Carregando o final da fase anterior: {caminho_modelo}")
+            model = PPO.load(caminho_modelo, env=vec_env, device="auto")
+        else:
+            model = PPO("MlpPolicy", vec_env, verbose=1, tensorboard_log=log_dir, device="auto",
+                        learning_rate=fase['learning_rate'], ent_coef=fase['ent_coef'], **PPO_KWARGS)
+        aplicar_hiperparametros(model, fase, log_dir)
+        # Só o quadro novo de cada passo no rollout buffer (a pilha volta nos lotes)
+        compactar_rollout(model)
+
+        preaquecer = PreaquecerProximaFase(proxima, n_envs, fase['timesteps'])
+        callbacks = [
+            CheckpointAssincrono(save_freq=fase['save_freq'], pasta=models_dir, prefixo=fase['prefixo']),
+            AsyncEvalCallback(eval_freq=fase['save_freq'], pasta=os.path.join(log_dir, "melhor_modelo"),
+                              cenario=fase['cenario']),
+            EpisodeMetrics(),
+            NonFiniteCounter(),
+            preaquecer,
+            # GFOOTBALL_PERFIL=1: tempo de cada etapa no TensorBoard + log_dir/perfil.json
+            *perfil_opcional(log_dir),
+        ]
+        model.learn(total_timesteps=fase['timesteps'], callback=callbacks, progress_bar=True,
+                    reset_num_timesteps=True, tb_log_name=fase['nome'])
+
+        model.save(os.path.join(models_dir, fase['final']))
+        vec_env.save(os.path.join(models_dir, fase['normalizador']))
+        obs_rms = vec_env.obs_rms.copy()
+        print(f"✅ {fase['nome']} COMPLETA!")
+
+        if proxima is not None:
+            futuro = preaquecer.futuro or PoolFuturo(proxima, n_envs)
+            proximo_pool = futuro.resultado()
+        vec_env.close()
+        if proxima is not None:
+            pool = proximo_pool
+
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roda o currículo inteiro num processo só.")
+    parser.add_argument('--inicio', type=int, default=1, help="Fase inicial (1 a 5)")
+    parser.add_argument('--n-envs', type=int, default=8)
+    args = parser.parse_args()
+
+    executar_curriculo(FASES, inicio=args.inicio - 1, n_envs=args.n_envs)
+    print("✅ CURRÍCULO CONCLUÍDO!")
@@ -1,9 +1,11 @@
 import gfootball.env as football_env
 from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv
 import gym  # Usamos 'gym' direto, pois instalamos a versão 0.21
-import numpy as np
 import os
 
+from vec_sanitize import VecSanitize
+
 # ==============================================================================
 # 1. ADAPTADORES (Versão Gym 0.21 - Igual ao seu treino)
 # ==============================================================================
@@ -31,21 +33,6 @@ class GfootballAdapter(gym.Env):
     def close(self):
         return self.env.close()
 
-# Wrapper necessário para o modelo aceitar os inputs (mesmo que não use o reward aqui)
-class ImprovedGoalWrapper(gym.Wrapper):
-    def __init__(self, env):
-        super().__init__(env)
-    
-    def reset(self, **kwargs):
-        obs = self.env.reset(**kwargs)
-        if obs is None: obs = np.zeros(self.env.observation_space.shape, dtype=np.float32)
-        return np.nan_to_num(obs, nan=0.0, posinf=1.0, neginf=-1.0).astype(np.float32)
-    
-    def step(self, action):
-        obs, reward, done, info = self.env.step(action)
-        obs = np.nan_to_num(obs, nan=0.0, posinf=1.0, neginf=-1.0).astype(np.float32)
-        return obs, reward, done, info
-
 # ==============================================================================
 # CONFIGURAÇÕES
 # ==============================================================================
@@ -69,19 +56,21 @@ def assistir():
     
     try:
         # 1. Cria o ambiente com GRAVAÇÃO LIGADA e RENDER DESLIGADO
-        env_legacy = football_env.create_environment(
-            env_name='5_vs_5', 
-            stacked=True,
-            representation='simple115',
-            render=False,                # <--- Importante: FALSE para servidor
-            write_full_episode_dumps=True, # Salva o replay completo
-            write_video=True,            # Salva o vídeo .avi
-            logdir=VIDEO_DIR             # Onde salvar
-        )
+        # Só o .dump: o vídeo sai depois pelo renderizador_replays.py, sem travar o jogo
+        def make_env():
+            env_legacy = football_env.create_environment(
+                env_name='5_vs_5', 
+                stacked=True,
+                representation='simple115',
+                render=False,                # <--- Importante: FALSE para servidor
+                write_full_episode_dumps=True, # Salva o replay completo
+                write_video=False,           # Vídeo é renderizado depois, a partir do .dump
+                logdir=VIDEO_DIR             # Onde salvar
+            )
+            return GfootballAdapter(env_legacy)
         
-        # 2. Aplica os adaptadores
-        env = GfootballAdapter(env_legacy)
-        env = ImprovedGoalWrapper(env)
+        # 2. Aplica os adaptadores (VecSanitize limpa NaN/inf e converte para float32)
+        env = VecSanitize(DummyVecEnv([make_env]))
         
         # 3. Carrega o cérebro treinado
         model = PPO.load(MODELO_PATH, env=env)
@@ -102,8 +91,10 @@ def assistir():
         # deterministic=False deixa ele ser criativo (bom para ver dribles)
         action, _ = model.predict(obs, deterministic=True)
         
-        obs, reward, done, info = env.step(action)
-        total_reward += reward
+        # Como é DummyVecEnv, reward/dones são listas [valor_env1]
+        obs, reward, dones, info = env.step(action)
+        total_reward += reward[0]
+        done = dones[0]
         steps += 1
         
         if steps % 100 == 0:
@@ -113,7 +104,8 @@ def assistir():
     print(f"📊 FIM DE JOGO!")
     print(f"   Passos: {steps}")
     print(f"   Reward Acumulado: {total_reward:.2f}")
-    print(f"   Vídeo salvo em: {VIDEO_DIR}")
+    print(f"   Replay (.dump) salvo em: {VIDEO_DIR}")
+    print(f"   Para gerar o vídeo: python3 src/renderizador_replays.py {VIDEO_DIR}")
     print("-" * 30)
     
     env.close()
@@ -0,0 +1,262 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+import json
+import os
+import time
+import numpy as np
+
+# ==============================================================================
+# PERFIL DO TREINO (onde vão as horas do 5_vs_5)
+# ==============================================================================
+# Opcional, ligado por variável de ambiente (sem mexer nos scripts):
+#
+#   GFOOTBALL_PERFIL=1 python3 src/05_treino_jogo.py
+#
+# O PerfilCallback mede, com perf_counter e somas em float:
+#
+#   politica       forward da policy durante o rollout
+#   camada/<X>     tempo próprio de cada camada do vec env (VecNormalize,
+#                  VecSanitize, ...), com um cronômetro entre cada par
+#   ambiente       caminho crítico dos workers: o worker mais lento de cada
+#                  passo (env.step + adapter + Monitor, medido dentro dele)
+#   sincronizacao  o resto do SharedMemoryVecEnv: semáforos, pipe, cópias
+#   gae            compute_returns_and_advantage
+#   resto          laço do collect_rollouts (obs_to_tensor, buffer, callbacks)
+#   treino         épocas do PPO (da iteração anterior: o train() roda depois
+#                  do fim do rollout)
+#
+# Por rollout vai para o TensorBoard (perfil/*), com um histograma do tempo de
+# passo por ambiente e o ambiente mais lento. No fim do model.learn sai um JSON
+# com os totais e as estatísticas de cada ambiente (média, p50, p99, máximo).
+# Em GPU o forward é assíncrono: a espera pela placa aparece em 'resto'.
+
+# Bordas do histograma do passo por ambiente: 10 µs a 10 s em escala log (ns)
+BORDAS_NS = np.logspace(4, 10, 61)
+# Ambiente com média acima disso x a mediana entra na lista de lentos do JSON
+FATOR_LENTO = 1.5
+
+
+def perfil_ativo():
+    return os.environ.get("GFOOTBALL_PERFIL", "0").lower() in ("1", "true", "sim", "yes")
+
+
+def perfil_opcional(pasta):
+    # Para a lista de callbacks dos scripts: [] sem GFOOTBALL_PERFIL=1
+    return [PerfilCallback(os.path.join(pasta, "perfil.json"))] if perfil_ativo() else []
+
+
+class Acumulador:
+    def __init__(self):
+        self.rollout = {}
+        self.total = {}
+
+    def somar(self, nome, segundos):
+        self.rollout[nome] = self.rollout.get(nome, 0.0) + segundos
+        self.total[nome] = self.total.get(nome, 0.0) + segundos
+
+    def cronometrar(self, nome, fn):
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.somar(nome, time.perf_counter() - inicio)
+        return medido
+
+    def fechar_rollout(self):
+        rollout, self.rollout = self.rollout, {}
+        return rollout
+
+
+# === CRONÔMETRO ENTRE CAMADAS DO VEC ENV ===
+# Mede o step (async + wait) de tudo que está abaixo dele.
+class VecCronometro(VecEnvWrapper):
+    def __init__(self, venv, acumulador, nome):
+        super().__init__(venv)
+        self.acumulador = acumulador
+        self.nome = nome
+        self._inicio = None
+
+    def reset(self):
+        return self.venv.reset()
+
+    def step_async(self, actions):
+        self._inicio = time.perf_counter()
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        resultado = self.venv.step_wait()
+        self.acumulador.somar(self.nome, time.perf_counter() - self._inicio)
+        return resultado
+
+
+def _nomes_unicos(venvs):
+    nomes, vistos = [], {}
+    for venv in venvs:
+        nome = type(venv).__name__
+        vistos[nome] = vistos.get(nome, 0) + 1
+        nomes.append(nome if vistos[nome] == 1 else f"{nome}_{vistos[nome]}")
+    return nomes
+
+
+class PerfilCallback(BaseCallback):
+    def __init__(self, caminho_json=None, verbose=0):
+        super().__init__(verbose)
+        self.caminho_json = caminho_json
+        self.acumulador = Acumulador()
+        self._desfazer = []
+
+    # --- instalação / remoção dos cronômetros ---
+    def _instalar(self, objeto, atributo, nome):
+        # Na classe, não na instância: um atributo com uma closure dentro do model
+        # (ou do buffer/policy) quebra o pickle de qualquer save no meio do treino.
+        # Só o objeto perfilado é medido; as outras instâncias chamam o original
+        classe = type(objeto)
+        proprio = classe.__dict__.get(atributo)
+        original = getattr(classe, atributo)
+        medido = self.acumulador.cronometrar(nome, original)
+
+        def escolher(instancia, *args, **kwargs):
+            return (medido if instancia is objeto else original)(instancia, *args, **kwargs)
+
+        setattr(classe, atributo, escolher)
+        if proprio is None:
+            self._desfazer.append(lambda: delattr(classe, atributo))
+        else:
+            self._desfazer.append(lambda: setattr(classe, atributo, proprio))
+
+    def _on_training_start(self) -> None:
+        model = self.model
+        # Camadas do vec env, de fora para dentro
+        pilha = [model.env]
+        while isinstance(pilha[-1], VecEnvWrapper):
+            pilha.append(pilha[-1].venv)
+        self.camadas = _nomes_unicos(pilha)
+        for externo, interno, nome in zip(pilha[:-1], pilha[1:], self.camadas[1:]):
+            externo.venv = VecCronometro(interno, self.acumulador, nome)
+            self._desfazer.append(lambda e=externo, i=interno: setattr(e, 'venv', i))
+        env_original = model.env
+        model.env = VecCronometro(env_original, self.acumulador, self.camadas[0])
+        self._desfazer.append(lambda: setattr(model, 'env', env_original))
+
+        self._instalar(model.policy, 'forward', 'politica')
+        self._instalar(model.rollout_buffer, 'compute_returns_and_advantage', 'gae')
+        self._instalar(model, 'train', 'treino')
+
+        # Tempo por ambiente, escrito pelos workers do SharedMemoryVecEnv
+        self._base = pilha[-1] if hasattr(pilha[-1], 'tempos_passo') else None
+        n = model.env.num_envs
+        self._soma_ns = np.zeros(n)
+        self._max_ns = np.zeros(n)
+        self._hist = np.zeros((n, len(BORDAS_NS) + 1), dtype=np.int64)
+        self._linhas = np.arange(n)
+        self._passos = 0
+        if self._base is not None:
+            self._inicios = np.array([g[0] for g in self._base.grupos])
+        self._inicio_rollout = None
+        self._inicio_treino = time.perf_counter()
+
+    def _on_rollout_start(self) -> None:
+        self._inicio_rollout = time.perf_counter()
+
+    def _on_step(self) -> bool:
+        self._passos += 1
+        if self._base is not None:
+            t = self._base.tempos_passo.astype(np.float64)
+            self._soma_ns += t
+            np.maximum(self._max_ns, t, out=self._max_ns)
+            np.add.at(self._hist, (self._linhas, np.searchsorted(BORDAS_NS, t)), 1)
+            # Dentro do worker os ambientes rodam em fila; o passo espera o worker mais lento
+            self.acumulador.somar('ambiente', np.add.reduceat(t, self._inicios).max() * 1e-9)
+        return True
+
+    def _etapas(self, tempos, coleta=None):
+        # Tempo próprio de cada camada = tempo dela - o da camada de dentro
+        etapas = {}
+        camadas = [tempos.get(nome, 0.0) for nome in self.camadas]
+        for k, nome in enumerate(self.camadas):
+            dentro = camadas[k + 1] if k + 1 < len(camadas) else 0.0
+            etapas[f'camada/{nome}'] = camadas[k] - dentro
+        if 'ambiente' in tempos:
+            base = f'camada/{self.camadas[-1]}'
+            etapas['ambiente'] = tempos['ambiente']
+            etapas['sincronizacao'] = etapas.pop(base) - tempos['ambiente']
+        for nome in ('politica', 'gae', 'treino'):
+            etapas[nome] = tempos.get(nome, 0.0)
+        if coleta is not None:
+            etapas['resto'] = coleta - camadas[0] - etapas['politica'] - etapas['gae']
+        return etapas
+
+    def _on_rollout_end(self) -> None:
+        coleta = time.perf_counter() - self._inicio_rollout
+        self.acumulador.somar('coleta', coleta)
+        etapas = self._etapas(self.acumulador.fechar_rollout(), coleta)
+        total = coleta + etapas['treino']
+        for nome, segundos in etapas.items():
+            self.logger.record(f'perfil/{nome}_s', segundos)
+            self.logger.record(f'perfil/{nome}_fracao', segundos / total if total else 0.0)
+        if self._base is not None and self._passos:
+            import torch
+            media_ms = self._soma_ns / self._passos * 1e-6
+            mediana = float(np.median(media_ms))
+            lento = int(media_ms.argmax())
+            self.logger.record('perfil/passo_env_ms', torch.as_tensor(media_ms),
+                               exclude=('stdout', 'log', 'json', 'csv'))
+            self.logger.record('perfil/env_mais_lento', lento)
+            self.logger.record('perfil/lento_vs_mediana', float(media_ms[lento] / mediana) if mediana else 0.0)
+
+    # --- resumo final ---
+    def _percentil_ms(self, hist, q):
+        acumulado = np.cumsum(hist)
+        if not acumulado[-1]:
+            return None
+        k = int(np.searchsorted(acumulado, q * acumulado[-1]))
+        # Limite superior do balde (o último balde não tem limite: usa a última borda)
+        return float(BORDAS_NS[min(k, len(BORDAS_NS) - 1)] * 1e-6)
+
+    def resumo(self):
+        total = self.acumulador.total
+        parede = time.perf_counter() - self._inicio_treino
+        etapas = self._etapas(total, total.get('coleta', 0.0))
+        resumo = {
+            'passos_vec_env': self._passos,
+            'num_envs': int(self.model.env.num_envs),
+            'parede_s': parede,
+            'etapas': {nome: {'total_s': s, 'fracao': s / parede if parede else 0.0} for nome, s in etapas.items()},
+            'camadas_vec_env': self.camadas,
+        }
+        if self._base is not None and self._passos:
+            media_ms = self._soma_ns / self._passos * 1e-6
+            mediana = float(np.median(media_ms))
+            envs = [{
+                'env': i,
+                'media_ms': float(media_ms[i]),
+                'p50_ms': self._percentil_ms(self._hist[i], 0.5),
+                'p99_ms': self._percentil_ms(self._hist[i], 0.99),
+                'max_ms': float(self._max_ns[i] * 1e-6),
+                'vs_mediana': float(media_ms[i] / mediana) if mediana else None,
+            } for i in range(len(media_ms))]
+            resumo['envs'] = envs
+            resumo['lentos'] = [e['env'] for e in envs if e['vs_mediana'] and e['vs_mediana'] > FATOR_LENTO]
+            resumo['histograma'] = {'bordas_ns': BORDAS_NS.tolist(), 'contagens': self._hist.sum(axis=0).tolist()}
+        return resumo
+
+    def _on_training_end(self) -> None:
+        resumo = self.resumo()
+        for desfazer in reversed(self._desfazer):
+            desfazer()
+        self._desfazer = []
+        if self.caminho_json:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho_json)), exist_ok=True)
+            with open(self.caminho_json, 'w') as f:
+                json.dump(resumo, f, indent=2)
+        print("\n" + "=" * 80)
+        print(f"⏱️  PERFIL DO TREINO ({resumo['passos_vec_env']} passos x {resumo['num_envs']} envs, "
+              f"{resumo['parede_s']:.0f} s)")
+        print("=" * 80)
+        for nome, e in sorted(resumo['etapas'].items(), key=lambda x: -x[1]['total_s']):
+            print(f"   {nome:28s} {e['total_s']:10.1f} s  {e['fracao']:6.1%}")
+        if resumo.get('lentos'):
+            print(f"🐢 Ambientes lentos (> {FATOR_LENTO}x a mediana): {resumo['lentos']}")
+        if self.caminho_json:
+            print(f"💾 Resumo salvo em: {self.caminho_json}")
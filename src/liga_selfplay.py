@@ -0,0 +1,394 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper, VecNormalize
+from gymnasium import spaces
+from functools import partial
+import argparse
+import json
+import os
+import numpy as np
+
+from ambientes import criar_env
+from avaliacao_assincrona import AsyncEvalCallback
+from checkpoint_assincrono import CheckpointAssincrono
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from politica_numpy import PoliticaNumpy, empacotar
+from torneio import calcular_elo
+from vec_env_paralelo import SharedMemoryVecEnv
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
+# ==============================================================================
+# LIGA DE SELF-PLAY (5_vs_5 contra fotos antigas do próprio agente)
+# ==============================================================================
+# O 05_treino_jogo.py e os campeões depois dele só jogam contra o bot, numa
+# dificuldade fixa. Aqui o jogador ativo do time direito é controlado por uma
+# foto congelada do agente, sorteada a cada episódio de um pool limitado:
+#
+#   último      -> a foto mais recente (o agente de ontem)
+#   melhores    -> as n_melhores por Elo (quem mais dá trabalho)
+#   histórico   -> o resto: amostra aleatória de todas as fotos já tiradas
+#
+# Os adversários rodam no processo principal com a PoliticaNumpy (sem torch,
+# não disputa thread com o learner) e em lote: os envs com o mesmo adversário
+# viram uma multiplicação de matrizes só, então o custo por passo cresce com o
+# número de adversários DISTINTOS em campo, não com o número de envs.
+#
+# Quando o pool passa da capacidade sai a foto "histórica" com o menor bilhete
+# (número sorteado quando a foto entrou). O último e os melhores por Elo nunca
+# saem. Guardar sempre os maiores bilhetes mantém uma amostra uniforme de toda
+# a história, não só das fotos recentes.
+#
+# Tudo fica em <pasta>/liga.json (+ adversarios/<id>.npz), com vitórias,
+# empates, derrotas e gols do agente contra cada adversário:
+#
+#   python3 src/liga_selfplay.py treinar --timesteps 3000000
+#   python3 src/liga_selfplay.py relatorio
+
+PASTA_LIGA = os.path.expanduser("~/gfootball_logs/SELFPLAY")
+MODELO_INICIAL = os.path.expanduser("~/gfootball_logs/FASE5_FINAL/models/CAMPEAO_5V5")
+NORMALIZADOR_INICIAL = os.path.expanduser("~/gfootball_logs/FASE5_FINAL/models/vec_normalize_5v5.pkl")
+
+# Jogos recentes que entram no Elo: o agente muda, resultado velho envelhece mal
+JANELA_ELO = 200
+
+
+# === POOL DE ADVERSÁRIOS ===
+class LigaAdversarios:
+    def __init__(self, pasta, capacidade=8, n_melhores=2, probabilidades=(0.5, 0.3, 0.2), seed=0):
+        if capacidade < n_melhores + 2:
+            raise ValueError("capacidade precisa caber o último, os melhores e ao menos um histórico")
+        self.pasta = pasta
+        self.pasta_adversarios = os.path.join(pasta, "adversarios")
+        self.caminho = os.path.join(pasta, "liga.json")
+        self.capacidade = capacidade
+        self.n_melhores = n_melhores
+        # Chance de sortear (último, melhores, histórico); categoria vazia é ignorada
+        self.probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+        os.makedirs(self.pasta_adversarios, exist_ok=True)
+        self.estado = {'proximo_id': 0, 'adversarios': {}, 'removidos': []}
+        if os.path.exists(self.caminho):
+            with open(self.caminho) as f:
+                self.estado = json.load(f)
+        self._elo = None
+
+    @property
+    def adversarios(self):
+        return self.estado['adversarios']
+
+    def __len__(self):
+        return len(self.adversarios)
+
+    def salvar(self):
+        temporario = self.caminho + ".tmp"
+        with open(temporario, 'w') as f:
+            json.dump(self.estado, f, indent=2)
+        os.replace(temporario, self.caminho)
+
+    def arquivo(self, id_):
+        return os.path.join(self.pasta_adversarios, f"{id_}.npz")
+
+    # --- entrada e saída do pool ---
+    def adicionar(self, arrays, passo):
+        id_ = f"foto_{self.estado['proximo_id']:04d}"
+        self.estado['proximo_id'] += 1
+        with open(self.arquivo(id_), 'wb') as f:
+            np.savez(f, **arrays)
+        self.adversarios[id_] = {
+            'id': id_, 'passo': int(passo), 'bilhete': float(self._rng.random()),
+            'vitorias': 0, 'empates': 0, 'derrotas': 0, 'gols_pro': 0, 'gols_contra': 0,
+            'recentes': [],
+        }
+        self._elo = None
+        removidos = []
+        while len(self.adversarios) > self.capacidade:
+            removidos.append(self._remover_um())
+        self.salvar()
+        return id_, removidos
+
+    def _remover_um(self):
+        historico = self.categorias()['historico']
+        alvo = min(historico, key=lambda i: self.adversarios[i]['bilhete'])
+        registro = self.adversarios.pop(alvo)
+        registro.pop('recentes')
+        self.estado['removidos'].append(registro)
+        os.remove(self.arquivo(alvo))
+        self._elo = None
+        return alvo
+
+    def categorias(self):
+        ids = sorted(self.adversarios, key=lambda i: self.adversarios[i]['passo'])
+        if not ids:
+            return {'ultimo': [], 'melhores': [], 'historico': []}
+        ultimo = ids[-1]
+        elo = self.elo()
+        resto = sorted(ids[:-1], key=lambda i: elo.get(i, 0.0), reverse=True)
+        return {'ultimo': [ultimo], 'melhores': resto[:self.n_melhores], 'historico': resto[self.n_melhores:]}
+
+    def sortear(self):
+        grupos = list(self.categorias().values())
+        pesos = np.array([p if g else 0.0 for p, g in zip(self.probabilidades, grupos)])
+        grupo = grupos[self._rng.choice(len(grupos), p=pesos / pesos.sum())]
+        return grupo[self._rng.integers(len(grupo))]
+
+    # --- resultados ---
+    def registrar(self, id_, gols_pro, gols_contra):
+        a = self.adversarios.get(id_)
+        if a is None:
+            return  # saiu do pool no meio do episódio
+        a['gols_pro'] += int(gols_pro)
+        a['gols_contra'] += int(gols_contra)
+        resultado = int(np.sign(gols_pro - gols_contra))
+        a[{1: 'vitorias', 0: 'empates', -1: 'derrotas'}[resultado]] += 1
+        a['recentes'] = (a['recentes'] + [resultado])[-JANELA_ELO:]
+        self._elo = None
+
+    def elo(self):
+        # Bradley-Terry do torneio.py com os jogos recentes de cada foto contra o
+        # agente atual; Elo alto = foto que o agente ainda não domina
+        if self._elo is None:
+            partidas = [{'a': 'agente', 'b': i,
+                         'vitorias': a['recentes'].count(1),
+                         'empates': a['recentes'].count(0),
+                         'derrotas': a['recentes'].count(-1)}
+                        for i, a in self.adversarios.items()]
+            self._elo = calcular_elo(partidas) if partidas else {}
+        return self._elo
+
+    def relatorio(self):
+        elo = self.elo()
+        categoria = {i: nome for nome, ids in self.categorias().items() for i in ids}
+        linhas = []
+        for i, a in sorted(self.adversarios.items(), key=lambda x: x[1]['passo']):
+            jogos = a['vitorias'] + a['empates'] + a['derrotas']
+            linhas.append({
+                'id': i, 'passo': a['passo'], 'categoria': categoria[i], 'elo': elo.get(i),
+                'jogos': jogos, 'vitorias': a['vitorias'], 'empates': a['empates'], 'derrotas': a['derrotas'],
+                'taxa_vitoria': a['vitorias'] / jogos if jogos else None,
+                'saldo_medio': (a['gols_pro'] - a['gols_contra']) / jogos if jogos else None,
+            })
+        return linhas
+
+
+# === VEC ENV: O LEARNER SÓ VÊ O LADO ESQUERDO ===
+# Recebe um vec env de dois lados (obs (n, 2, D), ação (n, 2)) e expõe ao PPO
+# o mesmo contrato do 05_treino_jogo.py (obs (n, D), ação Discrete(19)).
+class VecSelfPlay(VecEnvWrapper):
+    def __init__(self, venv, liga, deterministic=False, seed=0):
+        espaco = venv.observation_space
+        super().__init__(
+            venv,
+            observation_space=spaces.Box(low=espaco.low[0], high=espaco.high[0], dtype=espaco.dtype),
+            action_space=spaces.Discrete(int(venv.action_space.nvec[0])),
+        )
+        self.liga = liga
+        self.deterministic = deterministic
+        self._rng = np.random.default_rng(seed)
+        self._ids = [None] * self.num_envs
+        self._politicas = {}
+        self._obs_rival = None
+        self._gols_pro = np.zeros(self.num_envs, dtype=np.int64)
+        self._gols_contra = np.zeros(self.num_envs, dtype=np.int64)
+
+    def _escolher(self, i):
+        id_ = self.liga.sortear()
+        if id_ not in self._politicas:
+            self._politicas[id_] = PoliticaNumpy.carregar(self.liga.arquivo(id_))
+        self._ids[i] = id_
+        self._gols_pro[i] = self._gols_contra[i] = 0
+
+    def _soltar_sem_uso(self):
+        # Foto removida do pool continua carregada até o episódio dela acabar
+        em_campo = set(self._ids)
+        for id_ in list(self._politicas):
+            if id_ not in em_campo:
+                del self._politicas[id_]
+
+    def reset(self):
+        if not len(self.liga):
+            raise RuntimeError("Liga vazia: adicione ao menos um adversário antes do reset")
+        for i in range(self.num_envs):
+            self._escolher(i)
+        self._soltar_sem_uso()
+        obs = self.venv.reset()
+        self._obs_rival = obs[:, 1]
+        return obs[:, 0]
+
+    def _acoes_rivais(self):
+        acoes = np.empty(self.num_envs, dtype=np.int64)
+        ids = np.array(self._ids)
+        for id_ in np.unique(ids):
+            envs = np.flatnonzero(ids == id_)
+            acoes[envs] = self._politicas[id_].agir(self._obs_rival[envs], deterministic=self.deterministic,
+                                                    rng=self._rng)
+        return acoes
+
+    def step_async(self, actions):
+        acoes = np.stack([np.asarray(actions).reshape(-1), self._acoes_rivais()], axis=1)
+        self.venv.step_async(acoes)
+
+    def step_wait(self):
+        obs, rews, dones, infos = self.venv.step_wait()
+        for i, info in enumerate(infos):
+            gol = info.get('score_reward', 0)
+            self._gols_pro[i] += gol > 0
+            self._gols_contra[i] += gol < 0
+        for i in np.flatnonzero(dones):
+            terminal = infos[i].get('terminal_observation')
+            if terminal is not None:
+                infos[i]['terminal_observation'] = terminal[0]
+            infos[i]['adversario'] = self._ids[i]
+            self.liga.registrar(self._ids[i], self._gols_pro[i], self._gols_contra[i])
+            self._escolher(i)
+        if dones.any():
+            self._soltar_sem_uso()
+        self._obs_rival = obs[:, 1]
+        return obs[:, 0], rews, dones, infos
+
+
+def criar_vec_selfplay(liga, n_envs=8, env_name='5_vs_5', rewards='scoring,checkpoints', seed=0, **kwargs):
+    env_fns = [partial(criar_env, env_name=env_name, rewards=rewards, seed=seed + i, dois_lados=True)
+               for i in range(n_envs)]
+    venv = VecSanitize(SharedMemoryVecEnv(env_fns, **kwargs))
+    return VecSelfPlay(venv, liga, seed=seed)
+
+
+def normalizacao_atual(vec_normalize):
+    # Mesmo dicionário do politica_numpy.ler_normalizador, mas do VecNormalize vivo
+    if vec_normalize is None or not vec_normalize.norm_obs:
+        return None
+    return {
+        'obs_media': vec_normalize.obs_rms.mean.astype(np.float32),
+        'obs_var': vec_normalize.obs_rms.var.astype(np.float32),
+        'clip_obs': np.array(vec_normalize.clip_obs, dtype=np.float32),
+        'epsilon': np.array(vec_normalize.epsilon, dtype=np.float32),
+    }
+
+
+# === CALLBACK: FOTOS + RELATÓRIO ===
+class LigaCallback(BaseCallback):
+    def __init__(self, liga, freq_foto=200_000, verbose=0):
+        super().__init__(verbose)
+        self.liga = liga
+        self.freq_foto = freq_foto
+        self._proxima = freq_foto
+
+    def _on_training_start(self) -> None:
+        # Continuando um treino (reset_num_timesteps=False) o contador não começa do zero
+        self._proxima = self.model.num_timesteps + self.freq_foto
+
+    def tirar_foto(self):
+        passo = int(self.model.num_timesteps)
+        arrays = empacotar(self.model.policy, normalizacao_atual(self.model.get_vec_normalize_env()),
+                           origem={'passo': passo})
+        id_, removidos = self.liga.adicionar(arrays, passo)
+        if self.verbose:
+            print(f"📸 {id_} entrou na liga" + (f" (saíram: {', '.join(removidos)})" if removidos else ""))
+        return id_
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps >= self._proxima:
+            self._proxima += self.freq_foto
+            self.tirar_foto()
+        return True
+
+    def _on_rollout_end(self) -> None:
+        linhas = self.liga.relatorio()
+        self.logger.record('liga/tamanho', len(linhas))
+        self.logger.record('liga/elo_agente', self.liga.elo().get('agente', 0.0))
+        jogos = sum(l['jogos'] for l in linhas)
+        if jogos:
+            self.logger.record('liga/taxa_vitoria', sum(l['vitorias'] for l in linhas) / jogos)
+        for l in linhas:
+            if l['jogos']:
+                self.logger.record(f"liga/{l['id']}/taxa_vitoria", l['taxa_vitoria'])
+                self.logger.record(f"liga/{l['id']}/saldo_medio", l['saldo_medio'])
+        self.liga.salvar()
+
+    def _on_training_end(self) -> None:
+        self.liga.salvar()
+
+
+def imprimir_relatorio(liga):
+    print("\n" + "=" * 80)
+    print(f"🏟️  LIGA DE SELF-PLAY ({len(liga)} adversários, Elo do agente: {liga.elo().get('agente', 0.0):.0f})")
+    print("=" * 80)
+    print(f"   {'id':10s} {'passo':>10s} {'categoria':10s} {'elo':>6s} {'jogos':>6s} {'V':>5s} {'E':>5s} "
+          f"{'D':>5s} {'vitória':>8s} {'saldo':>6s}")
+    for l in liga.relatorio():
+        elo = f"{l['elo']:6.0f}" if l['elo'] is not None else f"{'-':>6s}"
+        taxa = f"{l['taxa_vitoria']:8.1%}" if l['jogos'] else f"{'-':>8s}"
+        saldo = f"{l['saldo_medio']:+6.2f}" if l['jogos'] else f"{'-':>6s}"
+        print(f"   {l['id']:10s} {l['passo']:10d} {l['categoria']:10s} {elo} {l['jogos']:6d} {l['vitorias']:5d} "
+              f"{l['empates']:5d} {l['derrotas']:5d} {taxa} {saldo}")
+    if liga.estado['removidos']:
+        print(f"   ({len(liga.estado['removidos'])} fotos já saíram do pool; histórico em {liga.caminho})")
+
+
+# === TREINO ===
+def treinar(timesteps=3_000_000, modelo=MODELO_INICIAL, normalizador=NORMALIZADOR_INICIAL, pasta=PASTA_LIGA,
+            n_envs=8, capacidade=8, n_melhores=2, freq_foto=200_000, seed=0):
+    models_dir = f"{pasta}/models"
+    os.makedirs(models_dir, exist_ok=True)
+    liga = LigaAdversarios(pasta, capacidade=capacidade, n_melhores=n_melhores, seed=seed)
+
+    vec_env = criar_vec_selfplay(liga, n_envs=n_envs, seed=seed)
+    if normalizador and os.path.exists(normalizador):
+        vec_env = VecNormalize.load(normalizador, vec_env)
+        vec_env.training = True
+        vec_env.norm_reward = False
+    else:
+        vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=False, clip_obs=10.)
+
+    print(f"🧠 Carregando o agente inicial: {modelo}")
+    model = PPO.load(modelo, env=vec_env, device="auto")
+    model.tensorboard_log = pasta
+
+    liga_cb = LigaCallback(liga, freq_foto=freq_foto, verbose=1)
+    liga_cb.init_callback(model)
+    if not len(liga):
+        # Primeiro adversário: o próprio agente inicial
+        liga_cb.tirar_foto()
+
+    callbacks = [
+        CheckpointAssincrono(save_freq=100_000, pasta=models_dir, prefixo='ckpt_selfplay'),
+        # O placar contra o bot continua sendo a régua externa
+        AsyncEvalCallback(eval_freq=200_000, pasta=f"{pasta}/melhor_modelo", cenario='5_vs_5'),
+        liga_cb,
+        EpisodeMetrics(),
+        NonFiniteCounter(),
+        # GFOOTBALL_PERFIL=1: tempo de cada etapa no TensorBoard + pasta/perfil.json
+        *perfil_opcional(pasta),
+    ]
+    model.learn(total_timesteps=timesteps, callback=callbacks, progress_bar=True, reset_num_timesteps=False)
+
+    model.save(f"{models_dir}/CAMPEAO_SELFPLAY")
+    vec_env.save(f"{models_dir}/vec_normalize_selfplay.pkl")
+    vec_env.close()
+    imprimir_relatorio(liga)
+    return liga
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-play 5_vs_5 contra um pool de fotos do próprio agente.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_treino = sub.add_parser('treinar')
+    p_treino.add_argument('--timesteps', type=int, default=3_000_000)
+    p_treino.add_argument('--modelo', default=MODELO_INICIAL)
+    p_treino.add_argument('--normalizador', default=NORMALIZADOR_INICIAL)
+    p_treino.add_argument('--pasta', default=PASTA_LIGA)
+    p_treino.add_argument('--n-envs', type=int, default=8)
+    p_treino.add_argument('--capacidade', type=int, default=8, help="Máximo de adversários no pool")
+    p_treino.add_argument('--melhores', type=int, default=2, help="Quantos melhores por Elo nunca saem")
+    p_treino.add_argument('--freq-foto', type=int, default=200_000, help="Passos entre fotos do agente")
+    p_treino.add_argument('--seed', type=int, default=0)
+    p_rel = sub.add_parser('relatorio')
+    p_rel.add_argument('--pasta', default=PASTA_LIGA)
+    args = parser.parse_args()
+
+    if args.comando == 'treinar':
+        treinar(args.timesteps, args.modelo, args.normalizador, args.pasta, n_envs=args.n_envs,
+                capacidade=args.capacidade, n_melhores=args.melhores, freq_foto=args.freq_foto, seed=args.seed)
+    else:
+        imprimir_relatorio(LigaAdversarios(args.pasta))
@@ -0,0 +1,90 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecNormalize, unwrap_vec_wrapper
+import numpy as np
+
+from ambientes import DIM_QUADRO
+
+# ==============================================================================
+# MÉTRICAS POR EPISÓDIO (substitui o GoalCounter de cada script)
+# ==============================================================================
+# O GoalCounter adivinhava gol pelo tamanho da recompensa (r > 0 no 01,
+# r > 0.8 nos outros) num loop Python a cada passo. Aqui o gol vem do
+# info['score_reward'] (o placar do motor, igual com qualquer moldagem) e a
+# posse da observação crua (one-hot do dono da bola no quadro mais novo).
+# Tudo fica em arrays de um elemento por ambiente, atualizados com NumPy sobre
+# o lote; no fim de cada episódio a linha do ambiente vai para a lista do
+# rollout, e ao fim do rollout sai um registro só no TensorBoard:
+#
+#   jogos/episodios, jogos/gols_pro, jogos/gols_contra, jogos/vitorias,
+#   jogos/empates, jogos/derrotas, jogos/duracao, jogos/posse
+#   rollout/goals   (mesma chave do GoalCounter, soma dos gols no rollout)
+#
+#   callbacks = [..., EpisodeMetrics()]      # verbose=1 também imprime os gols do rollout
+
+# One-hot do dono da bola (ninguém, esquerda, direita) dentro de um quadro
+POSSE_NOSSA, POSSE_DELES = 95, 96
+
+
+class EpisodeMetrics(BaseCallback):
+    def _on_training_start(self) -> None:
+        n = self.training_env.num_envs
+        # Com VecNormalize o new_obs do PPO já vem normalizado: a posse sai do old_obs
+        self._normalizador = unwrap_vec_wrapper(self.training_env, VecNormalize)
+        self._gols_pro = np.zeros(n, dtype=np.int64)
+        self._gols_contra = np.zeros(n, dtype=np.int64)
+        self._passos = np.zeros(n, dtype=np.int64)
+        self._posse_nossa = np.zeros(n, dtype=np.int64)
+        self._posse_deles = np.zeros(n, dtype=np.int64)
+        self._gols_rollout = 0
+        self._fins = []
+
+    def _obs_cruas(self):
+        if self._normalizador is not None:
+            return self._normalizador.old_obs
+        return self.locals.get('new_obs')
+
+    def _on_step(self) -> bool:
+        infos = self.locals['infos']
+        placar = np.fromiter((info.get('score_reward', 0.0) for info in infos), np.float64, len(infos))
+        self._gols_pro += placar > 0
+        self._gols_contra += placar < 0
+        self._passos += 1
+        obs = self._obs_cruas()
+        if isinstance(obs, np.ndarray) and obs.ndim == 2:
+            # No passo final o obs já é o do reset; um quadro a menos na posse não muda a média
+            quadro = obs[:, -DIM_QUADRO:]
+            self._posse_nossa += quadro[:, POSSE_NOSSA] > 0.5
+            self._posse_deles += quadro[:, POSSE_DELES] > 0.5
+
+        dones = self.locals['dones']
+        if dones.any():
+            fim = np.flatnonzero(dones)
+            self._fins.append(np.stack([self._gols_pro[fim], self._gols_contra[fim], self._passos[fim],
+                                        self._posse_nossa[fim], self._posse_deles[fim]], axis=1))
+            for contador in (self._gols_pro, self._gols_contra, self._passos, self._posse_nossa, self._posse_deles):
+                contador[fim] = 0
+        self._gols_rollout += int((placar > 0).sum())
+        return True
+
+    def _on_rollout_end(self) -> None:
+        self.logger.record('rollout/goals', self._gols_rollout)
+        if self.verbose:
+            print(f"📊 Gols neste Rollout: {self._gols_rollout}")
+        self._gols_rollout = 0
+        if not self._fins:
+            self.logger.record('jogos/episodios', 0)
+            return
+        fins = np.concatenate(self._fins)
+        self._fins = []
+        pro, contra, passos, nossa, deles = fins.T
+        saldo = np.sign(pro - contra)
+        com_dono = nossa + deles
+        self.logger.record('jogos/episodios', len(fins))
+        self.logger.record('jogos/gols_pro', float(pro.mean()))
+        self.logger.record('jogos/gols_contra', float(contra.mean()))
+        self.logger.record('jogos/vitorias', float((saldo > 0).mean()))
+        self.logger.record('jogos/empates', float((saldo == 0).mean()))
+        self.logger.record('jogos/derrotas', float((saldo < 0).mean()))
+        self.logger.record('jogos/duracao', float(passos.mean()))
+        if com_dono.any():
+            self.logger.record('jogos/posse', float(nossa.sum() / com_dono.sum()))
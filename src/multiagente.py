@@ -0,0 +1,180 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecEnvWrapper, VecNormalize
+from gymnasium import spaces
+from functools import partial
+import argparse
+import os
+import numpy as np
+
+from ambientes import chaves_recompensa, criar_env, jogadores_controlaveis
+from checkpoint_assincrono import CheckpointAssincrono
+from curriculo import PPO_KWARGS
+from instrumentacao import perfil_opcional
+from metricas import EpisodeMetrics
+from rollout_compacto import compactar_rollout
+from vec_env_paralelo import SharedMemoryVecEnv
+from vec_sanitize import NonFiniteCounter, VecSanitize
+
+# ==============================================================================
+# MULTIAGENTE (os jogadores de linha do time esquerdo, uma política só)
+# ==============================================================================
+# Até aqui o agente controla só o jogador ativo e o resto do time é do bot.
+# Aqui o gfootball entrega uma observação por jogador controlado (cada uma com
+# o próprio one-hot de jogador ativo) e recebe uma ação por jogador.
+# Por padrão N é o controllable_left_players do cenário: o goleiro não é
+# controlável e fica com o bot.
+#
+# Os jogadores viram "envs" para o PPO: com n_envs ambientes e N jogadores o
+# VecTodosJogadores mostra n_envs * N linhas de (460,) e Discrete(19). Um passo
+# é UM forward da política com o lote inteiro (pesos compartilhados entre os
+# jogadores) e as ações voltam como MultiDiscrete([19] * N) para cada ambiente.
+# Espaços iguais aos do agente de um jogador: dá para começar do CAMPEAO_5V5
+# e do vec_normalize dele.
+#
+# Cada linha recebe a própria recompensa (o checkpoints vai para quem estava com
+# a bola) e o done do ambiente. O info do ambiente é repetido em cada linha: as
+# médias do EpisodeMetrics/Monitor não mudam, as contagens saem multiplicadas
+# por N. O num_timesteps do PPO conta passos de jogador (N por passo do jogo).
+#
+#   python3 src/multiagente.py --cenario 5_vs_5 --n-envs 8 --timesteps 5000000
+
+PASTA_MULTI = os.path.expanduser("~/gfootball_logs/MULTIAGENTE")
+MODELO_INICIAL = os.path.expanduser("~/gfootball_logs/FASE5_FINAL/models/CAMPEAO_5V5")
+NORMALIZADOR_INICIAL = os.path.expanduser("~/gfootball_logs/FASE5_FINAL/models/vec_normalize_5v5.pkl")
+
+
+class VecTodosJogadores(VecEnvWrapper):
+    def __init__(self, venv):
+        espaco = venv.observation_space
+        self.n_jogadores = int(len(venv.action_space.nvec))
+        self._chaves = chaves_recompensa(self.n_jogadores)
+        super().__init__(
+            venv,
+            observation_space=spaces.Box(low=espaco.low[0], high=espaco.high[0], dtype=espaco.dtype),
+            action_space=spaces.Discrete(int(venv.action_space.nvec[0])),
+        )
+        # Uma "env" do PPO por jogador
+        self.num_envs = venv.num_envs * self.n_jogadores
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+
+    def _achatar(self, obs):
+        return obs.reshape(self.num_envs, *self.observation_space.shape)
+
+    def reset(self):
+        return self._achatar(self.venv.reset())
+
+    def step_async(self, actions):
+        self.venv.step_async(np.asarray(actions).reshape(self.venv.num_envs, self.n_jogadores))
+
+    def step_wait(self):
+        obs, rews, dones, infos = self.venv.step_wait()
+        n = self.n_jogadores
+        recompensas = np.repeat(np.asarray(rews, dtype=np.float32)[:, None], n, axis=1)
+        infos_jogadores = []
+        for i, info in enumerate(infos):
+            if self._chaves[0] in info:
+                recompensas[i] = [info[c] for c in self._chaves]
+            terminal = info.get('terminal_observation') if dones[i] else None
+            if terminal is None:
+                infos_jogadores.extend([info] * n)
+            else:
+                infos_jogadores.extend(dict(info, terminal_observation=terminal[j]) for j in range(n))
+        return self._achatar(obs), recompensas.reshape(-1), np.repeat(dones, n), infos_jogadores
+
+    # --- índices do PPO (um por jogador) -> ambientes de baixo ---
+    def _ambientes(self, indices):
+        if indices is None:
+            indices = range(self.num_envs)
+        elif isinstance(indices, int):
+            indices = [indices]
+        ambientes = [i // self.n_jogadores for i in indices]
+        return ambientes, sorted(set(ambientes))
+
+    def get_attr(self, attr_name, indices=None):
+        ambientes, unicos = self._ambientes(indices)
+        valores = dict(zip(unicos, self.venv.get_attr(attr_name, unicos)))
+        return [valores[a] for a in ambientes]
+
+    def set_attr(self, attr_name, value, indices=None):
+        _, unicos = self._ambientes(indices)
+        return self.venv.set_attr(attr_name, value, unicos)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        ambientes, unicos = self._ambientes(indices)
+        valores = dict(zip(unicos, self.venv.env_method(method_name, *method_args, indices=unicos,
+                                                         **method_kwargs)))
+        return [valores[a] for a in ambientes]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        ambientes, unicos = self._ambientes(indices)
+        valores = dict(zip(unicos, self.venv.env_is_wrapped(wrapper_class, unicos)))
+        return [valores[a] for a in ambientes]
+
+
+def criar_vec_multiagente(env_name='5_vs_5', n_envs=8, jogadores=None, rewards='scoring,checkpoints', seed=0,
+                          **kwargs):
+    # jogadores=None: todos os controláveis do cenário (o goleiro fica com o bot)
+    if jogadores is None:
+        jogadores = jogadores_controlaveis(env_name)
+    if jogadores < 2:
+        raise ValueError(f"multiagente: {env_name} tem {jogadores} jogador controlável, use os scripts de um jogador")
+    env_fns = [partial(criar_env, env_name=env_name, rewards=rewards, seed=seed + i, jogadores=jogadores)
+               for i in range(n_envs)]
+    # A recompensa de cada jogador tem que chegar a cada passo, não só no fim do episódio
+    kwargs['info_keys'] = ('score_reward', *chaves_recompensa(jogadores))
+    venv = VecSanitize(SharedMemoryVecEnv(env_fns, **kwargs))
+    return VecTodosJogadores(venv)
+
+
+def treinar(timesteps=5_000_000, cenario='5_vs_5', modelo=MODELO_INICIAL, normalizador=NORMALIZADOR_INICIAL,
+            pasta=PASTA_MULTI, n_envs=8, jogadores=None, seed=0):
+    models_dir = f"{pasta}/models"
+    os.makedirs(models_dir, exist_ok=True)
+
+    vec_env = criar_vec_multiagente(cenario, n_envs=n_envs, jogadores=jogadores, seed=seed)
+    print(f"👥 {vec_env.venv.num_envs} ambientes x {vec_env.n_jogadores} jogadores = "
+          f"{vec_env.num_envs} observações por forward")
+    if normalizador and os.path.exists(normalizador):
+        vec_env = VecNormalize.load(normalizador, vec_env)
+        vec_env.training = True
+        vec_env.norm_reward = False
+    else:
+        vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=False, clip_obs=10.)
+
+    if modelo and os.path.exists(modelo if modelo.endswith('.zip') else modelo + '.zip'):
+        print(f"🧠 Carregando o agente inicial: {modelo}")
+        model = PPO.load(modelo, env=vec_env, device="auto")
+        model.tensorboard_log = pasta
+    else:
+        print("🧠 Agente novo")
+        model = PPO("MlpPolicy", vec_env, tensorboard_log=pasta, seed=seed, verbose=1, **PPO_KWARGS)
+    # Com N jogadores o rollout fica N vezes maior: só o quadro novo é guardado
+    compactar_rollout(model)
+
+    callbacks = [
+        CheckpointAssincrono(save_freq=100_000, pasta=models_dir, prefixo='ckpt_multi'),
+        EpisodeMetrics(),
+        NonFiniteCounter(),
+        *perfil_opcional(pasta),
+    ]
+    model.learn(total_timesteps=timesteps, callback=callbacks, progress_bar=True, reset_num_timesteps=False)
+
+    model.save(f"{models_dir}/CAMPEAO_MULTI")
+    vec_env.save(f"{models_dir}/vec_normalize_multi.pkl")
+    vec_env.close()
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treina uma política compartilhada por todos os jogadores do time.")
+    parser.add_argument('--timesteps', type=int, default=5_000_000, help="Passos de jogador (N por passo do jogo)")
+    parser.add_argument('--cenario', default='5_vs_5')
+    parser.add_argument('--modelo', default=MODELO_INICIAL, help="Agente de um jogador para começar ('' = novo)")
+    parser.add_argument('--normalizador', default=NORMALIZADOR_INICIAL)
+    parser.add_argument('--pasta', default=PASTA_MULTI)
+    parser.add_argument('--n-envs', type=int, default=8)
+    parser.add_argument('--jogadores', type=int, default=None, help="Padrão: todos os controláveis (sem o goleiro)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    treinar(args.timesteps, args.cenario, args.modelo, args.normalizador, args.pasta, n_envs=args.n_envs,
+            jogadores=args.jogadores, seed=args.seed)
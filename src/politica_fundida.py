@@ -0,0 +1,122 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+from politica_numpy import PoliticaNumpy, empacotar, ler_normalizador, ler_npz
+
+# ==============================================================================
+# NORMALIZAÇÃO + POLÍTICA NUMA PASSADA SÓ (torch)
+# ==============================================================================
+# Na inferência os scripts fazem VecNormalize.normalize_obs (NumPy) e depois
+# model.predict (NumPy -> torch -> NumPy). Aqui a normalização entra dentro da
+# primeira camada:
+#
+#   clip((x - μ)·s, -c, c)  com s = 1/sqrt(var + eps)
+#   == (clamp(x, μ - c/s, μ + c/s) - μ)·s          (s > 0: o clip vira um clamp em x)
+#   W·((x' - μ)·s) + b == (W·diag(s))·x' + (b - W·(μ·s))
+#
+# Então a rede recebe a observação CRUA (simple115 empilhada), faz um clamp
+# por coordenada e uma camada linear já "dobrada", sem perder o clip. As
+# primeiras camadas do ator e do crítico também viram uma matriz só: um matmul
+# para os dois. Saem ações e valores na mesma chamada.
+#
+#   politica = PoliticaFundida.de_arquivos("CAMPEAO_5V5.zip", "vec_normalize_5v5.pkl")
+#   acoes, valores = politica.agir(obs_cruas)
+
+
+_ATIVACOES = {'tanh': nn.Tanh, 'relu': nn.ReLU, 'identidade': nn.Identity}
+
+
+def _linear(W, b):
+    # W vem transposto do politica_numpy (entrada, saída)
+    camada = nn.Linear(W.shape[0], W.shape[1])
+    with torch.no_grad():
+        camada.weight.copy_(torch.as_tensor(np.ascontiguousarray(W.T), dtype=torch.float32))
+        camada.bias.copy_(torch.as_tensor(b, dtype=torch.float32))
+    return camada
+
+
+class PoliticaFundida(nn.Module):
+    def __init__(self, arrays, ativacao, normalizacao=None):
+        super().__init__()
+        pi = [(arrays[f'pi_W{k}'], arrays[f'pi_b{k}']) for k in range(int(arrays['pi_n']))]
+        vf = [(arrays[f'vf_W{k}'], arrays[f'vf_b{k}']) for k in range(int(arrays['vf_n']))]
+        dim_obs = pi[0][0].shape[0]
+        self.n_pi = pi[0][0].shape[1]
+
+        # Primeira camada do ator e do crítico lado a lado, em float64 para dobrar sem erro
+        W = np.concatenate([pi[0][0], vf[0][0]], axis=1).astype(np.float64)
+        b = np.concatenate([pi[0][1], vf[0][1]]).astype(np.float64)
+        if normalizacao is not None:
+            media = normalizacao['obs_media'].astype(np.float64)
+            desvio = np.sqrt(normalizacao['obs_var'].astype(np.float64) + float(normalizacao['epsilon']))
+            c = float(normalizacao['clip_obs'])
+            escala = 1.0 / desvio
+            b = b - (media * escala) @ W
+            W = W * escala[:, None]
+            baixo, alto = media - c * desvio, media + c * desvio
+        else:
+            baixo, alto = np.full(dim_obs, -np.inf), np.full(dim_obs, np.inf)
+        self.register_buffer('baixo', torch.as_tensor(baixo, dtype=torch.float32))
+        self.register_buffer('alto', torch.as_tensor(alto, dtype=torch.float32))
+        self.entrada = _linear(W, b)
+
+        ativ = _ATIVACOES[ativacao]
+        self.pi = self._resto(pi, ativ)
+        self.vf = self._resto(vf, ativ)
+
+    @staticmethod
+    def _resto(camadas, ativ):
+        # Camadas depois da primeira. Sem camada oculta a primeira já é a cabeça
+        if len(camadas) == 1:
+            return nn.Identity()
+        modulos = [ativ()]
+        for k, (W, b) in enumerate(camadas[1:], start=1):
+            modulos.append(_linear(W, b))
+            if k < len(camadas) - 1:
+                modulos.append(ativ())
+        return nn.Sequential(*modulos)
+
+    def forward(self, obs):
+        x = torch.maximum(torch.minimum(obs, self.alto), self.baixo)
+        h = self.entrada(x)
+        logits = self.pi(h[:, :self.n_pi])
+        valores = self.vf(h[:, self.n_pi:])
+        return logits, valores.squeeze(-1)
+
+    @torch.inference_mode()
+    def agir(self, obs, deterministic=True):
+        # NumPy cru entra, NumPy sai: uma conversão em cada ponta (from_numpy não copia)
+        obs = torch.from_numpy(np.ascontiguousarray(obs, dtype=np.float32).reshape(len(obs), -1))
+        logits, valores = self(obs)
+        if deterministic:
+            acoes = logits.argmax(dim=1)
+        else:
+            acoes = torch.distributions.Categorical(logits=logits).sample()
+        return acoes.numpy(), valores.numpy()
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        return self.agir(obs, deterministic=deterministic)[0], state
+
+    # === CONSTRUTORES ===
+    @classmethod
+    def de_arrays(cls, arrays):
+        # Mesmo conteúdo do .npz do politica_numpy.py
+        meta = PoliticaNumpy(arrays).meta
+        norm = {k: arrays[k] for k in ('obs_media', 'obs_var', 'clip_obs', 'epsilon')} if meta['normalizado'] else None
+        return cls(arrays, meta['ativacao'], norm).eval()
+
+    @classmethod
+    def de_modelo(cls, model, normalizador=None):
+        norm = ler_normalizador(normalizador) if normalizador else None
+        return cls.de_arrays(empacotar(model, norm))
+
+    @classmethod
+    def de_arquivos(cls, modelo, normalizador=None):
+        from stable_baselines3 import PPO
+        return cls.de_modelo(PPO.load(modelo, device="cpu"), normalizador)
+
+    @classmethod
+    def de_npz(cls, caminho):
+        # Reaproveita a exportação do politica_numpy.py (não precisa do SB3)
+        return cls.de_arrays(ler_npz(caminho))
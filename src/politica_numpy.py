@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+# ==============================================================================
+# POLÍTICA SÓ PARA INFERÊNCIA (NumPy puro, sem torch)
+# ==============================================================================
+# O PPO.load abre o zip inteiro (data, otimizador, ...) e carrega o torch e o
+# SB3 só para escolher ações. Aqui exportamos apenas o que a inferência usa:
+#
+#   média/variância do vec_normalize_*.pkl -> MLP do ator -> logits -> argmax
+#   (+ a MLP do crítico, para quem quiser o valor)
+#
+# num único .npz versionado. Carregar leva milissegundos e não importa o torch:
+# bom para os muitos processos de avaliação/self-play.
+#
+#   python3 src/politica_numpy.py exportar CAMPEAO_5V5.zip --normalizador vec_normalize_5v5.pkl
+#   python3 src/politica_numpy.py conferir CAMPEAO_5V5.npz CAMPEAO_5V5.zip --normalizador vec_normalize_5v5.pkl
+
+FORMATO = 'politica_numpy'
+VERSAO = 1
+
+ATIVACOES = {
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'identidade': lambda x: x,
+}
+
+
+# === EXPORTAÇÃO (precisa do SB3/torch, roda uma vez) ===
+def _camadas_lineares(sequencial):
+    import torch.nn as nn
+    return [m for m in sequencial if isinstance(m, nn.Linear)]
+
+
+def _nome_ativacao(policy):
+    nome = policy.activation_fn.__name__.lower()
+    if nome not in ATIVACOES:
+        raise ValueError(f"Ativação não suportada na exportação: {policy.activation_fn.__name__}")
+    return nome
+
+
+def extrair_pesos(model):
+    # Aceita o PPO inteiro ou só a policy (ActorCriticPolicy)
+    policy = getattr(model, 'policy', model)
+    if type(policy.features_extractor).__name__ != 'FlattenExtractor':
+        raise ValueError("Só políticas MLP (FlattenExtractor) podem ser exportadas")
+    arrays = {}
+    for ramo, rede, cabeca in (('pi', policy.mlp_extractor.policy_net, policy.action_net),
+                               ('vf', policy.mlp_extractor.value_net, policy.value_net)):
+        camadas = _camadas_lineares(rede) + [cabeca]
+        for k, camada in enumerate(camadas):
+            # Guardamos W transposto: x @ W + b no runtime, sem .T a cada passo
+            arrays[f'{ramo}_W{k}'] = camada.weight.detach().cpu().numpy().T.astype(np.float32)
+            arrays[f'{ramo}_b{k}'] = camada.bias.detach().cpu().numpy().astype(np.float32)
+        arrays[f'{ramo}_n'] = np.array(len(camadas))
+    return arrays, _nome_ativacao(policy)
+
+
+def ler_normalizador(caminho):
+    import pickle
+    with open(caminho, 'rb') as f:
+        return arrays_normalizador(pickle.load(f))
+
+
+def arrays_normalizador(vec_normalize):
+    if not vec_normalize.norm_obs:
+        return None
+    return {
+        'obs_media': vec_normalize.obs_rms.mean.astype(np.float32),
+        'obs_var': vec_normalize.obs_rms.var.astype(np.float32),
+        'clip_obs': np.array(vec_normalize.clip_obs, dtype=np.float32),
+        'epsilon': np.array(vec_normalize.epsilon, dtype=np.float32),
+    }
+
+
+def empacotar(model, norm=None, origem=None):
+    # Tudo o que vai para o .npz: pesos, normalização e o cabeçalho JSON
+    policy = getattr(model, 'policy', model)
+    arrays, ativacao = extrair_pesos(policy)
+    if norm is not None:
+        arrays.update(norm)
+    meta = {
+        'formato': FORMATO,
+        'versao': VERSAO,
+        'ativacao': ativacao,
+        'n_acoes': int(policy.action_space.n),
+        'dim_obs': int(np.prod(policy.observation_space.shape)),
+        'normalizado': norm is not None,
+        'origem': origem,
+    }
+    arrays['meta'] = np.array(json.dumps(meta))
+    return arrays
+
+
+def exportar(modelo, normalizador, destino):
+    from stable_baselines3 import PPO
+    model = PPO.load(modelo, device="cpu")
+    norm = ler_normalizador(normalizador) if normalizador else None
+    arrays = empacotar(model, norm, origem={
+        'modelo': os.path.abspath(modelo),
+        'normalizador': os.path.abspath(normalizador) if normalizador else None,
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, 'wb') as f:
+        np.savez(f, **arrays)
+    return destino
+
+
+# === RUNTIME (só NumPy) ===
+class PoliticaNumpy:
+    def __init__(self, arrays):
+        self.meta = json.loads(str(arrays['meta']))
+        if self.meta.get('formato') != FORMATO:
+            raise ValueError("Arquivo não é uma política exportada pelo politica_numpy.py")
+        if self.meta['versao'] > VERSAO:
+            raise ValueError(f"Versão {self.meta['versao']} do arquivo é mais nova que o runtime ({VERSAO})")
+        self.n_acoes = self.meta['n_acoes']
+        self.dim_obs = self.meta['dim_obs']
+        self._ativacao = ATIVACOES[self.meta['ativacao']]
+        self.pi = [(arrays[f'pi_W{k}'], arrays[f'pi_b{k}']) for k in range(int(arrays['pi_n']))]
+        self.vf = [(arrays[f'vf_W{k}'], arrays[f'vf_b{k}']) for k in range(int(arrays['vf_n']))]
+        self.normalizado = self.meta['normalizado']
+        if self.normalizado:
+            self.obs_media = arrays['obs_media']
+            self.obs_escala = (1.0 / np.sqrt(arrays['obs_var'] + arrays['epsilon'])).astype(np.float32)
+            self.clip_obs = float(arrays['clip_obs'])
+
+    @classmethod
+    def carregar(cls, caminho):
+        return cls(ler_npz(caminho))
+
+    def normalizar(self, obs):
+        # O mesmo que o VecNormalize.normalize_obs (com o clip)
+        obs = np.asarray(obs, dtype=np.float32).reshape(-1, self.dim_obs)
+        if not self.normalizado:
+            return obs
+        x = (obs - self.obs_media) * self.obs_escala
+        return np.clip(x, -self.clip_obs, self.clip_obs, out=x)
+
+    def _mlp(self, camadas, x):
+        for W, b in camadas[:-1]:
+            x = self._ativacao(x @ W + b)
+        W, b = camadas[-1]
+        return x @ W + b
+
+    def logits(self, obs):
+        return self._mlp(self.pi, self.normalizar(obs))
+
+    def valor(self, obs):
+        return self._mlp(self.vf, self.normalizar(obs))[:, 0]
+
+    def agir(self, obs, deterministic=True, rng=None):
+        logits = self.logits(obs)
+        if deterministic:
+            return logits.argmax(axis=1)
+        # Gumbel-max: amostra da categórica direto dos logits
+        rng = rng or np.random.default_rng()
+        return (logits - np.log(-np.log(rng.random(logits.shape)))).argmax(axis=1)
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        # Mesma assinatura do model.predict do SB3 (avaliador.py usa as duas)
+        return self.agir(obs, deterministic=deterministic), state
+
+
+def ler_npz(caminho):
+    with np.load(caminho, allow_pickle=False) as dados:
+        return {k: dados[k] for k in dados.files}
+
+
+def eh_politica_numpy(caminho):
+    return isinstance(caminho, str) and caminho.endswith('.npz')
+
+
+def conferir(caminho_npz, modelo, normalizador, n=4096, seed=0):
+    # Mesmas ações que o PPO + VecNormalize em observações sorteadas da faixa do treino
+    from stable_baselines3 import PPO
+    politica = PoliticaNumpy.carregar(caminho_npz)
+    model = PPO.load(modelo, device="cpu")
+    rng = np.random.default_rng(seed)
+    norm = ler_normalizador(normalizador) if normalizador else None
+    if norm is not None:
+        desvio = np.sqrt(norm['obs_var'])
+        obs = (norm['obs_media'] + desvio * rng.standard_normal((n, politica.dim_obs))).astype(np.float32)
+        obs_sb3 = np.clip((obs - norm['obs_media']) / np.sqrt(norm['obs_var'] + norm['epsilon']),
+                          -norm['clip_obs'], norm['clip_obs'])
+    else:
+        obs = obs_sb3 = rng.uniform(-1, 1, (n, politica.dim_obs)).astype(np.float32)
+    esperado = model.predict(obs_sb3, deterministic=True)[0]
+    obtido = politica.agir(obs)
+    return float((esperado == obtido).mean())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta/confere políticas para inferência só com NumPy.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_exp = sub.add_parser('exportar')
+    p_exp.add_argument('modelo')
+    p_exp.add_argument('--normalizador', default=None)
+    p_exp.add_argument('--saida', default=None, help="Padrão: <modelo>.npz ao lado do zip")
+    p_conf = sub.add_parser('conferir')
+    p_conf.add_argument('npz')
+    p_conf.add_argument('modelo')
+    p_conf.add_argument('--normalizador', default=None)
+    args = parser.parse_args()
+
+    if args.comando == 'exportar':
+        zip_original = args.modelo if args.modelo.endswith('.zip') else args.modelo + ".zip"
+        saida = args.saida or os.path.splitext(zip_original)[0] + ".npz"
+        exportar(args.modelo, args.normalizador, saida)
+        inicio = time.perf_counter()
+        politica = PoliticaNumpy.carregar(saida)
+        ms = (time.perf_counter() - inicio) * 1000
+        print(f"📦 {saida}: {os.path.getsize(saida) / 1024:.0f} KB "
+              f"(zip original: {os.path.getsize(zip_original) / 1024:.0f} KB), carrega em {ms:.1f} ms")
+    else:
+        iguais = conferir(args.npz, args.modelo, args.normalizador)
+        print(f"🔍 Ações iguais ao PPO: {iguais:.2%}")
@@ -0,0 +1,215 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper, unwrap_vec_wrapper
+import numpy as np
+
+from ambientes import DIM_QUADRO, JOGADORES_POR_CENARIO, N_QUADROS
+
+# ==============================================================================
+# RECOMPENSA MOLDADA VETORIZADA (uma etapa do VecEnv, todos os envs de uma vez)
+# ==============================================================================
+# O 'scoring,checkpoints' do motor é a única moldagem que temos, e o agente já
+# aprendeu a "farmar" pontos tocando a bola sem objetivo. Aqui cada termo tem
+# nome e peso, é calculado em NumPy sobre o lote inteiro de observações
+# simple115 (sem loop por ambiente em Python) e soma na recompensa do motor:
+#
+#   posse           +1 por passo com a bola no time esquerdo
+#   progressao      avanço da bola (Δx) enquanto o time esquerdo fica com ela
+#   pressao         sem a bola: aproximação do nosso jogador mais perto da bola
+#   passe_ao_vazio  -1 quando um passe nosso termina com o rival na bola, ou
+#                   ninguém domina a bola até `espera` passos depois
+#
+# A transição vem dos dois últimos quadros da própria observação empilhada
+# (no fim do episódio, da terminal_observation), então só o passe_ao_vazio
+# guarda estado. Cada termo soma a própria contribuição; o ShapingLogger manda
+# para o TensorBoard (recompensa/*) ao fim de cada rollout, para ver qual termo
+# está sendo explorado.
+#
+#   vec_env = VecSanitize(criar_vec_env(make_env, n_envs=8, copiar_obs=False))
+#   vec_env = VecRewardShaping(vec_env, {'posse': 0.001, 'progressao': 0.2}, cenario='5_vs_5')
+#   vec_env = VecNormalize(vec_env, ...)
+#
+# No simple115 (sem o v2) as posições dos times não ficam em lugar fixo: o time
+# direito começa logo depois do esquerdo, então é preciso saber quantos
+# jogadores cada lado tem (JOGADORES_POR_CENARIO, no ambientes.py).
+
+ACOES_PASSE = (9, 10, 11)  # long_pass, high_pass, short_pass
+BOLA = slice(88, 90)
+DONO_ESQUERDA, DONO_DIREITA = 95, 96
+
+
+# === CONTEXTO DE UM PASSO (tudo em lote: uma linha por ambiente) ===
+class Transicao:
+    def __init__(self, antes, depois, acoes, dones, n_esquerda):
+        self.antes = antes      # quadro anterior (n, 115)
+        self.depois = depois    # quadro atual (n, 115)
+        self.acoes = acoes
+        self.dones = dones
+        self.n_esquerda = n_esquerda
+
+    def esquerda(self, quadro):
+        return quadro[:, :2 * self.n_esquerda].reshape(len(quadro), self.n_esquerda, 2)
+
+    def distancia_a_bola(self, quadro):
+        # Distância do jogador do time esquerdo mais perto da bola
+        delta = self.esquerda(quadro) - quadro[:, None, BOLA]
+        return np.sqrt((delta ** 2).sum(axis=2)).min(axis=1)
+
+
+# === TERMOS ===
+class Termo:
+    nome = None
+
+    def __init__(self, peso):
+        self.peso = peso
+
+    def preparar(self, n_envs):
+        pass
+
+    def __call__(self, t):
+        raise NotImplementedError
+
+
+class Posse(Termo):
+    nome = 'posse'
+
+    def __call__(self, t):
+        return t.depois[:, DONO_ESQUERDA]
+
+
+class Progressao(Termo):
+    nome = 'progressao'
+
+    def __call__(self, t):
+        com_a_bola = t.antes[:, DONO_ESQUERDA] * t.depois[:, DONO_ESQUERDA]
+        return (t.depois[:, BOLA.start] - t.antes[:, BOLA.start]) * com_a_bola
+
+
+class Pressao(Termo):
+    nome = 'pressao'
+
+    def __call__(self, t):
+        sem_a_bola = t.depois[:, DONO_DIREITA]
+        return (t.distancia_a_bola(t.antes) - t.distancia_a_bola(t.depois)) * sem_a_bola
+
+
+class PasseAoVazio(Termo):
+    nome = 'passe_ao_vazio'
+
+    def __init__(self, peso, espera=30):
+        super().__init__(peso)
+        self.espera = espera
+
+    def preparar(self, n_envs):
+        # Passos desde o último passe ainda sem desfecho (-1 = nenhum pendente)
+        self._pendente = np.full(n_envs, -1, dtype=np.int64)
+        # A bola já saiu do pé (ficou sem dono) depois do passe?
+        self._saiu = np.zeros(n_envs, dtype=bool)
+
+    def __call__(self, t):
+        p, saiu = self._pendente, self._saiu
+        # Passe novo só conta com a bola no pé e sem outro passe pendente
+        passou = np.isin(t.acoes, ACOES_PASSE) & (t.antes[:, DONO_ESQUERDA] > 0) & (p < 0)
+        p[passou] = 0
+        saiu[passou] = False
+        ativo = (p >= 0) & ~passou
+        p[ativo] += 1
+        nosso = t.depois[:, DONO_ESQUERDA] > 0
+        rival = t.depois[:, DONO_DIREITA] > 0
+        saiu |= ativo & ~nosso & ~rival
+        # O chute do passe leva alguns quadros: só é "nosso de novo" depois de sair
+        perdido = ativo & (rival | (saiu & ~nosso & (p > self.espera)))
+        chegou = ativo & saiu & nosso
+        desistiu = ativo & ~saiu & (p > self.espera)
+        p[perdido | chegou | desistiu | t.dones] = -1
+        return -perdido.astype(np.float32)
+
+
+TERMOS = {c.nome: c for c in (Posse, Progressao, Pressao, PasseAoVazio)}
+
+
+def criar_termos(pesos):
+    # {'posse': 0.001, 'passe_ao_vazio': (0.05, {'espera': 20})} -> lista de Termo
+    termos = []
+    for nome, peso in pesos.items():
+        if nome not in TERMOS:
+            raise ValueError(f"Termo desconhecido: {nome} (disponíveis: {', '.join(TERMOS)})")
+        peso, opcoes = peso if isinstance(peso, tuple) else (peso, {})
+        termos.append(TERMOS[nome](peso, **opcoes))
+    return termos
+
+
+# === ETAPA DO VEC ENV ===
+class VecRewardShaping(VecEnvWrapper):
+    def __init__(self, venv, termos, cenario=None, jogadores=None):
+        super().__init__(venv)
+        if jogadores is None:
+            if cenario not in JOGADORES_POR_CENARIO:
+                raise ValueError(f"Informe jogadores=(esquerda, direita) para o cenário {cenario!r}")
+            jogadores = JOGADORES_POR_CENARIO[cenario]
+        if self.observation_space.shape != (DIM_QUADRO * N_QUADROS,):
+            raise ValueError("VecRewardShaping espera a simple115 empilhada (stacked=True)")
+        self.n_esquerda = jogadores[0]
+        self.termos = criar_termos(termos) if isinstance(termos, dict) else list(termos)
+        for termo in self.termos:
+            termo.preparar(self.num_envs)
+        self._acoes = np.zeros(self.num_envs, dtype=np.int64)
+        self.zerar_somas()
+
+    def zerar_somas(self):
+        # Contribuição acumulada de cada termo (já com o peso) desde a última leitura
+        self.somas = {termo.nome: 0.0 for termo in self.termos}
+        self.somas['motor'] = 0.0
+        self.passos = 0
+
+    def reset(self):
+        for termo in self.termos:
+            termo.preparar(self.num_envs)
+        return self.venv.reset()
+
+    def step_async(self, actions):
+        self._acoes = np.asarray(actions).reshape(self.num_envs)
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        obs, rews, dones, infos = self.venv.step_wait()
+        depois = obs.reshape(self.num_envs, N_QUADROS, DIM_QUADRO)
+        if dones.any():
+            # O obs de quem terminou já é o reset: a transição está na terminal
+            depois = depois.copy()
+            for i in np.flatnonzero(dones):
+                terminal = infos[i].get('terminal_observation')
+                if terminal is not None:
+                    depois[i] = np.asarray(terminal).reshape(N_QUADROS, DIM_QUADRO)
+        t = Transicao(depois[:, -2], depois[:, -1], self._acoes, dones, self.n_esquerda)
+
+        self.somas['motor'] += float(rews.sum())
+        total = rews.astype(np.float32)
+        for termo in self.termos:
+            contribuicao = termo.peso * termo(t)
+            self.somas[termo.nome] += float(contribuicao.sum())
+            total = total + contribuicao
+        self.passos += self.num_envs
+        return obs, total, dones, infos
+
+
+# === CALLBACK ===
+# Uma linha por termo no TensorBoard: soma por ambiente no rollout e a fração
+# do |total| que veio dele (termo com fração crescendo = suspeito de exploração).
+class ShapingLogger(BaseCallback):
+    def _on_training_start(self) -> None:
+        self.etapa = unwrap_vec_wrapper(self.training_env, VecRewardShaping)
+        if self.etapa is None:
+            raise ValueError("ShapingLogger precisa de um VecRewardShaping na pilha do ambiente")
+        self.etapa.zerar_somas()
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        somas = self.etapa.somas
+        n_envs = self.etapa.num_envs
+        absoluto = sum(abs(v) for v in somas.values()) or 1.0
+        for nome, valor in somas.items():
+            self.logger.record(f'recompensa/{nome}', valor / n_envs)
+            self.logger.record(f'recompensa/{nome}_fracao', abs(valor) / absoluto)
+        self.etapa.zerar_somas()
@@ -0,0 +1,196 @@
+from multiprocessing import util
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import pickle
+import shutil
+import subprocess
+import tempfile
+import time
+import traceback
+
+# ==============================================================================
+# RENDERIZAÇÃO DE REPLAYS (.dump -> vídeo) EM LOTE, SEM TELA
+# ==============================================================================
+# Gravar vídeo enquanto a política joga deixa o jogo lento: o motor renderiza
+# cada quadro e o OpenCV codifica o vídeo no mesmo loop. Agora os scripts que
+# gravam partidas (gravar_partida.py, ver_partida.py, avaliador.py --dumps) só
+# escrevem os .dump, e este script transforma os .dump em vídeo depois, com um
+# pool de processos. Cada processo tem o próprio Xvfb quando não há DISPLAY.
+#
+# Modos:
+#   3d   -> replay no motor do jogo (precisa do episódio desde o começo)
+#   2d   -> desenho 2D do OpenCV a partir das posições do dump (sem OpenGL);
+#           o --fps só vale no 3d, o 2d mantém a velocidade da gravação
+#   auto -> 3d quando dá, 2d nos dumps de gol (começam no meio do episódio)
+#
+# O manifesto (manifesto.json na pasta de saída) guarda o que já foi renderizado:
+# dump que não mudou (mesmo tamanho e data) não é renderizado de novo.
+#
+#   python3 src/renderizador_replays.py ./prova_dos_gols
+#   python3 src/renderizador_replays.py ~/dumps --saida ~/videos --workers 6 --vigiar 30
+
+
+def _iniciar_xvfb():
+    # -displayfd: o próprio Xvfb escolhe um display livre e escreve o número no pipe
+    leitura, escrita = os.pipe()
+    xvfb = subprocess.Popen(['Xvfb', '-displayfd', str(escrita), '-screen', '0', '1280x720x24',
+                             '-nolisten', 'tcp'], pass_fds=(escrita,),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(escrita)
+    with os.fdopen(leitura) as f:
+        display = f.readline().strip()
+    if not display:
+        raise RuntimeError("Xvfb não subiu (está instalado?)")
+    os.environ['DISPLAY'] = f":{display}"
+    # Finalize roda na saída normal do worker do Pool (atexit não roda lá)
+    util.Finalize(None, xvfb.terminate, exitpriority=10)
+
+
+def _iniciar_worker(headless):
+    if headless and not os.environ.get('DISPLAY'):
+        _iniciar_xvfb()
+
+
+def _renderizar_2d(dump, pasta, formato):
+    from gfootball.env import config, observation_processor
+    from gfootball.env.script_helpers import ScriptHelpers
+    passos = ScriptHelpers().load_dump(dump)
+    cfg = config.Config(passos[0]['debug']['config'])
+    cfg['dump_full_episodes'] = True
+    cfg['write_video'] = True
+    cfg['display_game_stats'] = True
+    cfg['tracesdir'] = pasta
+    cfg['video_format'] = formato
+    processador = observation_processor.ObservationProcessor(cfg)
+    processador.write_dump('episode_done')
+    for passo in passos:
+        processador.update(passo)
+    processador.process_pending_dumps(episode_done=True)
+
+
+def _renderizar_3d(dump, pasta, fps, formato):
+    from gfootball.env.script_helpers import ScriptHelpers
+    ScriptHelpers().replay(dump, fps=fps, config_update={'video_format': formato}, directory=pasta, render=True)
+
+
+def _comeca_do_inicio(dump):
+    with open(dump, 'rb') as f:
+        primeiro = pickle.load(f)
+    return primeiro['debug']['frame_cnt'] == 0
+
+
+def renderizar_um(tarefa):
+    dump, saida, modo, fps, formato = tarefa
+    nome = os.path.splitext(os.path.basename(dump))[0]
+    inicio = time.perf_counter()
+    # Cada dump renderiza numa pasta temporária própria: o gfootball escolhe o
+    # nome do vídeo (e ainda grava outro .dump junto), nós só pegamos o vídeo
+    pasta = tempfile.mkdtemp(prefix=f"render_{nome}_", dir=saida)
+    try:
+        if modo == 'auto':
+            modo = '3d' if _comeca_do_inicio(dump) else '2d'
+        if modo == '3d':
+            _renderizar_3d(dump, pasta, fps, formato)
+        else:
+            _renderizar_2d(dump, pasta, formato)
+        videos = sorted(glob.glob(os.path.join(pasta, f"*.{formato}")))
+        if not videos:
+            raise RuntimeError("o gfootball não gerou nenhum vídeo")
+        video = os.path.join(saida, f"{nome}.{formato}")
+        shutil.move(videos[-1], video)
+        return {'dump': dump, 'video': video, 'modo': modo, 'segundos': time.perf_counter() - inicio}
+    except Exception:
+        return {'dump': dump, 'erro': traceback.format_exc()}
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+# === MANIFESTO ===
+def _assinatura(dump):
+    st = os.stat(dump)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def ler_manifesto(saida):
+    caminho = os.path.join(saida, "manifesto.json")
+    if os.path.exists(caminho):
+        with open(caminho) as f:
+            return json.load(f)
+    return {}
+
+
+def salvar_manifesto(saida, manifesto):
+    caminho = os.path.join(saida, "manifesto.json")
+    with open(caminho + ".tmp", 'w') as f:
+        json.dump(manifesto, f, indent=2)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def pendentes(pastas, saida, manifesto):
+    dumps = []
+    for pasta in pastas:
+        dumps += glob.glob(os.path.join(pasta, "**", "*.dump"), recursive=True)
+    fila = []
+    for dump in sorted(set(os.path.abspath(d) for d in dumps)):
+        if dump.startswith(os.path.abspath(saida) + os.sep):
+            continue  # o .dump que o gfootball grava junto com o vídeo
+        feito = manifesto.get(dump)
+        if feito and feito['assinatura'] == _assinatura(dump) and os.path.exists(feito['video']):
+            continue
+        fila.append(dump)
+    return fila
+
+
+def renderizar(pastas, saida, n_workers=None, modo='auto', fps=10, formato='avi', headless=True):
+    os.makedirs(saida, exist_ok=True)
+    manifesto = ler_manifesto(saida)
+    fila = pendentes(pastas, saida, manifesto)
+    if not fila:
+        print("♻️  Nada novo para renderizar")
+        return []
+    n_workers = n_workers or max(1, min(len(fila), (os.cpu_count() or 2) - 1))
+    print(f"🎬 Renderizando {len(fila)} replays com {n_workers} processos ({modo})")
+    tarefas = [(dump, saida, modo, fps, formato) for dump in fila]
+    # O 2D é só OpenCV: não precisa de Xvfb
+    headless = headless and modo != '2d'
+    ctx = mp.get_context('forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn')
+    resultados = []
+    # Um dump por vez por processo: vídeos de tamanhos bem diferentes se equilibram sozinhos
+    with ctx.Pool(n_workers, initializer=_iniciar_worker, initargs=(headless,)) as pool:
+        for r in pool.imap_unordered(renderizar_um, tarefas, chunksize=1):
+            resultados.append(r)
+            if 'erro' in r:
+                print(f"❌ {r['dump']}:\n{r['erro']}")
+                continue
+            manifesto[r['dump']] = {'assinatura': _assinatura(r['dump']), 'video': r['video'], 'modo': r['modo']}
+            # Salva a cada vídeo: se cair no meio, o que já foi feito não é refeito
+            salvar_manifesto(saida, manifesto)
+            print(f"✅ [{len(resultados)}/{len(fila)}] {os.path.basename(r['video'])} ({r['segundos']:.0f}s)")
+        pool.close()
+        pool.join()
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renderiza em lote os .dump do gfootball, sem tela.")
+    parser.add_argument('pastas', nargs='+', help="Pastas com .dump (procura nas subpastas também)")
+    parser.add_argument('--saida', default=None, help="Pasta dos vídeos (padrão: <primeira pasta>/videos)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--modo', choices=['auto', '3d', '2d'], default='auto')
+    parser.add_argument('--fps', type=int, default=10)
+    parser.add_argument('--formato', choices=['avi', 'webm'], default='avi')
+    parser.add_argument('--com-tela', action='store_true', help="Usa o DISPLAY atual em vez de Xvfb")
+    parser.add_argument('--vigiar', type=float, default=None,
+                        help="Continua rodando e procura dumps novos a cada N segundos")
+    args = parser.parse_args()
+
+    saida = args.saida or os.path.join(args.pastas[0], "videos")
+    while True:
+        renderizar(args.pastas, saida, n_workers=args.workers, modo=args.modo, fps=args.fps,
+                   formato=args.formato, headless=not args.com_tela)
+        if args.vigiar is None:
+            break
+        time.sleep(args.vigiar)
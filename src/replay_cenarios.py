@@ -0,0 +1,365 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+from collections import Counter, deque
+import argparse
+import gym
+import os
+import pickle
+import numpy as np
+
+from ambientes import DIM_QUADRO, N_QUADROS
+from metricas import POSSE_DELES, POSSE_NOSSA
+
+# ==============================================================================
+# REPLAY DE CENÁRIOS DIFÍCEIS (recomeçar de onde o agente erra)
+# ==============================================================================
+# O 5_vs_5 gasta quase todos os passos em situações que o agente já resolve. Aqui
+# cada ambiente tira uma foto do motor (get_state) a cada `intervalo` passos e,
+# quando algo dá errado, a foto de ~`recuo` passos antes vai para um banco no
+# processo principal, com o motivo:
+#
+#   gol_sofrido    placar do passo < 0
+#   chute_perdido  chute (ação 12) com a bola e, em até JANELA_CHUTE passos, a
+#                  bola fica com o time direito ou sai em tiro de meta
+#   perdeu_posse   a bola passa do time esquerdo para o direito (sem ser chute)
+#
+# Uma fração dos ambientes (`fracao`) começa o próximo episódio de um estado do
+# banco (set_state + N_QUADROS passos parados para a pilha do FrameStack ser
+# toda do estado restaurado; a pilha não é o primeiro quadro repetido, e o
+# rollout_compacto guarda esses quadros à parte) e para depois de `horizonte`
+# passos (truncado: o PPO faz bootstrap). Se o motivo não se repetir no
+# horizonte (para o chute: se sair gol), é um sucesso.
+#
+# Prioridade de sorteio = peso do motivo x taxa de falha com prior Beta(1, 1):
+# estados novos entram no meio, os que o agente continua errando sobem. Sai do
+# banco quem teve `dominar` sucessos seguidos (dominado), quem passou de
+# `max_tentativas` (esgotado), estado que o motor não conseguiu continuar
+# (inválido) e, com o banco cheio, o de menor prioridade.
+#
+# As fotos só viajam no info do fim do episódio (o SharedMemoryVecEnv já manda
+# esse info pelo pipe) e são tiradas dele antes de chegarem aos callbacks. Os
+# episódios de replay entram no Monitor (rollout/ep_rew_mean mistura episódios
+# curtos): a régua de melhora é a avaliação (AsyncEvalCallback), que não usa
+# replay. Só para a observação de um jogador (simple115 empilhada, 1-D).
+#
+#   GFOOTBALL_REPLAY=0.25 python3 src/05_treino_jogo.py     # 25% dos envs em replay
+#   python3 src/replay_cenarios.py relatorio ~/gfootball_logs/FASE5_FINAL/replay_cenarios.pkl
+
+MOTIVOS = ('gol_sofrido', 'chute_perdido', 'perdeu_posse')
+PESOS_MOTIVO = {'gol_sofrido': 1.0, 'chute_perdido': 1.0, 'perdeu_posse': 0.5}
+
+ACAO_PARADO = 0
+ACAO_CHUTE = 12
+# Modo de jogo (one-hot em [108:115]): normal, saída, tiro de meta, falta, escanteio, lateral, pênalti
+MODO_TIRO_DE_META = 110
+JANELA_CHUTE = 40
+
+
+def fracao_replay():
+    # GFOOTBALL_REPLAY=0.25 liga o replay em 25% dos ambientes (0 ou ausente: desligado)
+    try:
+        return max(0.0, min(1.0, float(os.environ.get("GFOOTBALL_REPLAY", "0"))))
+    except ValueError:
+        return 0.0
+
+
+def _motor(env):
+    # Primeira camada com get_state/set_state: no gfootball é o GetStateWrapper de fora,
+    # com get_state() sem argumento (ele junta o estado do CheckpointRewardWrapper ao do motor)
+    atual = env
+    while atual is not None:
+        if hasattr(type(atual), 'get_state') and hasattr(type(atual), 'set_state'):
+            return atual
+        atual = getattr(atual, 'env', None)
+    raise ValueError("ReplayCenarios: o ambiente não tem get_state/set_state")
+
+
+# === NO WORKER: FOTOS DO MOTOR E EPISÓDIOS DE REPLAY ===
+class ReplayCenarios(gym.Wrapper):
+    def __init__(self, env, intervalo=25, recuo=75, horizonte=300, max_por_episodio=8):
+        super().__init__(env)
+        if len(env.observation_space.shape) != 1:
+            raise ValueError(f"ReplayCenarios espera a observação de um jogador, veio {env.observation_space.shape}")
+        self.intervalo = intervalo
+        self.horizonte = horizonte
+        self.max_por_episodio = max_por_episodio
+        self._motor = _motor(env)
+        self._fotos = deque(maxlen=recuo // intervalo + 1)
+        self._armado = None
+        self._replay = None
+        self._resultados = []
+
+    def armar_replay(self, id_, estado, motivo):
+        # Vale no próximo reset (no SharedMemoryVecEnv, o reset automático do fim do episódio)
+        self._armado = (id_, estado, motivo)
+
+    def _fotografar(self):
+        self._fotos.append((self._passo, self._motor.get_state()))
+
+    def _restaurar(self, estado):
+        self._motor.set_state(estado)
+        obs = None
+        for _ in range(N_QUADROS):
+            obs, _, done, _ = self.env.step(ACAO_PARADO)
+            if done:
+                return None
+        return obs
+
+    def reset(self, **kwargs):
+        self._passo = 0
+        self._fotos.clear()
+        self._eventos = []
+        self._emitidos = set()
+        self._ultimo_dono = 0
+        self._chute = None
+        self._replay = None
+        obs = self.env.reset(**kwargs)
+        if self._armado is not None:
+            id_, estado, motivo = self._armado
+            self._armado = None
+            restaurada = self._restaurar(estado)
+            if restaurada is None:
+                # O estado acabou o episódio durante o aquecimento: sai do banco
+                self._resultados.append({'id': id_, 'sucesso': None})
+                obs = self.env.reset(**kwargs)
+            else:
+                obs = restaurada
+                self._replay = {'id': id_, 'motivo': motivo, 'falhou': False, 'gol': False}
+        self._fotografar()
+        return obs
+
+    def _motivos(self, acao, obs, gol):
+        quadro = obs[-DIM_QUADRO:]
+        dono = 1 if quadro[POSSE_NOSSA] > 0.5 else 2 if quadro[POSSE_DELES] > 0.5 else 0
+        motivos = []
+        if gol < 0:
+            motivos.append('gol_sofrido')
+        chute_perdido = False
+        if self._chute is not None:
+            if gol > 0 or self._passo - self._chute > JANELA_CHUTE:
+                self._chute = None
+            elif dono == 2 or quadro[MODO_TIRO_DE_META] > 0.5:
+                chute_perdido = True
+                self._chute = None
+                motivos.append('chute_perdido')
+        if dono == 2 and self._ultimo_dono == 1 and not chute_perdido:
+            motivos.append('perdeu_posse')
+        if acao == ACAO_CHUTE and dono == 1:
+            self._chute = self._passo
+        if dono:
+            self._ultimo_dono = dono
+        return motivos
+
+    def _guardar(self, motivo):
+        # Episódio de replay não manda fotos: o estado dele já está no banco
+        if self._replay is not None or len(self._eventos) >= self.max_por_episodio or not self._fotos:
+            return
+        passo, estado = self._fotos[0]
+        if (motivo, passo) in self._emitidos:
+            return
+        self._emitidos.add((motivo, passo))
+        self._eventos.append({'motivo': motivo, 'estado': estado, 'passo': passo})
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        self._passo += 1
+        gol = info.get('score_reward', 0)
+        motivos = self._motivos(int(action), obs, gol)
+        for motivo in motivos:
+            self._guardar(motivo)
+        if self._passo % self.intervalo == 0:
+            self._fotografar()
+        replay = self._replay
+        if replay is not None:
+            replay['falhou'] |= replay['motivo'] in motivos
+            replay['gol'] |= gol > 0
+            if self._passo >= self.horizonte and not done:
+                done = True
+                info['TimeLimit.truncated'] = True
+        if done:
+            if self._eventos:
+                info['estados_replay'] = self._eventos
+            if replay is not None:
+                sucesso = replay['gol'] if replay['motivo'] == 'chute_perdido' else not replay['falhou']
+                self._resultados.append({'id': replay['id'], 'sucesso': sucesso})
+                info['episodio_replay'] = replay['motivo']
+            if self._resultados:
+                info['resultados_replay'] = self._resultados
+                self._resultados = []
+        return obs, reward, done, info
+
+
+# === NO PROCESSO PRINCIPAL: BANCO DE ESTADOS ===
+class BancoCenarios:
+    def __init__(self, capacidade=1000, dominar=3, max_tentativas=30, alfa=1.0, pesos=None, seed=0):
+        self.capacidade = capacidade
+        self.dominar = dominar
+        self.max_tentativas = max_tentativas
+        self.alfa = alfa
+        self.pesos = dict(PESOS_MOTIVO if pesos is None else pesos)
+        self.estados = {}
+        self.saidas = Counter()
+        self.adicionados = Counter()
+        self.recentes = deque(maxlen=200)
+        self._proximo_id = 0
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return len(self.estados)
+
+    def prioridade(self, e):
+        falhas = e['tentativas'] - e['sucessos']
+        return self.pesos.get(e['motivo'], 1.0) * (falhas + 1) / (e['tentativas'] + 2)
+
+    def _remover(self, id_, motivo_saida):
+        del self.estados[id_]
+        self.saidas[motivo_saida] += 1
+
+    def adicionar(self, motivo, estado):
+        if len(self.estados) >= self.capacidade:
+            # Menor prioridade; no empate, o mais antigo
+            pior = min(self.estados, key=lambda i: (self.prioridade(self.estados[i]), i))
+            self._remover(pior, 'descartados')
+        id_ = self._proximo_id
+        self._proximo_id += 1
+        self.estados[id_] = {'motivo': motivo, 'estado': estado, 'tentativas': 0, 'sucessos': 0, 'seguidos': 0}
+        self.adicionados[motivo] += 1
+        return id_
+
+    def sortear(self):
+        ids = list(self.estados)
+        p = np.array([self.prioridade(self.estados[i]) for i in ids]) ** self.alfa
+        return ids[self._rng.choice(len(ids), p=p / p.sum())]
+
+    def registrar(self, id_, sucesso):
+        e = self.estados.get(id_)
+        if e is None:
+            # Saiu do banco enquanto o episódio rodava
+            return
+        if sucesso is None:
+            self._remover(id_, 'invalidos')
+            return
+        self.recentes.append(bool(sucesso))
+        e['tentativas'] += 1
+        if sucesso:
+            e['sucessos'] += 1
+            e['seguidos'] += 1
+        else:
+            e['seguidos'] = 0
+        if e['seguidos'] >= self.dominar:
+            self._remover(id_, 'dominados')
+        elif e['tentativas'] >= self.max_tentativas:
+            self._remover(id_, 'esgotados')
+
+    def resumo(self):
+        por_motivo = Counter(e['motivo'] for e in self.estados.values())
+        return {
+            'estados': len(self.estados),
+            'por_motivo': {m: por_motivo.get(m, 0) for m in MOTIVOS},
+            'adicionados': dict(self.adicionados),
+            'saidas': dict(self.saidas),
+            'taxa_sucesso_recente': float(np.mean(self.recentes)) if self.recentes else None,
+        }
+
+    def salvar(self, caminho):
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        tmp = caminho + ".tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.__dict__, f)
+        os.replace(tmp, caminho)
+
+    @classmethod
+    def carregar(cls, caminho, **kwargs):
+        banco = cls(**kwargs)
+        if os.path.exists(caminho):
+            with open(caminho, 'rb') as f:
+                banco.__dict__.update(pickle.load(f))
+            print(f"🎯 Banco de cenários carregado: {len(banco)} estados ({caminho})")
+        return banco
+
+
+# === VEC ENV: LEVA AS FOTOS PARA O BANCO E ARMA OS AMBIENTES DE REPLAY ===
+class VecReplayCenarios(VecEnvWrapper):
+    def __init__(self, venv, banco, fracao=0.25):
+        super().__init__(venv)
+        if not all(venv.env_is_wrapped(ReplayCenarios)):
+            raise ValueError("VecReplayCenarios: embrulhe cada ambiente com ReplayCenarios (antes do Monitor)")
+        self.banco = banco
+        # Os primeiros n_replay ambientes recomeçam do banco; o resto joga partidas normais
+        self.n_replay = int(round(fracao * self.num_envs))
+
+    def _armar(self, i):
+        if i >= self.n_replay or not len(self.banco):
+            return
+        id_ = self.banco.sortear()
+        e = self.banco.estados[id_]
+        self.venv.env_method('armar_replay', id_, e['estado'], e['motivo'], indices=[i])
+
+    def reset(self):
+        obs = self.venv.reset()
+        for i in range(self.n_replay):
+            self._armar(i)
+        return obs
+
+    def step_wait(self):
+        obs, rews, dones, infos = self.venv.step_wait()
+        for i in np.flatnonzero(dones):
+            info = infos[i]
+            for ev in info.pop('estados_replay', ()):
+                self.banco.adicionar(ev['motivo'], ev['estado'])
+            for r in info.pop('resultados_replay', ()):
+                self.banco.registrar(r['id'], r['sucesso'])
+            self._armar(i)
+        return obs, rews, dones, infos
+
+
+class ReplayCallback(BaseCallback):
+    def __init__(self, banco, caminho=None, verbose=0):
+        super().__init__(verbose)
+        self.banco = banco
+        self.caminho = caminho
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        r = self.banco.resumo()
+        self.logger.record('replay/estados', r['estados'])
+        for motivo, n in r['por_motivo'].items():
+            self.logger.record(f'replay/{motivo}', n)
+        for saida, n in r['saidas'].items():
+            self.logger.record(f'replay/{saida}', n)
+        if r['taxa_sucesso_recente'] is not None:
+            self.logger.record('replay/taxa_sucesso', r['taxa_sucesso_recente'])
+        if self.verbose:
+            taxa = r['taxa_sucesso_recente']
+            print(f"🎯 Banco de cenários: {r['estados']} estados {r['por_motivo']}"
+                  + (f", sucesso recente {taxa:.0%}" if taxa is not None else ""))
+
+    def _on_training_end(self) -> None:
+        if self.caminho:
+            self.banco.salvar(self.caminho)
+
+
+def imprimir_relatorio(banco):
+    r = banco.resumo()
+    print("\n" + "=" * 80)
+    print(f"🎯 BANCO DE CENÁRIOS ({r['estados']} estados)")
+    print("=" * 80)
+    for motivo in MOTIVOS:
+        estados = [e for e in banco.estados.values() if e['motivo'] == motivo]
+        tentativas = sum(e['tentativas'] for e in estados)
+        sucessos = sum(e['sucessos'] for e in estados)
+        taxa = f"{sucessos / tentativas:.0%}" if tentativas else "-"
+        print(f"   {motivo:14s} {len(estados):5d} no banco   {r['adicionados'].get(motivo, 0):6d} adicionados"
+              f"   sucesso {taxa}")
+    print(f"   saídas: {r['saidas']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relatório do banco de cenários difíceis.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_rel = sub.add_parser('relatorio')
+    p_rel.add_argument('caminho', help="Arquivo .pkl do banco")
+    args = parser.parse_args()
+    imprimir_relatorio(BancoCenarios.carregar(args.caminho))
@@ -0,0 +1,197 @@
+from stable_baselines3.common.buffers import RolloutBuffer
+from stable_baselines3.common.vec_env import VecNormalize, unwrap_vec_wrapper
+import numpy as np
+
+from ambientes import DIM_QUADRO, N_QUADROS
+
+# ==============================================================================
+# ROLLOUT BUFFER COMPACTO (só o quadro novo de cada passo)
+# ==============================================================================
+# Com stacked=True cada observação é [q(t-3), q(t-2), q(t-1), q(t)]: três dos
+# quatro quadros já estão no buffer, nos passos anteriores. O RolloutBuffer do
+# SB3 guarda tudo em float32, (n_steps, n_envs, 460). Aqui fica só:
+#
+#   quadros      (n_steps, n_envs, 115)  o quadro novo de cada passo
+#   anteriores   (3, n_envs, 115)        os quadros de antes do primeiro passo
+#
+# e a observação empilhada é remontada na hora de montar cada lote do PPO,
+# seguindo a regra do FrameStack do gfootball: no início de um episódio os
+# quadros de antes são o primeiro quadro repetido (o episode_starts do buffer
+# diz onde). Cada add confere o quadro t-1 da observação que chega com o que já
+# foi guardado; se a pilha não for assim, o erro aparece no primeiro rollout.
+# Episódio que começa com a pilha de quadros diferentes (o replay_cenarios.py
+# restaura um estado e anda N_QUADROS passos) guarda os quadros de antes do
+# início à parte, (3, 115) por início desses: são poucos por rollout.
+#
+# Com VecNormalize o quadro guardado é o cru (old_obs) e a média/escala do
+# passo ficam ao lado, (n_steps, 460), que não crescem com o número de envs:
+# a observação normalizada sai igual à do VecNormalize até o arredondamento do
+# float32. Com precisao=np.float16 os quadros ocupam metade (perde ~3 casas).
+#
+#   n_steps=2048, 8 envs:   30 MB  ->  15 MB (float32)  /  11 MB (float16)
+#   n_steps=2048, 32 envs: 120 MB  ->  38 MB (float32)  /  23 MB (float16)
+#
+#   model = PPO.load(..., env=vec_env)
+#   compactar_rollout(model)                      # ou precisao=np.float16
+
+
+class RolloutBufferCompacto(RolloutBuffer):
+    def __init__(self, buffer_size, observation_space, action_space, device="auto", gae_lambda=1, gamma=0.99,
+                 n_envs=1, n_quadros=N_QUADROS, precisao=np.float32, obter_env=None):
+        self.n_quadros = n_quadros
+        self.precisao = np.dtype(precisao)
+        # Devolve o VecEnv atual do modelo (o curriculo troca o env entre as fases)
+        self.obter_env = obter_env
+        self.dim_obs = int(np.prod(observation_space.shape))
+        if observation_space.shape != (self.dim_obs,) or self.dim_obs % n_quadros:
+            raise ValueError(f"RolloutBufferCompacto espera quadros empilhados num vetor, veio {observation_space.shape}")
+        self.dim_quadro = self.dim_obs // n_quadros
+        super().__init__(buffer_size, observation_space, action_space, device=device, gae_lambda=gae_lambda,
+                         gamma=gamma, n_envs=n_envs)
+
+    # --- memória ---
+    def reset(self):
+        # O RolloutBuffer aloca observations com obs_shape: aqui ela fica com largura 0
+        self.obs_shape = (0,)
+        super().reset()
+        self.quadros = np.zeros((self.buffer_size, self.n_envs, self.dim_quadro), dtype=self.precisao)
+        self.anteriores = np.zeros((self.n_quadros - 1, self.n_envs, self.dim_quadro), dtype=self.precisao)
+        self._normalizador = self._achar_normalizador()
+        if self._normalizador is not None:
+            self.medias = np.zeros((self.buffer_size, self.dim_obs), dtype=np.float32)
+            self.escalas = np.zeros((self.buffer_size, self.dim_obs), dtype=np.float32)
+            self._pendente = self._capturar()
+        self._inicios = None
+        # Inícios de episódio com a pilha de quadros diferentes: índice em _pilhas (-1 = repetida)
+        self.pilha_inicial = np.full((self.buffer_size, self.n_envs), -1, dtype=np.int32)
+        self._pilhas = []
+        self._pilhas_lote = None
+
+    def _achar_normalizador(self):
+        venv = self.obter_env() if self.obter_env is not None else None
+        normalizador = unwrap_vec_wrapper(venv, VecNormalize) if venv is not None else None
+        return normalizador if normalizador is not None and normalizador.norm_obs else None
+
+    def _capturar(self):
+        # Quadro cru + estatísticas com que o VecNormalize acabou de normalizar o obs
+        # que o PPO vai passar no próximo add (old_obs pode ser a memória compartilhada: copia).
+        # O VecNormalize só cria o old_obs no primeiro reset: o __init__ do buffer (e o
+        # compactar_rollout) roda antes, e a captura fica para o reset do collect_rollouts
+        vn = self._normalizador
+        old_obs = getattr(vn, 'old_obs', None)
+        if old_obs is None or not len(old_obs):
+            return None
+        escala = 1.0 / np.sqrt(vn.obs_rms.var + vn.epsilon)
+        return (np.array(old_obs, dtype=np.float32), vn.obs_rms.mean.astype(np.float32),
+                escala.astype(np.float32))
+
+    def bytes_observacoes(self):
+        extras = (self.medias.nbytes + self.escalas.nbytes) if self._normalizador is not None else 0
+        extras += self.pilha_inicial.nbytes + sum(p.nbytes for p in self._pilhas)
+        return self.quadros.nbytes + self.anteriores.nbytes + extras
+
+    def bytes_sem_compactar(self):
+        return self.buffer_size * self.n_envs * self.dim_obs * 4
+
+    # --- coleta ---
+    def _guardar_inicios(self, empilhada, episode_start):
+        # Quem começou episódio com a pilha diferente do primeiro quadro repetido
+        comecou = np.asarray(episode_start, dtype=bool).reshape(self.n_envs)
+        pilha = empilhada.astype(self.precisao)
+        repetida = (pilha[:, :-1] == pilha[:, -1:]).all(axis=(1, 2))
+        for e in np.flatnonzero(comecou & ~repetida):
+            self.pilha_inicial[self.pos, e] = len(self._pilhas)
+            self._pilhas.append(pilha[e, :-1].copy())
+        return comecou
+
+    def _conferir(self, empilhada, comecou):
+        # O quadro t-1 de quem continua tem que ser o quadro novo do passo anterior
+        continua = ~comecou
+        if not np.array_equal(empilhada[continua, -2].astype(self.precisao), self.quadros[self.pos - 1, continua]):
+            raise ValueError("As observações não são quadros empilhados como no FrameStack do gfootball "
+                             "(ou há uma camada depois do VecNormalize mudando o obs): use o RolloutBuffer normal")
+
+    def add(self, obs, action, reward, episode_start, value, log_prob):
+        if self._normalizador is not None:
+            if self._pendente is None:
+                raise ValueError("O VecNormalize ainda não tem old_obs: o env precisa de um reset antes do rollout")
+            cruas, media, escala = self._pendente
+            if self.pos == 0:
+                normalizado = np.clip((cruas - media) * escala, -self._normalizador.clip_obs,
+                                      self._normalizador.clip_obs)
+                # Em float32 uma coluna de variância quase zero (one-hot que não muda) erra ~1e-4 a
+                # mais que o VecNormalize (float64); a camada errada erra na casa das unidades
+                if not np.allclose(normalizado, np.asarray(obs).reshape(self.n_envs, -1), rtol=1e-3, atol=1e-3):
+                    raise ValueError("O obs do PPO não é o old_obs normalizado do VecNormalize "
+                                     "(VecNormalize precisa ser a camada de fora)")
+            self.medias[self.pos] = media
+            self.escalas[self.pos] = escala
+        else:
+            cruas = np.asarray(obs, dtype=np.float32)
+        empilhada = cruas.reshape(self.n_envs, self.n_quadros, self.dim_quadro)
+        comecou = self._guardar_inicios(empilhada, episode_start)
+        if self.pos == 0:
+            self.anteriores[:] = empilhada[:, :-1].transpose(1, 0, 2)
+        else:
+            self._conferir(empilhada, comecou)
+        self.quadros[self.pos] = empilhada[:, -1]
+        super().add(np.zeros((self.n_envs, 0), dtype=np.float32), action, reward, episode_start, value, log_prob)
+        if self._normalizador is not None:
+            self._pendente = self._capturar()
+
+    # --- lotes ---
+    def get(self, batch_size=None):
+        if not self.generator_ready:
+            # Último início de episódio em cada (passo, env); -n_quadros = nenhum dentro do buffer
+            passos = np.arange(self.buffer_size)[:, None]
+            inicios = np.where(self.episode_starts.astype(bool), passos, -self.n_quadros)
+            self._inicios = np.maximum.accumulate(inicios, axis=0)
+            self._pilhas_lote = np.stack(self._pilhas) if self._pilhas else None
+        yield from super().get(batch_size)
+
+    def observacoes(self, batch_inds):
+        # Índice achatado do SB3 (swap_and_flatten): env * buffer_size + passo
+        e, t = np.divmod(batch_inds, self.buffer_size)
+        atrasos = np.arange(self.n_quadros - 1, -1, -1)
+        inicio = self._inicios[t, e][:, None]
+        s_sem_corte = t[:, None] - atrasos
+        s = np.maximum(s_sem_corte, inicio)
+        e = e[:, None]
+        # s < 0: quadro de antes do rollout (anteriores[-1] é o t = -1)
+        x = np.where((s >= 0)[..., None],
+                     self.quadros[np.maximum(s, 0), e],
+                     self.anteriores[np.clip(s + self.n_quadros - 1, 0, self.n_quadros - 2), e])
+        if self._pilhas_lote is not None:
+            # Antes de um início com pilha guardada, os quadros vêm dela (e não do primeiro repetido)
+            k = np.where(inicio >= 0, self.pilha_inicial[np.maximum(inicio, 0), e], -1)
+            antes = (s_sem_corte < inicio) & (k >= 0)
+            guardados = self._pilhas_lote[np.maximum(k, 0),
+                                          np.clip(s_sem_corte - inicio + self.n_quadros - 1, 0, self.n_quadros - 2)]
+            x = np.where(antes[..., None], guardados, x)
+        x = x.reshape(len(batch_inds), self.dim_obs).astype(np.float32)
+        if self._normalizador is not None:
+            clip = self._normalizador.clip_obs
+            x = np.clip((x - self.medias[t]) * self.escalas[t], -clip, clip)
+        return x
+
+    def _get_samples(self, batch_inds, env=None):
+        amostras = super()._get_samples(batch_inds, env)
+        return amostras._replace(observations=self.to_torch(self.observacoes(batch_inds)))
+
+
+def compactar_rollout(model, precisao=np.float32, verbose=1):
+    # Troca o rollout_buffer do PPO pelo compacto (mesmo n_steps/n_envs/gamma/gae_lambda)
+    if isinstance(model.rollout_buffer, RolloutBufferCompacto):
+        return model.rollout_buffer
+    if model.observation_space.shape != (DIM_QUADRO * N_QUADROS,):
+        raise ValueError("compactar_rollout espera a simple115 empilhada (stacked=True)")
+    model.rollout_buffer = RolloutBufferCompacto(
+        model.n_steps, model.observation_space, model.action_space, device=model.device,
+        gae_lambda=model.gae_lambda, gamma=model.gamma, n_envs=model.n_envs, precisao=precisao,
+        obter_env=lambda: model.env,
+    )
+    if verbose:
+        b = model.rollout_buffer
+        print(f"📉 Observações do rollout: {b.bytes_sem_compactar() / 2 ** 20:.1f} MB -> "
+              f"{b.bytes_observacoes() / 2 ** 20:.1f} MB")
+    return model.rollout_buffer
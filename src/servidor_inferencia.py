@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# ==============================================================================
+# SERVIDOR DE INFERÊNCIA LOCAL (asyncio + socket Unix)
+# ==============================================================================
+# Em vez de cada processo de avaliação/self-play fazer o próprio PPO.load, um
+# servidor carrega os modelos (e normalizadores) uma vez só. Ele junta os pedidos
+# de todos os atores que chegam dentro de uma janela curta, roda UMA passada da
+# PoliticaFundida para o lote e devolve as ações para cada um.
+#
+# Troca a quente: quando o arquivo do modelo muda no disco (--vigiar) ou chega
+# o comando 'trocar', o modelo novo é carregado numa thread e entra no lugar do
+# antigo entre dois lotes. Os clientes continuam conectados.
+#
+# Protocolo (cada mensagem): <u32 tamanho do cabeçalho> <u32 tamanho do corpo>
+# <cabeçalho JSON> <corpo binário>
+#   pedido:   {'modelo', 'n', 'det'}  + obs float32 (n, dim)
+#   resposta: {'n', 'versao'}         + ações int64 (n,) + valores float32 (n,)
+#   comandos: {'cmd': 'trocar' | 'info', ...}
+#
+#   python3 src/servidor_inferencia.py --modelo padrao=CAMPEAO_5V5.zip:vec_normalize_5v5.pkl
+#   python3 src/avaliador.py unix:/tmp/gfootball_inferencia.sock#padrao --episodios 300
+
+SOCKET_PADRAO = "/tmp/gfootball_inferencia.sock"
+_CABECALHO = struct.Struct('<II')
+
+
+def _empacotar(cabecalho, *corpos):
+    cab = json.dumps(cabecalho).encode()
+    corpo = b''.join(corpos)
+    return _CABECALHO.pack(len(cab), len(corpo)) + cab + corpo
+
+
+def _desempacotar(n_cab, mensagem):
+    return json.loads(bytes(mensagem[:n_cab])), memoryview(mensagem)[n_cab:]
+
+
+def carregar_fundida(caminho, normalizador=None):
+    from politica_fundida import PoliticaFundida
+    if caminho.endswith('.npz'):
+        return PoliticaFundida.de_npz(caminho)
+    return PoliticaFundida.de_arquivos(caminho, normalizador)
+
+
+def _assinatura(*caminhos):
+    assinatura = []
+    for c in caminhos:
+        if c is None:
+            continue
+        if not os.path.exists(c) and os.path.exists(c + ".zip"):
+            c += ".zip"  # o PPO.load aceita o caminho sem o .zip
+        st = os.stat(c)
+        assinatura.append((st.st_size, st.st_mtime_ns))
+    return assinatura
+
+
+# === UM MODELO SERVIDO ===
+class ModeloServido:
+    def __init__(self, nome, caminho, normalizador, janela_s, lote_max, executor):
+        self.nome = nome
+        self.caminho = caminho
+        self.normalizador = normalizador
+        self.janela_s = janela_s
+        self.lote_max = lote_max
+        self._executor = executor
+        self.politica = carregar_fundida(caminho, normalizador)
+        self.versao = 1
+        self._assinatura = _assinatura(caminho, normalizador)
+        self._fila = asyncio.Queue()
+        self.lotes = 0
+        self.linhas = 0
+
+    async def pedir(self, obs, deterministic):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((obs, deterministic, futuro))
+        return await futuro
+
+    async def laco(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self._fila.get()]
+            linhas = len(pedidos[0][0])
+            limite = loop.time() + self.janela_s
+            # Junta o que chegar dentro da janela (ou até encher o lote)
+            while linhas < self.lote_max:
+                espera = limite - loop.time()
+                if espera <= 0:
+                    break
+                try:
+                    pedido = await asyncio.wait_for(self._fila.get(), espera)
+                except asyncio.TimeoutError:
+                    break
+                pedidos.append(pedido)
+                linhas += len(pedido[0])
+            # Quem quer ação determinística e quem quer amostrar vão em passadas separadas
+            for det in (True, False):
+                grupo = [p for p in pedidos if p[1] == det]
+                if grupo:
+                    await self._rodar(loop, grupo, det)
+
+    @property
+    def dim_obs(self):
+        return int(self.politica.baixo.shape[0])
+
+    async def _rodar(self, loop, grupo, deterministic):
+        politica, versao = self.politica, self.versao
+        try:
+            # Dentro do try: um lote ruim falha só os pedidos dele, o laço continua
+            obs = np.concatenate([p[0] for p in grupo]) if len(grupo) > 1 else grupo[0][0]
+            acoes, valores = await loop.run_in_executor(self._executor, politica.agir, obs, deterministic)
+        except Exception as e:
+            for _, _, futuro in grupo:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.linhas += len(obs)
+        inicio = 0
+        for o, _, futuro in grupo:
+            fim = inicio + len(o)
+            if not futuro.done():
+                futuro.set_result((acoes[inicio:fim], valores[inicio:fim], versao))
+            inicio = fim
+
+    async def trocar(self, caminho=None, normalizador=None):
+        caminho = caminho or self.caminho
+        normalizador = normalizador if normalizador is not None else self.normalizador
+        nova = await asyncio.get_running_loop().run_in_executor(
+            None, carregar_fundida, caminho, normalizador)
+        # Atribuição única: o próximo lote já usa a nova, o lote em andamento termina com a velha
+        self.politica = nova
+        self.caminho, self.normalizador = caminho, normalizador
+        self._assinatura = _assinatura(caminho, normalizador)
+        self.versao += 1
+        print(f"🔄 '{self.nome}' trocado para {caminho} (versão {self.versao})")
+
+    def mudou_no_disco(self):
+        try:
+            return _assinatura(self.caminho, self.normalizador) != self._assinatura
+        except FileNotFoundError:
+            return False  # no meio de uma gravação: tenta de novo na próxima volta
+
+
+# === SERVIDOR ===
+class ServidorInferencia:
+    def __init__(self, modelos, caminho_socket=SOCKET_PADRAO, janela_ms=2.0, lote_max=1024,
+                 vigiar_s=None, threads_torch=None):
+        # modelos: {nome: (caminho do zip/npz, normalizador ou None)}
+        if threads_torch:
+            import torch
+            torch.set_num_threads(threads_torch)
+        self.caminho_socket = caminho_socket
+        self.vigiar_s = vigiar_s
+        # Uma thread de inferência: os lotes de todos os modelos saem em fila, sem brigar por CPU
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._specs = modelos
+        self._janela_s = janela_ms / 1000.0
+        self._lote_max = lote_max
+        self.modelos = {}
+        self.clientes = 0
+
+    async def _atender(self, leitor, escritor):
+        self.clientes += 1
+        try:
+            while True:
+                try:
+                    n_cab, n_corpo = _CABECALHO.unpack(await leitor.readexactly(_CABECALHO.size))
+                    mensagem = await leitor.readexactly(n_cab + n_corpo)
+                except asyncio.IncompleteReadError:
+                    break
+                cab, corpo = _desempacotar(n_cab, mensagem)
+                try:
+                    resposta = await self._responder(cab, corpo)
+                except Exception as e:
+                    resposta = _empacotar({'erro': f"{type(e).__name__}: {e}"})
+                escritor.write(resposta)
+                await escritor.drain()
+        finally:
+            self.clientes -= 1
+            escritor.close()
+
+    async def _responder(self, cab, corpo):
+        cmd = cab.get('cmd')
+        if cmd == 'trocar':
+            await self.modelos[cab['modelo']].trocar(cab.get('caminho'), cab.get('normalizador'))
+            return _empacotar({'versao': self.modelos[cab['modelo']].versao})
+        if cmd == 'info':
+            return _empacotar({nome: {'caminho': m.caminho, 'versao': m.versao, 'lotes': m.lotes,
+                                      'linhas': m.linhas, 'dim_obs': m.dim_obs}
+                               for nome, m in self.modelos.items()})
+        modelo = self.modelos[cab['modelo']]
+        # Cópia: o frombuffer é só leitura (o torch.from_numpy reclama)
+        obs = np.frombuffer(corpo, dtype=np.float32).copy()
+        if obs.size != cab['n'] * modelo.dim_obs:
+            raise ValueError(f"'{modelo.nome}' espera obs de dimensão {modelo.dim_obs}, "
+                             f"chegaram {obs.size} valores para n={cab['n']}")
+        obs = obs.reshape(cab['n'], modelo.dim_obs)
+        acoes, valores, versao = await modelo.pedir(obs, cab.get('det', True))
+        return _empacotar({'n': len(acoes), 'versao': versao},
+                          acoes.astype(np.int64).tobytes(), valores.astype(np.float32).tobytes())
+
+    async def _vigiar(self):
+        while True:
+            await asyncio.sleep(self.vigiar_s)
+            for m in self.modelos.values():
+                if m.mudou_no_disco():
+                    try:
+                        await m.trocar()
+                    except Exception as e:
+                        print(f"⚠️ Não consegui recarregar '{m.nome}': {e}")
+
+    async def rodar(self):
+        for nome, (caminho, normalizador) in self._specs.items():
+            print(f"🧠 Carregando '{nome}': {caminho}")
+            self.modelos[nome] = ModeloServido(nome, caminho, normalizador, self._janela_s,
+                                               self._lote_max, self._executor)
+        if os.path.exists(self.caminho_socket):
+            os.remove(self.caminho_socket)
+        servidor = await asyncio.start_unix_server(self._atender, path=self.caminho_socket)
+        tarefas = [asyncio.create_task(m.laco()) for m in self.modelos.values()]
+        if self.vigiar_s:
+            tarefas.append(asyncio.create_task(self._vigiar()))
+        print(f"🚀 Servindo {list(self.modelos)} em {self.caminho_socket}")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            for t in tarefas:
+                t.cancel()
+            self._executor.shutdown(wait=False)
+            if os.path.exists(self.caminho_socket):
+                os.remove(self.caminho_socket)
+
+
+# === CLIENTE (síncrono: os atores são processos comuns) ===
+class ClienteInferencia:
+    def __init__(self, caminho_socket=SOCKET_PADRAO, modelo='padrao', tentativas=50):
+        self.caminho_socket = caminho_socket
+        self.modelo = modelo
+        self.tentativas = tentativas
+        self.versao = None
+        self._sock = None
+        self._conectar()
+
+    def _conectar(self):
+        for k in range(self.tentativas):
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.caminho_socket)
+                self._sock = sock
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                time.sleep(0.1 * min(k + 1, 10))  # servidor ainda subindo
+        raise ConnectionError(f"Servidor de inferência não respondeu em {self.caminho_socket}")
+
+    def _receber(self, n):
+        buf = bytearray(n)
+        vista = memoryview(buf)
+        lidos = 0
+        while lidos < n:
+            k = self._sock.recv_into(vista[lidos:])
+            if k == 0:
+                raise ConnectionError("Servidor de inferência fechou a conexão")
+            lidos += k
+        return buf
+
+    def _trocar_mensagem(self, mensagem):
+        self._sock.sendall(mensagem)
+        n_cab, n_corpo = _CABECALHO.unpack(self._receber(_CABECALHO.size))
+        cab, corpo = _desempacotar(n_cab, self._receber(n_cab + n_corpo))
+        if 'erro' in cab:
+            raise RuntimeError(f"Servidor de inferência: {cab['erro']}")
+        return cab, corpo
+
+    def _chamar(self, mensagem):
+        try:
+            return self._trocar_mensagem(mensagem)
+        except (ConnectionError, BrokenPipeError):
+            # Servidor reiniciado: reconecta e repete o pedido uma vez
+            self._sock.close()
+            self._conectar()
+            return self._trocar_mensagem(mensagem)
+
+    def agir(self, obs, deterministic=True):
+        obs = np.ascontiguousarray(obs, dtype=np.float32).reshape(len(obs), -1)
+        cab, corpo = self._chamar(_empacotar({'modelo': self.modelo, 'n': len(obs), 'det': bool(deterministic)},
+                                             obs.tobytes()))
+        n = cab['n']
+        self.versao = cab['versao']
+        acoes = np.frombuffer(corpo, dtype=np.int64, count=n)
+        valores = np.frombuffer(corpo, dtype=np.float32, count=n, offset=8 * n)
+        return acoes, valores
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        return self.agir(obs, deterministic=deterministic)[0], state
+
+    def trocar(self, caminho=None, normalizador=None):
+        return self._chamar(_empacotar({'cmd': 'trocar', 'modelo': self.modelo,
+                                        'caminho': caminho, 'normalizador': normalizador}))[0]
+
+    def info(self):
+        return self._chamar(_empacotar({'cmd': 'info'}))[0]
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def eh_servidor(modelo):
+    return isinstance(modelo, str) and modelo.startswith('unix:')
+
+
+def conectar(endereco):
+    # "unix:/tmp/x.sock#nome" -> cliente do modelo 'nome' (padrão: 'padrao')
+    caminho, _, nome = endereco[len('unix:'):].partition('#')
+    return ClienteInferencia(caminho, modelo=nome or 'padrao')
+
+
+def _ler_specs(specs):
+    modelos = {}
+    for spec in specs:
+        nome, _, resto = spec.partition('=') if '=' in spec else ('padrao', '', spec)
+        caminho, _, normalizador = resto.partition(':')
+        modelos[nome] = (caminho, normalizador or None)
+    return modelos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de inferência em lote para muitos atores.")
+    parser.add_argument('--modelo', action='append', required=True,
+                        help="nome=modelo.zip:vec_normalize.pkl ou nome=politica.npz (pode repetir)")
+    parser.add_argument('--socket', default=SOCKET_PADRAO)
+    parser.add_argument('--janela-ms', type=float, default=2.0, help="Quanto espera para juntar pedidos")
+    parser.add_argument('--lote-max', type=int, default=1024)
+    parser.add_argument('--vigiar', type=float, default=None,
+                        help="Recarrega o modelo quando o arquivo mudar (checa a cada N segundos)")
+    parser.add_argument('--threads', type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    servidor = ServidorInferencia(_ler_specs(args.modelo), caminho_socket=args.socket, janela_ms=args.janela_ms,
+                                  lote_max=args.lote_max, vigiar_s=args.vigiar, threads_torch=args.threads)
+    try:
+        asyncio.run(servidor.rodar())
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado")
@@ -0,0 +1,243 @@
+from stable_baselines3 import PPO
+import argparse
+import hashlib
+import io
+import json
+import os
+import zipfile
+import numpy as np
+
+from armazem_checkpoints import abrir_endereco, eh_armazem, modelos_do_armazem
+from avaliador import avaliar_dificuldades
+
+# ==============================================================================
+# TORNEIO / ELO DE TODOS OS MODELOS GUARDADOS
+# ==============================================================================
+# 1. Procura todos os pares modelo (.zip ou pasta extraída) + vec_normalize*.pkl
+# 2. Joga cada modelo contra o bot em várias dificuldades (um pool só por modelo)
+# 3. Guarda os resultados num cache indexado pelo hash do conteúdo: modelo que
+#    não mudou nunca é jogado de novo, mesmo se for renomeado/movido
+# 4. Recalcula a tabela de Elo com todos os jogos do cache e salva em disco
+#
+#   python3 src/torneio.py                       # src/, models/, campeoes_eternos/
+#   python3 src/torneio.py ~/gfootball_logs --com-ckpt --dificuldades 0.05 0.25 0.6
+#   python3 src/torneio.py --armazem ~/gfootball_logs/armazem --com-ckpt   # checkpoints do armazém
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTAS_PADRAO = [os.path.join(RAIZ_REPO, p) for p in ('src', 'models', 'campeoes_eternos')]
+PASTA_TORNEIO = os.path.expanduser("~/gfootball_logs/torneio")
+
+ELO_BASE = 1000.0
+
+
+# === DESCOBERTA DOS MODELOS ===
+def descobrir_modelos(pastas, incluir_ckpt=False):
+    modelos = []
+    for raiz in pastas:
+        for pasta, subpastas, arquivos in os.walk(raiz):
+            normalizadores = sorted(a for a in arquivos if a.startswith('vec_normalize') and a.endswith('.pkl'))
+            normalizador = os.path.join(pasta, normalizadores[0]) if len(normalizadores) == 1 else None
+            if len(normalizadores) > 1:
+                print(f"⚠️ Mais de um vec_normalize em {pasta}, usando nenhum: {normalizadores}")
+            for arquivo in sorted(arquivos):
+                if not arquivo.endswith('.zip'):
+                    continue
+                if arquivo.startswith('ckpt') and not incluir_ckpt:
+                    continue
+                modelos.append({'modelo': os.path.join(pasta, arquivo), 'normalizador': normalizador})
+            for sub in list(subpastas):
+                caminho = os.path.join(pasta, sub)
+                itens = os.listdir(caminho)
+                # Zip do SB3 extraído: pastas/arquivos 'policy*' + o 'data' (JSON)
+                if any(i.startswith('policy') for i in itens):
+                    subpastas.remove(sub)  # não desce dentro do modelo extraído
+                    if 'data' in itens:
+                        modelos.append({'modelo': caminho, 'normalizador': normalizador})
+                    else:
+                        print(f"⚠️ Pasta de modelo incompleta (sem 'data'), ignorando: {caminho}")
+    return modelos
+
+
+def _arquivos(caminho):
+    if os.path.isfile(caminho):
+        return [caminho]
+    return sorted(os.path.join(p, a) for p, _, arqs in os.walk(caminho) for a in arqs)
+
+
+def hash_conteudo(modelo, normalizador):
+    h = hashlib.sha256()
+    for caminho in _arquivos(modelo) + ([normalizador] if normalizador else []):
+        if os.path.isdir(modelo) and caminho.startswith(modelo):
+            h.update(os.path.relpath(caminho, modelo).encode())
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloco)
+    return h.hexdigest()
+
+
+def zip_de_pasta(caminho):
+    # Pasta extraída: cada subpasta 'x' vira o 'x.pth' (zip do torch) dentro do zip do SB3
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zip_sb3:
+        for item in sorted(os.listdir(caminho)):
+            completo = os.path.join(caminho, item)
+            if os.path.isfile(completo):
+                zip_sb3.write(completo, item)
+                continue
+            pth = io.BytesIO()
+            with zipfile.ZipFile(pth, 'w', zipfile.ZIP_STORED) as zip_torch:
+                for arq in _arquivos(completo):
+                    zip_torch.write(arq, os.path.relpath(arq, completo))
+            zip_sb3.writestr(f"{item}.pth", pth.getvalue())
+    buf.seek(0)
+    return buf
+
+
+def carregar_modelo(caminho):
+    if eh_armazem(caminho):
+        # Só os tensores da policy + a normalização: o otimizador nem é lido
+        return abrir_endereco(caminho).politica_numpy()
+    if os.path.isfile(caminho):
+        return PPO.load(caminho, device="cpu")
+    return PPO.load(zip_de_pasta(caminho), device="cpu")
+
+
+# === CACHE E ELO ===
+def _ler_json(caminho, padrao):
+    if os.path.exists(caminho):
+        with open(caminho) as f:
+            return json.load(f)
+    return padrao
+
+
+def _salvar_json(caminho, dados):
+    tmp = caminho + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(dados, f, indent=2)
+    os.replace(tmp, caminho)
+
+
+def chave_cache(hash_modelo, cenario, dificuldade, n_episodios, seed):
+    return f"{hash_modelo}|{cenario}|{dificuldade}|{n_episodios}|{seed}"
+
+
+def calcular_elo(partidas, iteracoes=500):
+    # Bradley-Terry por máxima verossimilhança (independe da ordem dos jogos),
+    # empates valem meia vitória para cada lado. Cada jogador ganha um empate
+    # virtual contra uma âncora de força 1 (Elo base) para ninguém ir a infinito.
+    jogadores = sorted({p['a'] for p in partidas} | {p['b'] for p in partidas})
+    idx = {j: k for k, j in enumerate(jogadores)}
+    n = len(jogadores)
+    vitorias = np.full(n, 0.5)
+    jogos = np.zeros((n, n))
+    for p in partidas:
+        a, b = idx[p['a']], idx[p['b']]
+        vitorias[a] += p['vitorias'] + 0.5 * p['empates']
+        vitorias[b] += p['derrotas'] + 0.5 * p['empates']
+        total = p['vitorias'] + p['empates'] + p['derrotas']
+        jogos[a, b] += total
+        jogos[b, a] += total
+    forca = np.ones(n)
+    for _ in range(iteracoes):
+        denominador = (jogos / (forca[:, None] + forca[None, :])).sum(axis=1) + 1.0 / (forca + 1.0)
+        forca = vitorias / denominador
+    elo = ELO_BASE + 400.0 * np.log10(forca)
+    return dict(zip(jogadores, elo.tolist()))
+
+
+def nome_bot(dificuldade):
+    return f"bot@{dificuldade}"
+
+
+def executar_torneio(pastas=PASTAS_PADRAO, dificuldades=(0.05, 0.25, 0.6), cenario='5_vs_5',
+                     n_episodios=100, n_envs=16, seed=0, incluir_ckpt=False, pasta_torneio=PASTA_TORNEIO,
+                     armazens=()):
+    os.makedirs(pasta_torneio, exist_ok=True)
+    caminho_cache = os.path.join(pasta_torneio, "cache.json")
+    caminho_elo = os.path.join(pasta_torneio, "elo.json")
+    cache = _ler_json(caminho_cache, {'resultados': {}, 'nomes': {}})
+
+    modelos = descobrir_modelos(pastas, incluir_ckpt=incluir_ckpt)
+    for raiz in armazens:
+        modelos += modelos_do_armazem(raiz, incluir_ckpt=incluir_ckpt)
+    print(f"🔎 {len(modelos)} modelos encontrados")
+    for m in modelos:
+        # Do armazém o hash vem do manifesto (o mesmo do zip original: o cache continua valendo)
+        m['hash'] = m.get('hash') or hash_conteudo(m['modelo'], m['normalizador'])
+        nomes = cache['nomes'].setdefault(m['hash'], [])
+        if m['modelo'] not in nomes:
+            nomes.append(m['modelo'])
+        faltando = [d for d in dificuldades
+                    if chave_cache(m['hash'], cenario, d, n_episodios, seed) not in cache['resultados']]
+        if not faltando:
+            print(f"♻️  Sem mudanças, usando o cache: {m['modelo']}")
+            continue
+        print(f"⚽ Jogando {m['modelo']} nas dificuldades {faltando}")
+        try:
+            modelo = carregar_modelo(m['modelo'])
+        except Exception as e:
+            print(f"❌ Não consegui carregar {m['modelo']}: {e}")
+            continue
+        resumos = avaliar_dificuldades(modelo, faltando, cenario=cenario, n_episodios=n_episodios,
+                                       n_envs=n_envs, seed=seed, normalizador=m['normalizador'])
+        for d, r in resumos.items():
+            cache['resultados'][chave_cache(m['hash'], cenario, d, n_episodios, seed)] = {
+                'hash': m['hash'], 'cenario': cenario, 'dificuldade': d,
+                'vitorias': int(round(r['vitorias'] * r['episodios'])),
+                'empates': int(round(r['empates'] * r['episodios'])),
+                'derrotas': int(round(r['derrotas'] * r['episodios'])),
+                'media': r['media'],
+            }
+        # Salva a cada modelo: se o torneio cair no meio, nada é jogado de novo
+        _salvar_json(caminho_cache, cache)
+    _salvar_json(caminho_cache, cache)
+
+    partidas = [
+        {'a': r['hash'], 'b': nome_bot(r['dificuldade']),
+         'vitorias': r['vitorias'], 'empates': r['empates'], 'derrotas': r['derrotas']}
+        for r in cache['resultados'].values() if r['cenario'] == cenario
+    ]
+    elo = calcular_elo(partidas) if partidas else {}
+    tabela = []
+    for jogador, rating in sorted(elo.items(), key=lambda kv: -kv[1]):
+        resultados = {str(r['dificuldade']): r['media'] for r in cache['resultados'].values()
+                      if r['hash'] == jogador and r['cenario'] == cenario}
+        tabela.append({
+            'jogador': jogador,
+            'nomes': cache['nomes'].get(jogador, [jogador]),
+            'elo': rating,
+            'saldo_por_dificuldade': resultados,
+        })
+    _salvar_json(caminho_elo, {'cenario': cenario, 'tabela': tabela})
+    return tabela
+
+
+def imprimir_tabela(tabela):
+    print("\n" + "=" * 80)
+    print("🏆 RANKING ELO")
+    print("=" * 80)
+    for pos, linha in enumerate(tabela, start=1):
+        nome = os.path.relpath(linha['nomes'][0], RAIZ_REPO) if os.path.isabs(linha['nomes'][0]) else linha['nomes'][0]
+        saldos = "  ".join(f"{d}: {m:+.2f}" for d, m in sorted(linha['saldo_por_dificuldade'].items()))
+        print(f"{pos:3d}. {linha['elo']:7.1f}  {nome}  {saldos}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Torneio contra o bot + ranking Elo de todos os modelos.")
+    parser.add_argument('pastas', nargs='*', default=PASTAS_PADRAO)
+    parser.add_argument('--dificuldades', type=float, nargs='+', default=[0.05, 0.25, 0.6])
+    parser.add_argument('--cenario', default='5_vs_5')
+    parser.add_argument('--episodios', type=int, default=100, help="Jogos por dificuldade")
+    parser.add_argument('--n-envs', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--com-ckpt', action='store_true', help="Inclui os ckpt_* intermediários")
+    parser.add_argument('--pasta-torneio', default=PASTA_TORNEIO)
+    parser.add_argument('--armazem', nargs='*', default=[],
+                        help="Também joga os checkpoints destes armazéns (armazem_checkpoints.py)")
+    args = parser.parse_args()
+
+    tabela = executar_torneio(args.pastas, dificuldades=args.dificuldades, cenario=args.cenario,
+                              n_episodios=args.episodios, n_envs=args.n_envs, seed=args.seed,
+                              incluir_ckpt=args.com_ckpt, pasta_torneio=args.pasta_torneio,
+                              armazens=args.armazem)
+    imprimir_tabela(tabela)
@@ -0,0 +1,344 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecNormalize, unwrap_vec_wrapper
+from collections import OrderedDict
+import argparse
+import json
+import os
+import zlib
+import numpy as np
+import torch
+
+# ==============================================================================
+# GRAVADOR DE TRAJETÓRIAS (formato colunar em chunks)
+# ==============================================================================
+# Guarda cada passo jogado (observação, ação, recompensa, done, logits e valor
+# da política) para estudar o comportamento depois sem jogar de novo, por
+# exemplo o "reward hacking" do TacticalWrapper. Uma linha por (passo, ambiente).
+#
+# Layout em disco (uma pasta por gravação):
+#   meta.json               colunas (dtype/forma), linhas por chunk, episódios por chunk
+#   <coluna>/00000.npy      chunk sem compressão: lido com mmap, nada vai para a RAM
+#   <coluna>/00000.npy.z    chunk com zlib: descomprimido sob demanda (cache LRU)
+#
+#   python3 src/trajetorias.py gravar modelo.zip --normalizador vec_normalize.pkl --episodios 50
+#   python3 src/trajetorias.py resumo ~/gfootball_logs/trajetorias/<nome>
+
+VERSAO = 1
+PASTA_PADRAO = os.path.expanduser("~/gfootball_logs/trajetorias")
+
+
+class GravadorTrajetorias:
+    def __init__(self, pasta, n_envs, linhas_por_chunk=65_536, comprimir=True, nivel=3):
+        self.pasta = pasta
+        self.n_envs = n_envs
+        self.linhas_por_chunk = linhas_por_chunk
+        self.comprimir = comprimir
+        self.nivel = nivel
+        os.makedirs(pasta, exist_ok=True)
+        self._buffers = None
+        self._n = 0
+        self.colunas = {}
+        self.chunks = []  # {'linhas', 'episodio_min', 'episodio_max'}
+        self._passo = 0
+        # Id global do episódio em andamento em cada ambiente
+        self._episodio = np.arange(n_envs, dtype=np.int64)
+        self._proximo_episodio = n_envs
+
+    def _alocar(self, linha):
+        self._buffers = {}
+        for nome, valor in linha.items():
+            valor = np.asarray(valor)
+            self.colunas[nome] = {'dtype': valor.dtype.str, 'forma': list(valor.shape[1:])}
+            self._buffers[nome] = np.empty((self.linhas_por_chunk, *valor.shape[1:]), dtype=valor.dtype)
+
+    def adicionar(self, obs, acoes, recompensas, dones, logits=None, valores=None, **extras):
+        # Um lote por passo: tudo com a primeira dimensão = n_envs
+        linha = {
+            'obs': obs,
+            'acao': np.asarray(acoes).reshape(self.n_envs),
+            'recompensa': np.asarray(recompensas, dtype=np.float32),
+            'done': np.asarray(dones, dtype=bool),
+            'episodio': self._episodio,
+            'passo': np.full(self.n_envs, self._passo, dtype=np.int64),
+            'env': np.arange(self.n_envs, dtype=np.int16),
+        }
+        if logits is not None:
+            linha['logits'] = np.asarray(logits, dtype=np.float32)
+        if valores is not None:
+            linha['valor'] = np.asarray(valores, dtype=np.float32).reshape(self.n_envs)
+        linha.update(extras)
+        if self._buffers is None:
+            self._alocar(linha)
+        inicio = 0
+        while inicio < self.n_envs:
+            n = min(self.n_envs - inicio, self.linhas_por_chunk - self._n)
+            for nome, buf in self._buffers.items():
+                buf[self._n:self._n + n] = linha[nome][inicio:inicio + n]
+            self._n += n
+            inicio += n
+            if self._n == self.linhas_por_chunk:
+                self._despejar()
+        # Episódios que terminaram ganham um id novo
+        dones = linha['done']
+        n_fim = int(dones.sum())
+        if n_fim:
+            self._episodio = self._episodio.copy()
+            self._episodio[dones] = np.arange(self._proximo_episodio, self._proximo_episodio + n_fim)
+            self._proximo_episodio += n_fim
+        self._passo += 1
+
+    def _despejar(self):
+        if self._n == 0:
+            return
+        k = len(self.chunks)
+        for nome, buf in self._buffers.items():
+            os.makedirs(os.path.join(self.pasta, nome), exist_ok=True)
+            dados = buf[:self._n]
+            caminho = os.path.join(self.pasta, nome, f"{k:05d}.npy")
+            if self.comprimir:
+                with open(caminho + ".z", 'wb') as f:
+                    f.write(zlib.compress(np.ascontiguousarray(dados).tobytes(), self.nivel))
+            else:
+                np.save(caminho, dados)
+        episodios = self._buffers['episodio'][:self._n]
+        self.chunks.append({'linhas': self._n, 'episodio_min': int(episodios.min()),
+                            'episodio_max': int(episodios.max())})
+        self._n = 0
+        self._salvar_meta()
+
+    def _salvar_meta(self):
+        meta = {'versao': VERSAO, 'comprimido': self.comprimir, 'colunas': self.colunas, 'chunks': self.chunks}
+        caminho = os.path.join(self.pasta, "meta.json")
+        with open(caminho + ".tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(caminho + ".tmp", caminho)
+
+    def fechar(self):
+        self._despejar()
+        self._salvar_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# === LEITURA ===
+class Coluna:
+    def __init__(self, leitor, nome):
+        self._leitor = leitor
+        self.nome = nome
+        info = leitor.meta['colunas'][nome]
+        self.dtype = np.dtype(info['dtype'])
+        self.forma = tuple(info['forma'])
+
+    def __len__(self):
+        return len(self._leitor)
+
+    @property
+    def shape(self):
+        return (len(self), *self.forma)
+
+    def chunk(self, k):
+        return self._leitor._chunk(self.nome, k)
+
+    def iterar_chunks(self):
+        for k in range(len(self._leitor.meta['chunks'])):
+            yield self.chunk(k)
+
+    def __getitem__(self, idx):
+        inicios = self._leitor._inicios
+        total = len(self)
+        if isinstance(idx, slice):
+            inicio, fim, salto = idx.indices(total)
+            if salto != 1:
+                return self[np.arange(inicio, fim, salto)]
+            partes = []
+            k = max(0, int(np.searchsorted(inicios, inicio, side='right')) - 1)
+            while inicio < fim:
+                base = inicios[k]
+                dados = self.chunk(k)
+                ate = min(fim, base + len(dados))
+                partes.append(dados[inicio - base:ate - base])
+                inicio = ate
+                k += 1
+            if not partes:
+                return np.empty((0, *self.forma), dtype=self.dtype)
+            return partes[0].copy() if len(partes) == 1 else np.concatenate(partes)
+        if np.ndim(idx) == 0:
+            i = int(idx) + (total if idx < 0 else 0)
+            k = int(np.searchsorted(inicios, i, side='right')) - 1
+            return self.chunk(k)[i - inicios[k]]
+        # Índices arbitrários: agrupados por chunk, cada chunk lido uma vez só
+        idx = np.asarray(idx)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        idx = np.where(idx < 0, idx + total, idx)
+        saida = np.empty((len(idx), *self.forma), dtype=self.dtype)
+        ks = np.searchsorted(inicios, idx, side='right') - 1
+        for k in np.unique(ks):
+            sel = ks == k
+            saida[sel] = self.chunk(int(k))[idx[sel] - inicios[k]]
+        return saida
+
+
+class LeitorTrajetorias:
+    def __init__(self, pasta, chunks_em_cache=8):
+        self.pasta = pasta
+        with open(os.path.join(pasta, "meta.json")) as f:
+            self.meta = json.load(f)
+        linhas = [c['linhas'] for c in self.meta['chunks']]
+        self._inicios = np.concatenate([[0], np.cumsum(linhas)]).astype(np.int64)
+        self._cache = OrderedDict()
+        self._max_cache = chunks_em_cache
+
+    def __len__(self):
+        return int(self._inicios[-1])
+
+    @property
+    def colunas(self):
+        return list(self.meta['colunas'])
+
+    def __getitem__(self, nome):
+        return Coluna(self, nome)
+
+    def _chunk(self, nome, k):
+        caminho = os.path.join(self.pasta, nome, f"{k:05d}.npy")
+        if not self.meta['comprimido']:
+            return np.load(caminho, mmap_mode='r')
+        chave = (nome, k)
+        if chave in self._cache:
+            self._cache.move_to_end(chave)
+            return self._cache[chave]
+        info = self.meta['colunas'][nome]
+        with open(caminho + ".z", 'rb') as f:
+            dados = np.frombuffer(zlib.decompress(f.read()), dtype=np.dtype(info['dtype']))
+        dados = dados.reshape(-1, *info['forma'])
+        self._cache[chave] = dados
+        if len(self._cache) > self._max_cache:
+            self._cache.popitem(last=False)
+        return dados
+
+    def episodio(self, id_episodio, colunas=None):
+        # Só abre os chunks em que o episódio pode estar (min/max do meta.json)
+        colunas = colunas or self.colunas
+        partes = {c: [] for c in colunas}
+        for k, info in enumerate(self.meta['chunks']):
+            if not info['episodio_min'] <= id_episodio <= info['episodio_max']:
+                continue
+            sel = self._chunk('episodio', k) == id_episodio
+            if sel.any():
+                for c in colunas:
+                    partes[c].append(self._chunk(c, k)[sel])
+        return {c: np.concatenate(p) if p else np.empty((0, *self.meta['colunas'][c]['forma']))
+                for c, p in partes.items()}
+
+    def resumo_episodios(self):
+        # Uma passada chunk a chunk: retorno, duração e gols de cada episódio fechado
+        retorno, passos, gols_pro, gols_contra, fechados = {}, {}, {}, {}, set()
+        tem_gol = 'gol' in self.meta['colunas']
+        for k in range(len(self.meta['chunks'])):
+            eps = self._chunk('episodio', k)
+            rec = self._chunk('recompensa', k)
+            ids, inv = np.unique(eps, return_inverse=True)
+            soma = np.bincount(inv, weights=rec)
+            cont = np.bincount(inv)
+            if tem_gol:
+                gol = self._chunk('gol', k)
+                pro = np.bincount(inv, weights=(gol > 0).astype(np.float64))
+                contra = np.bincount(inv, weights=(gol < 0).astype(np.float64))
+            for j, e in enumerate(ids.tolist()):
+                retorno[e] = retorno.get(e, 0.0) + soma[j]
+                passos[e] = passos.get(e, 0) + int(cont[j])
+                if tem_gol:
+                    gols_pro[e] = gols_pro.get(e, 0) + int(pro[j])
+                    gols_contra[e] = gols_contra.get(e, 0) + int(contra[j])
+            fechados.update(eps[self._chunk('done', k)].tolist())
+        ids = sorted(fechados)
+        resumo = {
+            'episodio': np.array(ids, dtype=np.int64),
+            'retorno': np.array([retorno[e] for e in ids]),
+            'passos': np.array([passos[e] for e in ids], dtype=np.int64),
+        }
+        if tem_gol:
+            resumo['gols_pro'] = np.array([gols_pro[e] for e in ids], dtype=np.int64)
+            resumo['gols_contra'] = np.array([gols_contra[e] for e in ids], dtype=np.int64)
+        return resumo
+
+
+# === POLÍTICA ===
+def saida_politica(model, obs, deterministic=True):
+    # Igual ao model.predict, mas devolve também os logits e o valor estimado
+    policy = model.policy
+    with torch.no_grad():
+        obs_t, _ = policy.obs_to_tensor(obs)
+        dist = policy.get_distribution(obs_t)
+        acoes = dist.get_actions(deterministic=deterministic)
+        valores = policy.predict_values(obs_t)
+    return (acoes.cpu().numpy(), dist.distribution.logits.cpu().numpy(),
+            valores.cpu().numpy().reshape(-1))
+
+
+def gravar_episodios(model, vec_env, n_episodios, pasta, deterministic=True, **kwargs_gravador):
+    # Grava a observação crua (antes do VecNormalize): é o que o jogo mostrou
+    normalizador = unwrap_vec_wrapper(vec_env, VecNormalize)
+    n_envs = vec_env.num_envs
+    feitos = 0
+    obs = vec_env.reset()
+    with GravadorTrajetorias(pasta, n_envs, **kwargs_gravador) as gravador:
+        while feitos < n_episodios:
+            crua = normalizador.get_original_obs() if normalizador is not None else obs
+            acoes, logits, valores = saida_politica(model, obs, deterministic=deterministic)
+            obs, recompensas, dones, infos = vec_env.step(acoes)
+            if normalizador is not None:
+                recompensas = normalizador.get_original_reward()
+            gol = np.array([info.get('score_reward', 0) for info in infos], dtype=np.int8)
+            gravador.adicionar(crua, acoes, recompensas, dones, logits=logits, valores=valores, gol=gol)
+            feitos += int(dones.sum())
+    return LeitorTrajetorias(pasta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grava e resume trajetórias da política.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_gravar = sub.add_parser('gravar')
+    p_gravar.add_argument('modelo')
+    p_gravar.add_argument('--normalizador', default=None)
+    p_gravar.add_argument('--cenario', default='5_vs_5')
+    p_gravar.add_argument('--rewards', default='scoring,checkpoints')
+    p_gravar.add_argument('--episodios', type=int, default=20)
+    p_gravar.add_argument('--n-envs', type=int, default=8)
+    p_gravar.add_argument('--seed', type=int, default=0)
+    p_gravar.add_argument('--saida', default=None)
+    p_gravar.add_argument('--sem-compressao', action='store_true', help="Chunks .npy puros (leitura com mmap)")
+    p_gravar.add_argument('--estocastico', action='store_true')
+    p_resumo = sub.add_parser('resumo')
+    p_resumo.add_argument('pasta')
+    args = parser.parse_args()
+
+    if args.comando == 'gravar':
+        from avaliador import criar_vec_avaliacao
+        nome = os.path.splitext(os.path.basename(args.modelo.rstrip('/')))[0]
+        saida = args.saida or os.path.join(PASTA_PADRAO, f"{nome}_{args.cenario}_seed{args.seed}")
+        model = PPO.load(args.modelo, device="cpu")
+        vec_env = criar_vec_avaliacao(args.cenario, args.n_envs, seed=args.seed,
+                                      normalizador=args.normalizador, rewards=args.rewards)
+        try:
+            leitor = gravar_episodios(model, vec_env, args.episodios, saida,
+                                      deterministic=not args.estocastico, comprimir=not args.sem_compressao)
+        finally:
+            vec_env.close()
+        print(f"💾 {len(leitor)} linhas gravadas em {saida}")
+        pasta = saida
+    else:
+        pasta = args.pasta
+
+    leitor = LeitorTrajetorias(pasta)
+    r = leitor.resumo_episodios()
+    print(f"📼 {len(leitor)} linhas, {len(leitor.meta['chunks'])} chunks, colunas: {leitor.colunas}")
+    if len(r['episodio']):
+        print(f"   {len(r['episodio'])} episódios | retorno médio {r['retorno'].mean():.3f} "
+              f"| passos médio {r['passos'].mean():.0f}")
+        if 'gols_pro' in r:
+            print(f"   Gols pró/contra por episódio: {r['gols_pro'].mean():.2f} / {r['gols_contra'].mean():.2f}")
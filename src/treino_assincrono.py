@@ -0,0 +1,418 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.logger import configure
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from collections import deque
+from functools import partial
+from multiprocessing import shared_memory
+import argparse
+import gymnasium
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+import numpy as np
+import torch
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from ambientes import converter_espaco, criar_env
+from checkpoint_assincrono import Escritor, fotografar
+from curriculo import FASES, PPO_KWARGS, pastas_da_fase
+from worker_paralelo import anexar_shm, passo_env, resetar_env
+
+# ==============================================================================
+# TREINO ASSÍNCRONO ATOR/APRENDIZ (estilo IMPALA, correção V-trace)
+# ==============================================================================
+# No model.learn os ambientes esperam o PPO atualizar e o PPO espera os
+# ambientes coletarem. Aqui os dois rodam ao mesmo tempo:
+#
+#   atores (processos) --unrolls--> fila --> aprendiz (este processo)
+#        ^                                        |
+#        +---- pesos + obs_rms em memória compartilhada (versão) <--+
+#
+# Cada ator joga com uma cópia (um pouco velha) da política e manda unrolls de
+# T passos com as observações CRUAS e os logits com que agiu. O aprendiz
+# atualiza a normalização, normaliza de novo com a estatística atual e corrige
+# a diferença entre a política que agiu e a atual com o V-trace. Depois de
+# cada atualização publica os pesos; o ator pega a versão nova entre unrolls.
+#
+# Usa as fases do curriculo.py (mesmo cenário/rewards/lr/entropia) e salva no
+# mesmo layout: <final>.zip e o vec_normalize_*.pkl no fim, e os checkpoints
+# periódicos como o CheckpointAssincrono (<prefixo>_<passos>_steps/ com o
+# modelo e o VecNormalize do mesmo passo, gravados numa thread à parte).
+#
+#   python3 src/treino_assincrono.py --fase 5 --atores 8 --envs-por-ator 2
+#   GFOOTBALL_MOCK=1 python3 src/treino_assincrono.py --fase 1 --timesteps 200000
+
+
+# === PESOS COMPARTILHADOS (seqlock) ===
+# versão ímpar = o aprendiz está escrevendo; o ator só aceita uma cópia feita
+# inteira entre duas leituras iguais (e pares) da versão.
+class PesosCompartilhados:
+    def __init__(self, n, versao, shm=None):
+        # 'versao' é um RawValue criado antes dos atores (só passa por herança)
+        self.n = n
+        self.shm = shm or shared_memory.SharedMemory(create=True, size=4 * n)
+        self.buf = np.ndarray((n,), dtype=np.float32, buffer=self.shm.buf)
+        self.versao = versao
+
+    def publicar(self, vetor):
+        self.versao.value += 1
+        self.buf[:] = vetor
+        self.versao.value += 1
+
+    def ler(self, destino, versao_atual):
+        while True:
+            v = self.versao.value
+            if v == versao_atual:
+                return False
+            if v % 2:
+                time.sleep(0.0005)
+                continue
+            destino[:] = self.buf
+            if self.versao.value == v:
+                return v
+
+
+def _vetor_publicado(policy, obs_rms):
+    with torch.no_grad():
+        pesos = parameters_to_vector(policy.parameters()).cpu().numpy()
+    return np.concatenate([pesos, obs_rms.mean.astype(np.float32), obs_rms.var.astype(np.float32)])
+
+
+# === ATOR ===
+def _ator(id_ator, env_fns, config, versao_pesos, fila_espacos, fila_config, fila_unrolls, fila_erros, parar):
+    # O traceback vai para o aprendiz, que para o treino em vez de esperar a fila para sempre
+    try:
+        _jogar(id_ator, env_fns, config, versao_pesos, fila_espacos, fila_config, fila_unrolls, parar)
+    except Exception:
+        fila_erros.put((id_ator, traceback.format_exc()))
+        raise
+
+
+def _jogar(id_ator, env_fns, config, versao_pesos, fila_espacos, fila_config, fila_unrolls, parar):
+    torch.set_num_threads(1)
+    envs = [fn() for fn in env_fns]
+    if id_ator == 0:
+        fila_espacos.put((converter_espaco(envs[0].observation_space), converter_espaco(envs[0].action_space)))
+    cfg = fila_config.get()
+    pesos = PesosCompartilhados(cfg['n_pesos'], versao_pesos, shm=anexar_shm(cfg['shm_pesos']))
+    policy = cfg['policy_class'](cfg['obs_space'], cfg['act_space'], lambda _: 0.0, **cfg['policy_kwargs'])
+    policy.set_training_mode(False)
+    n_params = sum(p.numel() for p in policy.parameters())
+    dim = int(np.prod(cfg['obs_space'].shape))
+    local = np.empty(pesos.n, dtype=np.float32)
+    versao = -1
+
+    def sincronizar():
+        nonlocal versao
+        nova = pesos.ler(local, versao)
+        if nova is not False:
+            vector_to_parameters(torch.from_numpy(local[:n_params]), policy.parameters())
+            versao = nova
+
+    T, k, clip, eps = config['passos_unroll'], len(envs), cfg['clip_obs'], cfg['epsilon']
+    rng = np.random.default_rng(config['seed'] + id_ator)
+    obs = np.stack([np.asarray(resetar_env(env, seed=config['seed'] + id_ator * k + i)[0], dtype=np.float32)
+                    for i, env in enumerate(envs)])
+    retornos = np.zeros(k)
+    passos_ep = np.zeros(k, dtype=np.int64)
+    gols = np.zeros((k, 2), dtype=np.int64)
+    sincronizar()
+    while not parar.is_set():
+        media, var = local[n_params:n_params + dim], local[n_params + dim:]
+        u_obs = np.empty((T + 1, k, dim), dtype=np.float32)
+        u_acoes = np.empty((T, k), dtype=np.int64)
+        u_rec = np.empty((T, k), dtype=np.float32)
+        u_dones = np.empty((T, k), dtype=bool)
+        u_logits = np.empty((T, k, cfg['act_space'].n), dtype=np.float32)
+        episodios = []
+        for t in range(T):
+            u_obs[t] = obs
+            norm = np.clip((np.nan_to_num(obs) - media) / np.sqrt(var + eps), -clip, clip)
+            with torch.inference_mode():
+                logits = policy.get_distribution(torch.as_tensor(norm)).distribution.logits.numpy()
+            # Gumbel-max: amostra direto dos logits
+            acoes = (logits - np.log(-np.log(rng.random(logits.shape)))).argmax(axis=1)
+            u_logits[t] = logits
+            u_acoes[t] = acoes
+            for i, env in enumerate(envs):
+                o, r, done, info = passo_env(env, int(acoes[i]))
+                score = info.get('score_reward', 0)
+                gols[i] += (score > 0, score < 0)
+                retornos[i] += r
+                passos_ep[i] += 1
+                if done:
+                    episodios.append((retornos[i], passos_ep[i], gols[i, 0], gols[i, 1]))
+                    retornos[i], passos_ep[i], gols[i] = 0, 0, 0
+                    o, _ = resetar_env(env)
+                u_rec[t, i] = r
+                u_dones[t, i] = done
+                obs[i] = o
+        u_obs[T] = obs
+        unroll = {'obs': u_obs, 'acoes': u_acoes, 'recompensas': u_rec, 'dones': u_dones,
+                  'logits': u_logits, 'versao': versao, 'episodios': episodios}
+        while not parar.is_set():
+            try:
+                fila_unrolls.put(unroll, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        sincronizar()
+    for env in envs:
+        env.close()
+
+
+# === APRENDIZ ===
+def _verificar_atores(atores, fila_erros):
+    mortos = [(a, p.exitcode) for a, p in enumerate(atores) if not p.is_alive()]
+    if not mortos:
+        return
+    erros = {}
+    while True:
+        try:
+            id_ator, erro = fila_erros.get(timeout=0.5)
+        except queue.Empty:
+            break
+        erros[id_ator] = erro
+    a, codigo = mortos[0]
+    # Sem traceback (ex.: morto pelo OOM killer) fica só o código de saída
+    raise RuntimeError(f"Erro no ator {a} (código de saída {codigo}):\n{erros.get(a, '')}")
+
+
+def _receber(fila, atores, fila_erros, espera_s=1.0):
+    # get() com timeout: se um ator morreu, o aprendiz não fica preso na fila
+    while True:
+        try:
+            return fila.get(timeout=espera_s)
+        except queue.Empty:
+            _verificar_atores(atores, fila_erros)
+
+
+def atraso_versoes(versao_ator, atualizacoes):
+    # A versão do seqlock vale 2 depois da publicação inicial e sobe 2 por
+    # atualização: o ator agiu com os pesos da atualização versao_ator // 2 - 1.
+    # 'atualizacoes' = quantas o aprendiz já tinha feito quando o unroll chegou
+    return atualizacoes - (versao_ator // 2 - 1)
+
+
+# === V-TRACE ===
+def vtrace(log_rhos, descontos, recompensas, valores, valor_final, rho_max=1.0, c_max=1.0):
+    # Espeholt et al. 2018, eq. (1). Tudo (T, N), sem gradiente.
+    rhos = torch.exp(log_rhos)
+    rhos_cortados = torch.clamp(rhos, max=rho_max)
+    cs = torch.clamp(rhos, max=c_max)
+    valores_seguintes = torch.cat([valores[1:], valor_final[None]], dim=0)
+    deltas = rhos_cortados * (recompensas + descontos * valores_seguintes - valores)
+    acumulado = torch.zeros_like(valor_final)
+    vs_menos_v = torch.empty_like(valores)
+    for t in reversed(range(len(valores))):
+        acumulado = deltas[t] + descontos[t] * cs[t] * acumulado
+        vs_menos_v[t] = acumulado
+    vs = vs_menos_v + valores
+    vs_seguintes = torch.cat([vs[1:], valor_final[None]], dim=0)
+    vantagens = rhos_cortados * (recompensas + descontos * vs_seguintes - valores)
+    return vs, vantagens
+
+
+# === CASCA PARA O PPO/VecNormalize ===
+# O aprendiz não tem ambientes: uma casca com os mesmos espaços deixa usar o
+# PPO (política, otimizador, save/load) e o VecNormalize (obs_rms, save) do SB3.
+class _Casca(gymnasium.Env):
+    def __init__(self, observation_space, action_space):
+        self.observation_space = observation_space
+        self.action_space = action_space
+
+    def reset(self, seed=None, options=None):
+        return np.zeros(self.observation_space.shape, dtype=np.float32), {}
+
+    def step(self, action):
+        return np.zeros(self.observation_space.shape, dtype=np.float32), 0.0, True, False, {}
+
+
+def treinar_assincrono(fase, n_atores=8, envs_por_ator=2, timesteps=None, modelo=None, normalizador=None,
+                       passos_unroll=64, unrolls_por_lote=8, fila_max=32, seed=0, raiz=None, start_method=None):
+    log_dir, models_dir = pastas_da_fase(fase, raiz) if raiz else pastas_da_fase(fase)
+    os.makedirs(models_dir, exist_ok=True)
+    timesteps = timesteps or fase['timesteps']
+    if start_method is None:
+        start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+    ctx = mp.get_context(start_method)
+    fila_espacos, fila_config = ctx.Queue(), ctx.Queue()
+    fila_unrolls = ctx.Queue(maxsize=fila_max)
+    fila_erros = ctx.Queue()
+    parar = ctx.Event()
+    versao_pesos = ctx.RawValue('q', 0)
+    config = {'passos_unroll': passos_unroll, 'seed': seed}
+
+    atores = []
+    for a in range(n_atores):
+        env_fns = [partial(criar_env, fase['cenario'], fase['rewards'], seed=seed + a * envs_por_ator + i,
+                           monitor=False) for i in range(envs_por_ator)]
+        p = ctx.Process(target=_ator, daemon=True, args=(a, env_fns, config, versao_pesos, fila_espacos,
+                                                         fila_config, fila_unrolls, fila_erros, parar))
+        p.start()
+        atores.append(p)
+
+    obs_space, act_space = _receber(fila_espacos, atores, fila_erros)
+    # Mesmo espaço que o VecSanitize entrega no treino normal (float32), senão o PPO.load recusa
+    obs_space = gymnasium.spaces.Box(low=obs_space.low.astype(np.float32), high=obs_space.high.astype(np.float32),
+                                     shape=obs_space.shape, dtype=np.float32)
+    vec_norm = VecNormalize(DummyVecEnv([partial(_Casca, obs_space, act_space)]),
+                            norm_obs=True, norm_reward=False, clip_obs=10.)
+    if normalizador:
+        vec_norm = VecNormalize.load(normalizador, vec_norm.venv)
+    if modelo:
+        print(f"🧠 Carregando: {modelo}")
+        model = PPO.load(modelo, env=vec_norm, device="auto")
+    else:
+        model = PPO("MlpPolicy", vec_norm, verbose=1, device="auto", seed=seed,
+                    learning_rate=fase['learning_rate'], ent_coef=fase['ent_coef'], **PPO_KWARGS)
+    model.learning_rate = fase['learning_rate']
+    model._setup_lr_schedule()
+    model.ent_coef = fase['ent_coef']
+    model.set_logger(configure(os.path.join(log_dir, f"{fase['nome']}_assincrono"), ['stdout', 'tensorboard']))
+    policy = model.policy
+    policy.set_training_mode(True)
+
+    vetor = _vetor_publicado(policy, vec_norm.obs_rms)
+    pesos = PesosCompartilhados(len(vetor), versao_pesos)
+    pesos.publicar(vetor)
+    cfg = {'shm_pesos': pesos.shm.name, 'n_pesos': pesos.n,
+           'policy_class': model.policy_class, 'policy_kwargs': model.policy_kwargs,
+           'obs_space': obs_space, 'act_space': act_space, 'clip_obs': vec_norm.clip_obs,
+           'epsilon': vec_norm.epsilon}
+    for _ in atores:
+        fila_config.put(cfg)
+
+    print("\n" + "=" * 80)
+    print(f"🚀 TREINO ASSÍNCRONO - {fase['nome']} ({fase['cenario']}): "
+          f"{n_atores} atores x {envs_por_ator} ambientes 🚀")
+    print("=" * 80 + "\n")
+
+    passos = 0
+    atualizacoes = 0
+    proximo_ckpt = fase['save_freq']
+    inicio = time.perf_counter()
+    episodios = []
+    retornos = deque(maxlen=100)  # métrica do melhor checkpoint, como o ep_rew_mean
+    escritor = Escritor(models_dir, fase['prefixo'])
+    dim = int(np.prod(obs_space.shape))
+    try:
+        while passos < timesteps:
+            lote = [_receber(fila_unrolls, atores, fila_erros) for _ in range(unrolls_por_lote)]
+            # Um ator morto deixa de mandar unrolls, mas os outros ainda enchem a fila
+            _verificar_atores(atores, fila_erros)
+            atraso = np.mean([atraso_versoes(u['versao'], atualizacoes) for u in lote])
+            obs = np.concatenate([u['obs'] for u in lote], axis=1)            # (T+1, N, D)
+            acoes = np.concatenate([u['acoes'] for u in lote], axis=1)        # (T, N)
+            recompensas = np.concatenate([u['recompensas'] for u in lote], axis=1)
+            dones = np.concatenate([u['dones'] for u in lote], axis=1)
+            logits_ator = np.concatenate([u['logits'] for u in lote], axis=1)
+            T, N = acoes.shape
+            for u in lote:
+                episodios += u['episodios']
+                retornos.extend(e[0] for e in u['episodios'])
+
+            # Normalização: aprende com o que os atores viram, normaliza com a estatística atual
+            cruas = np.nan_to_num(obs.reshape(-1, dim))
+            vec_norm.obs_rms.update(cruas[:T * N])
+            norm = vec_norm.normalize_obs(cruas).astype(np.float32)
+            obs_t = torch.as_tensor(norm, device=policy.device)
+
+            model._update_current_progress_remaining(passos, timesteps)
+            model._update_learning_rate(policy.optimizer)
+            acoes_t = torch.as_tensor(acoes.reshape(-1), device=policy.device)
+            valores, log_prob, entropia = policy.evaluate_actions(obs_t[:T * N], acoes_t)
+            with torch.no_grad():
+                valor_final = policy.predict_values(obs_t[T * N:]).reshape(N)
+                log_mu = torch.log_softmax(torch.as_tensor(logits_ator, device=policy.device), dim=-1)
+                log_mu = log_mu.reshape(T * N, -1).gather(1, acoes_t[:, None]).reshape(T, N)
+                descontos = model.gamma * (1.0 - torch.as_tensor(dones, dtype=torch.float32, device=policy.device))
+                rec_t = torch.as_tensor(recompensas, device=policy.device)
+                vs, vantagens = vtrace(log_prob.detach().reshape(T, N) - log_mu, descontos, rec_t,
+                                       valores.detach().reshape(T, N), valor_final)
+
+            perda_pg = -(vantagens.reshape(-1) * log_prob).mean()
+            perda_v = 0.5 * ((vs.reshape(-1) - valores.reshape(-1)) ** 2).mean()
+            perda_ent = -entropia.mean()
+            perda = perda_pg + model.vf_coef * perda_v + model.ent_coef * perda_ent
+            policy.optimizer.zero_grad()
+            perda.backward()
+            torch.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+            policy.optimizer.step()
+
+            pesos.publicar(_vetor_publicado(policy, vec_norm.obs_rms))
+            atualizacoes += 1
+            passos += T * N
+            model.num_timesteps = passos
+
+            if atualizacoes % 10 == 0:
+                model.logger.record('train/policy_gradient_loss', perda_pg.item())
+                model.logger.record('train/value_loss', perda_v.item())
+                model.logger.record('train/entropy_loss', perda_ent.item())
+                model.logger.record('train/rho_medio', torch.exp(log_prob.detach().reshape(T, N) - log_mu).mean().item())
+                model.logger.record('assincrono/atraso_versoes', float(atraso))
+                model.logger.record('time/fps', int(passos / (time.perf_counter() - inicio)))
+                if episodios:
+                    e = np.array(episodios, dtype=np.float64)
+                    model.logger.record('rollout/ep_rew_mean', e[:, 0].mean())
+                    model.logger.record('rollout/ep_len_mean', e[:, 1].mean())
+                    model.logger.record('rollout/goals', int(e[:, 2].sum()))
+                    model.logger.record('rollout/gols_sofridos', int(e[:, 3].sum()))
+                    episodios = []
+                model.logger.dump(passos)
+
+            if passos >= proximo_ckpt:
+                # Foto em memória aqui, escrita na thread do Escritor (ocupada: tenta no próximo lote)
+                metrica = float(np.mean(retornos)) if retornos else None
+                if escritor.enviar(fotografar(model, vec_norm), metrica):
+                    proximo_ckpt += fase['save_freq']
+            while not escritor.erros.empty():
+                print(f"❌ Checkpoint em segundo plano falhou:\n{escritor.erros.get()}")
+    finally:
+        escritor.fechar()
+        parar.set()
+        # Esvazia a fila para nenhum ator ficar preso no put
+        while any(p.is_alive() for p in atores):
+            try:
+                fila_unrolls.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            for p in atores:
+                p.join(timeout=0.05)
+        pesos.shm.close()
+        pesos.shm.unlink()
+
+    model.save(os.path.join(models_dir, fase['final']))
+    vec_norm.save(os.path.join(models_dir, fase['normalizador']))
+    print(f"✅ {fase['nome']} (assíncrono) COMPLETA!")
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treino assíncrono ator/aprendiz com V-trace.")
+    parser.add_argument('--fase', type=int, default=5, help="Fase do curriculo.py (1 a 5)")
+    parser.add_argument('--atores', type=int, default=8)
+    parser.add_argument('--envs-por-ator', type=int, default=2)
+    parser.add_argument('--timesteps', type=int, default=None, help="Padrão: o da fase")
+    parser.add_argument('--passos-unroll', type=int, default=64)
+    parser.add_argument('--unrolls-por-lote', type=int, default=8)
+    parser.add_argument('--modelo', default=None, help="Modelo inicial; padrão: o final da fase anterior")
+    parser.add_argument('--normalizador', default=None)
+    parser.add_argument('--do-zero', action='store_true', help="Ignora o final da fase anterior")
+    args = parser.parse_args()
+
+    fase = FASES[args.fase - 1]
+    modelo, normalizador = args.modelo, args.normalizador
+    if modelo is None and not args.do_zero and args.fase > 1:
+        # Como o curriculo.py --inicio: parte do final da fase anterior salvo em disco
+        anterior = FASES[args.fase - 2]
+        _, models_anterior = pastas_da_fase(anterior)
+        modelo = os.path.join(models_anterior, anterior['final'])
+        caminho_norm = os.path.join(models_anterior, anterior['normalizador'])
+        if normalizador is None and os.path.exists(caminho_norm):
+            normalizador = caminho_norm
+    treinar_assincrono(fase, n_atores=args.atores, envs_por_ator=args.envs_por_ator, timesteps=args.timesteps,
+                       modelo=modelo, normalizador=normalizador, passos_unroll=args.passos_unroll,
+                       unrolls_por_lote=args.unrolls_por_lote)
@@ -0,0 +1,220 @@
+from stable_baselines3.common.vec_env import VecEnv
+from multiprocessing import shared_memory
+from functools import partial
+import multiprocessing as mp
+import numpy as np
+import os
+
+from ambientes import converter_espaco, criar_env, modo_mock
+from worker_paralelo import (CMD_FECHAR, CMD_PIPE, CMD_STEP, FabricasSerializadas, LayoutCompartilhado, _worker,
+                             formato_acao)
+
+# ==============================================================================
+# ROLLOUT PARALELO (substitui o DummyVecEnv)
+# ==============================================================================
+# Cada worker é um processo com um ou mais ambientes. Observações simple115
+# empilhadas, ações, recompensas, dones e infos numéricos ficam num único bloco
+# de memória compartilhada; o controle é um array de int32 + semáforos, então
+# nenhum passo comum passa por pickle.
+#
+# Cada worker também escreve quanto tempo o passo de cada ambiente levou
+# (env.step + reset automático, em ns): é o que o instrumentacao.py usa para
+# achar ambientes lentos. Dois perf_counter_ns por passo, sem custo visível.
+#
+# O código que roda nos workers fica no worker_paralelo.py, sem SB3/torch: um
+# worker só carrega o que o make_env dele importa.
+#
+# Uso nos scripts:
+#   vec_env = criar_vec_env(make_env, n_envs=8)
+#   vec_env = VecNormalize(vec_env, norm_obs=True, norm_reward=False, clip_obs=10.)
+
+
+def n_workers_padrao(n_envs):
+    # Um processo por núcleo livre (deixamos 1 para o learner), nunca mais que n_envs
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    return max(1, min(n_envs, cpus - 1))
+
+
+# === VEC ENV ===
+class SharedMemoryVecEnv(VecEnv):
+    def __init__(self, env_fns, n_workers=None, start_method=None, copiar_obs=True,
+                 info_keys=('score_reward',)):
+        n_envs = len(env_fns)
+        n_workers = n_workers or n_workers_padrao(n_envs)
+        n_workers = max(1, min(n_workers, n_envs))
+        # Sem copiar_obs o step devolve uma view do buffer compartilhado, válida
+        # até o próximo step. Só use atrás do VecNormalize (que já copia).
+        self.copiar_obs = copiar_obs
+        # Chaves numéricas do info que viajam pela memória compartilhada a cada
+        # passo; o resto do info só chega no fim do episódio.
+        self.info_keys = tuple(info_keys)
+        self.waiting = False
+        self.closed = False
+
+        if start_method is None:
+            # forkserver é o padrão do SB3: seguro mesmo com o torch já carregado
+            start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        ctx = mp.get_context(start_method)
+
+        # Ambientes distribuídos em blocos contíguos: worker w cuida de self._grupos[w]
+        self._grupos = [[int(i) for i in g] for g in np.array_split(np.arange(n_envs), n_workers)]
+        self._local = {}
+        for w, grupo in enumerate(self._grupos):
+            for j, i in enumerate(grupo):
+                self._local[i] = (w, j)
+
+        self._sem_cmd = [ctx.Semaphore(0) for _ in range(n_workers)]
+        self._sem_fim = ctx.Semaphore(0)
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_workers)])
+        self.processes = []
+        for w, (grupo, work_remote, remote) in enumerate(zip(self._grupos, self.work_remotes, self.remotes)):
+            fns = FabricasSerializadas([env_fns[i] for i in grupo])
+            args = (work_remote, remote, fns, grupo, w, self._sem_cmd[w], self._sem_fim, self.info_keys)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        # Os workers criam os ambientes em paralelo e respondem com os espaços
+        espacos = [remote.recv() for remote in self.remotes]
+        observation_space, action_space = espacos[0]
+        formato_obs = tuple(observation_space.shape)
+        formato_act, dtype_act = formato_acao(action_space)
+        self._layout = LayoutCompartilhado([
+            ('obs', (n_envs, *formato_obs), np.float32),
+            ('obs_terminal', (n_envs, *formato_obs), np.float32),
+            ('acoes', (n_envs, *formato_act), dtype_act),
+            ('recompensas', (n_envs,), np.float32),
+            ('dones', (n_envs,), np.bool_),
+            ('info', (n_envs, len(self.info_keys)), np.float64),
+            ('tempos', (n_envs,), np.int64),
+            ('ctrl', (n_workers,), np.int32),
+            ('status', (n_workers,), np.int32),
+        ])
+        self._shm = shared_memory.SharedMemory(create=True, size=self._layout.tamanho)
+        self._buf = self._layout.views(self._shm.buf)
+        for remote in self.remotes:
+            remote.send((self._shm.name, self._layout))
+
+        super().__init__(n_envs, converter_espaco(observation_space), converter_espaco(action_space))
+
+    # --- passo ---
+    def step_async(self, actions):
+        np.copyto(self._buf['acoes'], np.asarray(actions).reshape(self._buf['acoes'].shape), casting='unsafe')
+        self._buf['ctrl'][:] = CMD_STEP
+        for sem in self._sem_cmd:
+            sem.release()
+        self.waiting = True
+
+    def step_wait(self):
+        for _ in self._sem_cmd:
+            self._sem_fim.acquire()
+        self.waiting = False
+        b = self._buf
+        for w in np.flatnonzero(b['status']):
+            raise RuntimeError(f"Erro no worker {w}:\n{self.remotes[w].recv()}")
+
+        dones = b['dones'].copy()
+        if self.info_keys:
+            infos = [dict(zip(self.info_keys, linha)) for linha in b['info'].tolist()]
+        else:
+            infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for w, grupo in enumerate(self._grupos):
+                if not dones[grupo].any():
+                    continue
+                for i, info, reset_info in self.remotes[w].recv():
+                    info['terminal_observation'] = b['obs_terminal'][i].copy()
+                    infos[i] = info
+                    self.reset_infos[i] = reset_info
+        return self._obs(), b['recompensas'].copy(), dones, infos
+
+    @property
+    def tempos_passo(self):
+        # ns do último passo de cada ambiente (view do bloco: copie se for guardar)
+        return self._buf['tempos']
+
+    @property
+    def grupos(self):
+        # Índices dos ambientes de cada worker (rodam em sequência dentro dele)
+        return self._grupos
+
+    def reset(self):
+        for w, grupo in enumerate(self._grupos):
+            self._enviar(w, ('reset', [(self._seeds[i], self._options[i]) for i in grupo]))
+        self.reset_infos = [info for remote in self.remotes for info in remote.recv()]
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs()
+
+    def _obs(self):
+        return self._buf['obs'].copy() if self.copiar_obs else self._buf['obs']
+
+    def _enviar(self, w, mensagem):
+        self._buf['ctrl'][w] = CMD_PIPE
+        self.remotes[w].send(mensagem)
+        self._sem_cmd[w].release()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            self.step_wait()
+        self._buf['ctrl'][:] = CMD_FECHAR
+        for sem in self._sem_cmd:
+            sem.release()
+        for process in self.processes:
+            process.join()
+        self._buf = None
+        self._shm.close()
+        self._shm.unlink()
+        self.closed = True
+
+    # --- acesso aos ambientes ---
+    def _por_worker(self, indices):
+        alvo = {}
+        for i in self._get_indices(indices):
+            w, j = self._local[i]
+            alvo.setdefault(w, []).append(j)
+        return alvo
+
+    def _pedir(self, cmd, indices, *args):
+        alvo = self._por_worker(indices)
+        for w, local in alvo.items():
+            self._enviar(w, (cmd, (local, *args)))
+        return [(w, self.remotes[w].recv()) for w in alvo]
+
+    def get_attr(self, attr_name, indices=None):
+        valores = []
+        for _, (ok, resposta) in self._pedir('get_attr', indices, attr_name):
+            if not ok:
+                raise resposta
+            valores.extend(resposta)
+        return valores
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._pedir('set_attr', indices, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        respostas = self._pedir('env_method', indices, method_name, method_args, method_kwargs)
+        return [r for _, resposta in respostas for r in resposta]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        respostas = self._pedir('is_wrapped', indices, wrapper_class)
+        return [r for _, resposta in respostas for r in resposta]
+
+
+# === ATALHO PARA OS SCRIPTS ===
+# Com GFOOTBALL_MOCK=1 os make_env são trocados pelo MockFootballEnv, então dá
+# para conferir o pipeline inteiro (rollout, VecNormalize, PPO) sem o jogo.
+def criar_vec_env(make_env, n_envs=8, n_workers=None, mock=None, **kwargs):
+    if mock is None:
+        mock = modo_mock()
+    if mock:
+        env_fns = [partial(criar_env, mock=True, seed=i) for i in range(n_envs)]
+    else:
+        env_fns = [make_env for _ in range(n_envs)]
+    return SharedMemoryVecEnv(env_fns, n_workers=n_workers, **kwargs)
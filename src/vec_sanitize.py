@@ -0,0 +1,99 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper, unwrap_vec_wrapper
+from gymnasium import spaces
+import numpy as np
+
+# ==============================================================================
+# SANITIZAÇÃO DE OBSERVAÇÕES (NaN/inf -> número, float32)
+# ==============================================================================
+# Substitui o ImprovedGoalWrapper (um np.nan_to_num + astype por ambiente e por
+# passo, duas alocações cada). Aqui o lote inteiro (n_envs, obs_dim) é tratado
+# de uma vez, no próprio array quando ele já é float32 e gravável, ou num buffer
+# float32 reaproveitado. Sem NaN/inf no lote o custo é um isfinite + all.
+#
+# Ordem nos scripts:  vec env -> VecSanitize -> VecNormalize
+
+
+class VecSanitize(VecEnvWrapper):
+    def __init__(self, venv, nan=0.0, posinf=1.0, neginf=-1.0):
+        espaco = venv.observation_space
+        # O que sai daqui é sempre float32, então o espaço também passa a ser
+        super().__init__(venv, observation_space=spaces.Box(
+            low=espaco.low.astype(np.float32), high=espaco.high.astype(np.float32),
+            shape=espaco.shape, dtype=np.float32,
+        ))
+        self.nan, self.posinf, self.neginf = nan, posinf, neginf
+        formato = (self.num_envs, *self.observation_space.shape)
+        self._buf = np.zeros(formato, dtype=np.float32)
+        self._mascara = np.zeros(formato, dtype=bool)
+        self._eixos = tuple(range(1, len(formato)))
+        # Quantos valores não finitos cada ambiente já mandou (acumulado)
+        self.nao_finitos = np.zeros(self.num_envs, dtype=np.int64)
+
+    def _sanitizar(self, obs):
+        if isinstance(obs, np.ndarray) and obs.dtype == np.float32 and obs.flags.writeable:
+            buf = obs
+        else:
+            buf = self._buf
+            np.copyto(buf, obs, casting='unsafe')
+        m = self._mascara
+        np.isfinite(buf, out=m)
+        if m.all():
+            return buf
+        np.logical_not(m, out=m)
+        self.nao_finitos += m.sum(axis=self._eixos)
+        np.isnan(buf, out=m)
+        np.copyto(buf, self.nan, where=m)
+        np.isposinf(buf, out=m)
+        np.copyto(buf, self.posinf, where=m)
+        np.isneginf(buf, out=m)
+        np.copyto(buf, self.neginf, where=m)
+        return buf
+
+    def reset(self):
+        return self._sanitizar(self.venv.reset())
+
+    def step_async(self, actions):
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        obs, rews, dones, infos = self.venv.step_wait()
+        obs = self._sanitizar(obs)
+        # Observação terminal só existe no fim do episódio: pode alocar
+        for i in np.flatnonzero(dones):
+            terminal = infos[i].get('terminal_observation')
+            if terminal is not None:
+                terminal = np.asarray(terminal, dtype=np.float32)
+                ruins = ~np.isfinite(terminal)
+                if ruins.any():
+                    self.nao_finitos[i] += int(ruins.sum())
+                    terminal = np.nan_to_num(terminal, nan=self.nan, posinf=self.posinf, neginf=self.neginf)
+                infos[i]['terminal_observation'] = terminal
+        return obs, rews, dones, infos
+
+
+# === CALLBACK ===
+# Loga no TensorBoard quantos NaN/inf apareceram em cada rollout.
+class NonFiniteCounter(BaseCallback):
+    def __init__(self):
+        super().__init__()
+        self._sanitize = None
+        self._anterior = None
+
+    def _on_training_start(self) -> None:
+        self._sanitize = unwrap_vec_wrapper(self.training_env, VecSanitize)
+        if self._sanitize is not None:
+            self._anterior = self._sanitize.nao_finitos.copy()
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        if self._sanitize is None:
+            return
+        atual = self._sanitize.nao_finitos
+        delta = atual - self._anterior
+        self._anterior = atual.copy()
+        self.logger.record('sanitize/nao_finitos', int(delta.sum()))
+        self.logger.record('sanitize/envs_afetados', int(np.count_nonzero(delta)))
+        self.logger.record('sanitize/max_por_env', int(delta.max()))
@@ -85,4 +85,5 @@ except KeyboardInterrupt:
 
 print("=" * 50)
 print(f"📊 TOTAL DE GOLS PROVADOS: {gols_confirmados}")
-print(f"📁 Verifique a pasta '{video_folder}' para baixar os vídeos (.dump)")
\ No newline at end of file
+print(f"📁 Replays dos gols (.dump) em '{video_folder}'")
+print(f"   Para gerar os vídeos: python3 src/renderizador_replays.py {video_folder}")
\ No newline at end of file
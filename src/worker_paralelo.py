@@ -0,0 +1,220 @@
+from multiprocessing import resource_tracker, shared_memory
+import cloudpickle
+import gymnasium
+import gym
+import numpy as np
+import traceback
+import time
+import sys
+
+# ==============================================================================
+# LADO DO WORKER DO ROLLOUT PARALELO (módulo leve)
+# ==============================================================================
+# Tudo que roda dentro dos processos do SharedMemoryVecEnv (e dos atores do
+# treino_assincrono). Com forkserver/spawn cada worker importa o módulo do
+# _worker: aqui só entram numpy, gym e gymnasium, sem o SB3 (que puxa o torch,
+# ~350 MB por processo). Os ambientes vêm como funções serializadas com o
+# cloudpickle, sem o CloudpickleWrapper do SB3 pelo mesmo motivo.
+
+
+class FabricasSerializadas:
+    # Lista de make_env que atravessa o pickle do multiprocessing (lambdas e
+    # funções locais inclusas)
+    def __init__(self, fabricas):
+        self.fabricas = fabricas
+
+    def __getstate__(self):
+        return cloudpickle.dumps(self.fabricas)
+
+    def __setstate__(self, estado):
+        self.fabricas = cloudpickle.loads(estado)
+
+
+# === CONVERSÃO DE API (gym 0.21 <-> gymnasium) ===
+# Os ambientes do projeto seguem a API antiga do gym (reset -> obs, step -> 4 valores).
+# O SB3 >= 2.0 fala gymnasium, então normalizamos aqui sem depender do shimmy
+# (converter_espaco mora no ambientes.py, junto com o ParaGymnasium).
+def resetar_env(env, seed=None, options=None):
+    if isinstance(env, gymnasium.Env):
+        kwargs = {}
+        if seed is not None:
+            kwargs['seed'] = seed
+        if options:
+            kwargs['options'] = options
+        resultado = env.reset(**kwargs)
+    else:
+        if seed is not None and hasattr(env, 'seed'):
+            env.seed(seed)
+        resultado = env.reset()
+    if isinstance(resultado, tuple) and len(resultado) == 2 and isinstance(resultado[1], dict):
+        return resultado
+    return resultado, {}
+
+
+def passo_env(env, acao):
+    resultado = env.step(acao)
+    if len(resultado) == 5:
+        obs, reward, terminated, truncated, info = resultado
+        info['TimeLimit.truncated'] = truncated and not terminated
+        return obs, reward, terminated or truncated, info
+    return resultado
+
+
+def resolver_atributo(env, nome):
+    # Procura o atributo descendo pela pilha de wrappers (gym, gymnasium e shimmy)
+    atual = env
+    while atual is not None:
+        if nome in dir(atual) or nome in getattr(atual, '__dict__', {}):
+            return getattr(atual, nome)
+        atual = getattr(atual, 'env', None) or getattr(atual, 'gym_env', None)
+    if nome == 'render_mode':
+        return None
+    raise AttributeError(f"Ambiente não tem o atributo '{nome}'")
+
+
+def esta_embrulhado(env, classe):
+    atual = env
+    while atual is not None:
+        if isinstance(atual, classe):
+            return True
+        atual = getattr(atual, 'env', None) or getattr(atual, 'gym_env', None)
+    return False
+
+
+def anexar_shm(nome):
+    # Quem cria o bloco é o processo principal (e só ele faz unlink).
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome, track=False)
+    # Antes do 3.13 o attach registra o nome no resource_tracker. Com fork,
+    # forkserver ou spawn o worker herda o tracker do processo principal: lá o
+    # registro repetido não conta (é um conjunto) e o unlink do principal tira o
+    # nome; desregistrar aqui tirava antes e o tracker imprimia KeyError no close.
+    # Só quando o worker subiu um tracker próprio o registro dele tem que sair
+    # (senão ele avisaria "leaked shared_memory" e apagaria o bloco ao sair).
+    herdado = resource_tracker._resource_tracker._fd is not None
+    shm = shared_memory.SharedMemory(name=nome)
+    if not herdado:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+# === LAYOUT DA MEMÓRIA COMPARTILHADA ===
+# Um único bloco com todos os arrays do passo. Cada campo começa alinhado em
+# 64 bytes (linha de cache) para os workers não disputarem a mesma linha.
+class LayoutCompartilhado:
+    ALINHAMENTO = 64
+
+    def __init__(self, campos):
+        self.campos = []
+        offset = 0
+        for nome, formato, dtype in campos:
+            dtype = np.dtype(dtype)
+            offset = -(-offset // self.ALINHAMENTO) * self.ALINHAMENTO
+            self.campos.append((nome, tuple(formato), dtype.str, offset))
+            offset += int(np.prod(formato)) * dtype.itemsize
+        self.tamanho = max(offset, 1)
+
+    def views(self, buf):
+        return {
+            nome: np.ndarray(formato, dtype=np.dtype(dtype), buffer=buf, offset=offset)
+            for nome, formato, dtype, offset in self.campos
+        }
+
+
+def formato_acao(espaco):
+    if isinstance(espaco, (gym.spaces.Discrete, gymnasium.spaces.Discrete)):
+        return (), np.int64
+    if isinstance(espaco, (gym.spaces.MultiDiscrete, gymnasium.spaces.MultiDiscrete)):
+        return tuple(espaco.nvec.shape), np.int64
+    return tuple(espaco.shape), np.float32
+
+
+# Códigos do array de controle (um int32 por worker)
+CMD_STEP = 1
+CMD_PIPE = 2
+CMD_FECHAR = 3
+
+
+# === WORKER ===
+# O caminho quente (step) não usa pickle: a ação é lida do bloco compartilhado,
+# obs/recompensa/done/infos escalares são escritos nele e o learner é avisado por
+# semáforo. O pipe só carrega os infos de fim de episódio e comandos raros
+# (reset, get_attr, env_method, ...).
+def _worker(remote, parent_remote, fabricas, indices, w, sem_cmd, sem_fim, info_keys):
+    parent_remote.close()
+    envs = [fn() for fn in fabricas.fabricas]
+    # Avisa os espaços e espera o processo principal criar a memória compartilhada
+    remote.send((envs[0].observation_space, envs[0].action_space))
+    shm_nome, layout = remote.recv()
+    shm = anexar_shm(shm_nome)
+    b = layout.views(shm.buf)
+    ctrl, status = b['ctrl'], b['status']
+    obs_buf, acoes, recompensas, dones = b['obs'], b['acoes'], b['recompensas'], b['dones']
+    obs_terminal, info_buf, tempos = b['obs_terminal'], b['info'], b['tempos']
+    try:
+        while True:
+            sem_cmd.acquire()
+            cmd = ctrl[w]
+            if cmd == CMD_STEP:
+                fins = []
+                try:
+                    for i, env in zip(indices, envs):
+                        inicio = time.perf_counter_ns()
+                        acao = acoes[i] if acoes.ndim == 1 else acoes[i].copy()
+                        obs, reward, done, info = passo_env(env, acao)
+                        recompensas[i] = reward
+                        dones[i] = done
+                        for k, chave in enumerate(info_keys):
+                            info_buf[i, k] = info.get(chave, 0.0)
+                        if done:
+                            obs_terminal[i] = obs
+                            obs, reset_info = resetar_env(env)
+                            fins.append((i, info, reset_info))
+                        obs_buf[i] = obs
+                        tempos[i] = time.perf_counter_ns() - inicio
+                    status[w] = 0
+                except Exception:
+                    status[w] = 1
+                    fins = traceback.format_exc()
+                sem_fim.release()
+                # Enviado depois do release: o learner só lê o pipe de quem teve done
+                if fins:
+                    remote.send(fins)
+                continue
+            if cmd == CMD_FECHAR:
+                for env in envs:
+                    env.close()
+                remote.close()
+                break
+            pedido, data = remote.recv()
+            if pedido == 'reset':
+                reset_infos = []
+                for i, env, (seed, options) in zip(indices, envs, data):
+                    obs, reset_info = resetar_env(env, seed, options)
+                    obs_buf[i] = obs
+                    reset_infos.append(reset_info)
+                remote.send(reset_infos)
+            elif pedido == 'get_attr':
+                local, nome = data
+                try:
+                    remote.send((True, [resolver_atributo(envs[j], nome) for j in local]))
+                except AttributeError as e:
+                    remote.send((False, e))
+            elif pedido == 'set_attr':
+                local, nome, valor = data
+                for j in local:
+                    setattr(envs[j], nome, valor)
+                remote.send(None)
+            elif pedido == 'env_method':
+                local, nome, args, kwargs = data
+                remote.send([resolver_atributo(envs[j], nome)(*args, **kwargs) for j in local])
+            elif pedido == 'is_wrapped':
+                local, classe = data
+                remote.send([esta_embrulhado(envs[j], classe) for j in local])
+            else:
+                raise NotImplementedError(f"Comando desconhecido: {pedido}")
+    except KeyboardInterrupt:
+        print("⚠️ Worker interrompido pelo usuário (KeyboardInterrupt).")
+    finally:
+        del b, ctrl, status, obs_buf, acoes, recompensas, dones, obs_terminal, info_buf, tempos
+        shm.close()
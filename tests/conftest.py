@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Os módulos do projeto ficam em src/ e se importam pelo nome (como nos scripts)
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+# Sem o jogo: tudo que chama criar_env sem mock= explícito cai no MockFootballEnv.
+# Antes de qualquer worker subir (o forkserver guarda o ambiente do primeiro uso)
+os.environ.setdefault("GFOOTBALL_MOCK", "1")
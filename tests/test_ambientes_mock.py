@@ -0,0 +1,69 @@
+from functools import partial
+
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import DIM_QUADRO, N_QUADROS, MockFootballEnv, criar_env, monitorar
+from vec_env_paralelo import SharedMemoryVecEnv
+
+
+def env_curto(seed, duracao=20):
+    return monitorar(MockFootballEnv(seed=seed, duracao=duracao))
+
+
+def _pilha_repetida(obs):
+    quadros = np.asarray(obs).reshape(N_QUADROS, DIM_QUADRO)
+    return bool((quadros == quadros[0]).all())
+
+
+def test_criar_env_mock_fala_gymnasium():
+    env = criar_env('5_vs_5', mock=True, seed=0)
+    obs, info = env.reset(seed=0)
+    assert obs.shape == (N_QUADROS * DIM_QUADRO,)
+    obs, reward, terminated, truncated, info = env.step(0)
+    assert obs.shape == (N_QUADROS * DIM_QUADRO,)
+    assert 'score_reward' in info
+    env.close()
+
+
+def test_shared_memory_reset_step_e_reset_automatico():
+    venv = SharedMemoryVecEnv([partial(env_curto, i) for i in range(2)], n_workers=2)
+    try:
+        obs = venv.reset()
+        assert obs.shape == (2, N_QUADROS * DIM_QUADRO)
+        assert all(_pilha_repetida(o) for o in obs)
+        fins = 0
+        for _ in range(25):
+            obs, rews, dones, infos = venv.step(np.zeros(2, dtype=np.int64))
+            assert rews.shape == (2,)
+            for i in np.flatnonzero(dones):
+                fins += 1
+                terminal = infos[i]['terminal_observation']
+                assert terminal.shape == (N_QUADROS * DIM_QUADRO,)
+                assert not _pilha_repetida(terminal)
+                assert 'episode' in infos[i]
+                # O obs do passo já é o do reset automático
+                assert _pilha_repetida(obs[i])
+        assert fins >= 2
+    finally:
+        venv.close()
+
+
+def test_ppo_learn_curto_no_mock():
+    venv = VecNormalize(SharedMemoryVecEnv([partial(env_curto, i) for i in range(2)], n_workers=2),
+                        norm_obs=True, norm_reward=False, clip_obs=10.)
+    try:
+        model = PPO("MlpPolicy", venv, n_steps=32, batch_size=32, n_epochs=1, device="cpu", seed=0)
+        model.learn(total_timesteps=64)
+        assert model.num_timesteps >= 64
+    finally:
+        venv.close()
+
+
+def test_dummy_vec_env_com_criar_env():
+    venv = DummyVecEnv([partial(criar_env, 'academy_empty_goal_close', mock=True, seed=i) for i in range(2)])
+    obs = venv.reset()
+    obs, rews, dones, infos = venv.step(np.zeros(2, dtype=np.int64))
+    assert obs.shape == (2, N_QUADROS * DIM_QUADRO)
+    venv.close()
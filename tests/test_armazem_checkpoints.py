@@ -0,0 +1,41 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from ambientes import MockFootballEnv, monitorar
+from armazem_checkpoints import Armazem, nome_padrao
+
+
+def _salvar_modelo(caminho, seed):
+    env = DummyVecEnv([lambda: monitorar(MockFootballEnv(seed=seed))])
+    PPO("MlpPolicy", env, n_steps=16, batch_size=16, seed=seed, verbose=0).save(str(caminho))
+    env.close()
+
+
+def test_nome_padrao_relativo_a_raiz(tmp_path):
+    modelo = tmp_path / "FASE5" / "models" / "CAMPEAO.zip"
+    assert nome_padrao(str(modelo), str(tmp_path)) == "FASE5/models/CAMPEAO"
+    assert nome_padrao(str(modelo)) == "models/CAMPEAO"
+    # Direto na raiz: a pasta entra no nome (a série do delta)
+    assert nome_padrao(str(tmp_path / "X.zip"), str(tmp_path)) == f"{tmp_path.name}/X"
+
+
+def test_importar_dois_treinos_com_o_mesmo_nome(tmp_path):
+    for i, treino in enumerate(("treino_a", "treino_b")):
+        (tmp_path / treino / "models").mkdir(parents=True)
+        _salvar_modelo(tmp_path / treino / "models" / "CAMPEAO", seed=i)
+    armazem = Armazem(str(tmp_path / "armazem"))
+
+    # Uma raiz só: nomes a partir dela
+    assert len(armazem.importar_pastas([str(tmp_path / "treino_a"), str(tmp_path / "treino_b")])) == 2
+    nomes = armazem.checkpoints()
+    assert nomes[0] == "models/CAMPEAO" and nomes[1].startswith("models/CAMPEAO~")
+    origens = {armazem.abrir(n).manifesto['origem'] for n in nomes}
+    assert len(origens) == 2
+
+    # Reimportar não duplica nem sobrescreve
+    assert armazem.importar_pastas([str(tmp_path / "treino_a"), str(tmp_path / "treino_b")]) == []
+    assert armazem.checkpoints() == nomes
+
+    outro = Armazem(str(tmp_path / "armazem2"))
+    outro.importar_pastas([str(tmp_path)])
+    assert outro.checkpoints() == ["treino_a/models/CAMPEAO", "treino_b/models/CAMPEAO"]
@@ -0,0 +1,44 @@
+import os
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import MockFootballEnv, monitorar
+from avaliacao_assincrona import AsyncEvalCallback
+
+
+def _memorias_compartilhadas():
+    return {nome for nome in os.listdir('/dev/shm') if nome.startswith('psm_')}
+
+
+def _modelo():
+    fabricas = [lambda i=i: monitorar(MockFootballEnv(seed=i)) for i in range(2)]
+    vec_env = VecNormalize(DummyVecEnv(fabricas), norm_obs=True, norm_reward=False, clip_obs=10.)
+    return PPO("MlpPolicy", vec_env, n_steps=64, batch_size=64, n_epochs=1, seed=0, verbose=0), vec_env
+
+
+def test_avaliacao_vira_best_model(tmp_path):
+    model, vec_env = _modelo()
+    avaliacao = AsyncEvalCallback(eval_freq=128, pasta=str(tmp_path), cenario='academy_empty_goal_close',
+                                  n_episodios=2, n_envs=2)
+    model.learn(total_timesteps=256, callback=avaliacao)
+    assert avaliacao._processo.exitcode == 0
+    assert os.path.exists(tmp_path / "best.json")
+    PPO.load(str(tmp_path / "best_model.zip"))
+    VecNormalize.load(str(tmp_path / "vec_normalize.pkl"), vec_env)
+    vec_env.close()
+
+
+def test_fim_sem_esperar_fecha_o_pool_do_avaliador(tmp_path):
+    antes = _memorias_compartilhadas()
+    model, vec_env = _modelo()
+    # Treino longo o bastante para o avaliador subir e começar a jogar; 100 episódios
+    # de 400 passos por ambiente: ainda está jogando quando o treino acaba
+    avaliacao = AsyncEvalCallback(eval_freq=64, pasta=str(tmp_path), cenario='academy_empty_goal_close',
+                                  n_episodios=200, n_envs=2, esperar_no_fim=False)
+    model.learn(total_timesteps=8192, callback=avaliacao)
+    # Saiu sozinho (sem terminate) e levou os workers e a memória compartilhada junto
+    assert avaliacao._processo.exitcode == 0
+    assert _memorias_compartilhadas() <= antes
+    assert os.listdir(tmp_path / "fotos") == []
+    vec_env.close()
@@ -0,0 +1,25 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+import avaliador
+from ambientes import MockFootballEnv, monitorar
+
+
+def test_dificuldades_repetidas_nao_se_sobrescrevem(monkeypatch):
+    por_env = []
+    criar = avaliador.criar_vec_avaliacao
+
+    def criar_e_anotar(*args, dificuldade=None, **kwargs):
+        por_env.extend(dificuldade)
+        return criar(*args, dificuldade=dificuldade, **kwargs)
+
+    monkeypatch.setattr(avaliador, 'criar_vec_avaliacao', criar_e_anotar)
+    venv = DummyVecEnv([lambda: monitorar(MockFootballEnv(duracao=20))])
+    model = PPO("MlpPolicy", venv, n_steps=8, batch_size=8, device="cpu", seed=0)
+    resumos = avaliador.avaliar_dificuldades(model, [0.5, 0.1, 0.5], cenario='academy_empty_goal_close',
+                                             n_episodios=3, n_envs=4, duracao=20)
+    assert list(resumos) == [0.5, 0.1]
+    assert all(r['episodios'] == 3 for r in resumos.values())
+    # A repetida não ganha um grupo de ambientes próprio (que seria jogado e descartado)
+    assert por_env == [0.5, 0.5, 0.1, 0.1]
+    venv.close()
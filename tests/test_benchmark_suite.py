@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import SRC
+
+SUITE = os.path.join(SRC, "benchmark_suite.py")
+
+
+def test_script_principal_nao_importa_torch():
+    # Com forkserver/spawn cada worker reimporta o script principal
+    codigo = "import sys, benchmark_suite; print(sorted(m for m in ('torch', 'stable_baselines3') if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=SRC)
+    r = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, env=env, timeout=120)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip() == "[]"
+
+
+def test_perfil_rapido_gera_o_relatorio(tmp_path):
+    # O mesmo comando do CI, como script (é assim que os workers sobem de verdade)
+    saida = tmp_path / "benchmark.json"
+    env = dict(os.environ, PYTHONPATH=SRC, GFOOTBALL_MOCK="1")
+    r = subprocess.run([sys.executable, SUITE, "--rapido", "--saida", str(saida)], capture_output=True, text=True,
+                       env=env, timeout=600)
+    assert r.returncode == 0, r.stderr
+    relatorio = json.loads(saida.read_text())
+    assert relatorio['status'] == 'completo'
+    assert relatorio['vec_env'] and relatorio['ppo'] and relatorio['inferencia']
+    shm = [x for x in relatorio['vec_env'] if x['backend'] == 'shm']
+    assert shm and all(x['mb_por_env'] is not None and x['mb_base_processo'] > 0 for x in shm)
+    assert not os.path.exists(str(saida) + '.tmp')
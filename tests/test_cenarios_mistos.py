@@ -0,0 +1,24 @@
+import numpy as np
+
+from cenarios_mistos import CENARIOS_ACADEMIA, criar_vec_cenarios_mistos
+
+
+def test_cenarios_mistos_passo_e_troca_no_mock():
+    pesos = {'chute': 0.5, '5v5': 0.5}
+    venv = criar_vec_cenarios_mistos(pesos, CENARIOS_ACADEMIA, n_envs=2, n_workers=2)
+    try:
+        venv.reset()
+        assert sorted(venv.alocacao) == ['5v5', 'chute']
+        venv.definir_pesos({'chute': 1.0})
+        assert venv.alocacao == ['chute', 'chute']
+        cenarios = set()
+        for _ in range(900):
+            obs, rews, dones, infos = venv.step(np.zeros(2, dtype=np.int64))
+            for i in np.flatnonzero(dones):
+                assert 'episode' in infos[i]
+                cenarios.add(infos[i]['cenario'])
+        # O slot do 5v5 termina o episódio ainda no 5v5 e depois passa para o chute
+        assert venv.get_attr('cenario') == ['chute', 'chute']
+        assert cenarios
+    finally:
+        venv.close()
@@ -0,0 +1,44 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.buffers import RolloutBuffer
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.policies import ActorCriticPolicy
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import MockFootballEnv, monitorar
+from checkpoint_assincrono import fotografar
+from instrumentacao import PerfilCallback
+
+
+class SalvarNoMeio(BaseCallback):
+    def __init__(self, caminho):
+        super().__init__()
+        self.caminho = caminho
+        self.salvos = 0
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        # Os dois caminhos de save que rodam durante o learn (AsyncEvalCallback e CheckpointAssincrono)
+        self.model.save(self.caminho)
+        fotografar(self.model, self.model.get_vec_normalize_env())
+        self.salvos += 1
+
+
+def test_save_durante_learn_perfilado(tmp_path):
+    fabricas = [lambda i=i: monitorar(MockFootballEnv(seed=i, duracao=30)) for i in range(2)]
+    vec_env = VecNormalize(DummyVecEnv(fabricas), norm_obs=True, norm_reward=False, clip_obs=10.)
+    model = PPO("MlpPolicy", vec_env, n_steps=64, batch_size=64, n_epochs=1, seed=0, verbose=0)
+    perfil = PerfilCallback(str(tmp_path / "perfil.json"))
+    salvar = SalvarNoMeio(str(tmp_path / "meio"))
+    model.learn(total_timesteps=3 * 64 * 2, callback=[perfil, salvar])
+    assert salvar.salvos == 3
+    etapas = perfil.resumo()['etapas']
+    for nome in ('politica', 'gae', 'treino'):
+        assert etapas[nome]['total_s'] > 0
+    # Nada fica pendurado nas classes nem nas instâncias depois do learn
+    for classe, objeto, atributo in ((PPO, model, 'train'), (ActorCriticPolicy, model.policy, 'forward'),
+                                     (RolloutBuffer, model.rollout_buffer, 'compute_returns_and_advantage')):
+        assert classe.__dict__[atributo].__name__ == atributo
+        assert atributo not in vars(objeto)
+    vec_env.close()
@@ -0,0 +1,21 @@
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecNormalize
+
+from liga_selfplay import LigaAdversarios, LigaCallback, criar_vec_selfplay
+
+
+def test_selfplay_learn_curto_no_mock(tmp_path):
+    liga = LigaAdversarios(str(tmp_path), capacidade=4, n_melhores=1)
+    venv = VecNormalize(criar_vec_selfplay(liga, n_envs=2, n_workers=2), norm_obs=True, norm_reward=False)
+    try:
+        model = PPO("MlpPolicy", venv, n_steps=256, batch_size=64, n_epochs=1, device="cpu", seed=0)
+        liga_cb = LigaCallback(liga, freq_foto=256)
+        liga_cb.init_callback(model)
+        # Primeiro adversário: o próprio agente inicial
+        liga_cb.tirar_foto()
+        model.learn(total_timesteps=1024, callback=liga_cb)
+        assert len(liga) >= 2
+        # Os episódios do mock (400 passos) terminaram contra alguma foto do pool
+        assert sum(l['jogos'] for l in liga.relatorio()) > 0
+    finally:
+        venv.close()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from stable_baselines3 import PPO
+from stable_baselines3.common.logger import configure
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import DIM_QUADRO, N_QUADROS, MockFootballEnv, monitorar
+from metricas import POSSE_DELES, POSSE_NOSSA, EpisodeMetrics
+
+NOSSA, DELES, NINGUEM = POSSE_NOSSA, POSSE_DELES, 94
+
+
+def _obs(donos):
+    # Só o quadro mais novo importa para a posse
+    obs = np.zeros((len(donos), N_QUADROS * DIM_QUADRO), dtype=np.float32)
+    for i, coluna in enumerate(donos):
+        obs[i, (N_QUADROS - 1) * DIM_QUADRO + coluna] = 1.0
+    return obs
+
+
+@pytest.mark.parametrize('normalizado', [False, True])
+def test_gols_resultado_e_posse_por_episodio(normalizado):
+    venv = DummyVecEnv([lambda i=i: monitorar(MockFootballEnv(seed=i)) for i in range(2)])
+    if normalizado:
+        venv = VecNormalize(venv, norm_obs=True, norm_reward=False)
+    model = PPO("MlpPolicy", venv, n_steps=8, batch_size=8, device="cpu")
+    model.set_logger(configure(None, []))
+    metricas = EpisodeMetrics()
+    metricas.init_callback(model)
+    metricas.on_training_start({}, {})
+
+    # (placar, dones, dono da bola) por passo; o ambiente 0 fecha no passo 1, o 1 no passo 2
+    passos = [
+        ([1, 0], [False, False], [NOSSA, DELES]),
+        ([0, -1], [True, False], [NOSSA, NINGUEM]),
+        ([0, 0], [False, True], [DELES, NOSSA]),
+    ]
+    for placar, dones, donos in passos:
+        obs = _obs(donos)
+        if normalizado:
+            venv.old_obs = obs
+            obs = np.full_like(obs, 0.3)  # o new_obs normalizado não diz nada da posse
+        metricas.update_locals({'infos': [{'score_reward': p} for p in placar], 'dones': np.array(dones),
+                                'new_obs': obs})
+        metricas.on_step()
+    metricas.on_rollout_end()
+
+    valores = model.logger.name_to_value
+    assert valores['rollout/goals'] == 1
+    assert valores['jogos/episodios'] == 2
+    assert valores['jogos/gols_pro'] == 0.5 and valores['jogos/gols_contra'] == 0.5
+    assert valores['jogos/vitorias'] == 0.5 and valores['jogos/derrotas'] == 0.5 and valores['jogos/empates'] == 0
+    assert valores['jogos/duracao'] == 2.5
+    # Nossa: 2 (env 0) + 1 (env 1); deles: 1 (env 1). O passo sem dono não entra
+    assert valores['jogos/posse'] == 0.75
+    venv.close()
@@ -0,0 +1,26 @@
+import pytest
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecNormalize
+
+from ambientes import jogadores_controlaveis
+from multiagente import criar_vec_multiagente
+from rollout_compacto import compactar_rollout
+
+
+def test_padrao_sem_o_goleiro():
+    assert jogadores_controlaveis('5_vs_5', mock=True) == 4
+    with pytest.raises(ValueError):
+        criar_vec_multiagente('academy_empty_goal_close', n_envs=1)
+
+
+def test_multiagente_learn_curto_no_mock():
+    venv = VecNormalize(criar_vec_multiagente('5_vs_5', n_envs=2, n_workers=2), norm_obs=True, norm_reward=False)
+    try:
+        assert venv.num_envs == 2 * 4
+        model = PPO("MlpPolicy", venv, n_steps=128, batch_size=128, n_epochs=1, device="cpu", seed=0)
+        # Antes de qualquer reset, como no multiagente.treinar
+        compactar_rollout(model, verbose=0)
+        model.learn(total_timesteps=2 * 128 * 8)
+        assert model.num_timesteps == 2 * 128 * 8
+    finally:
+        venv.close()
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import torch as th
+
+from politica_fundida import PoliticaFundida
+from politica_numpy import arrays_normalizador, empacotar, exportar
+from test_politica_numpy import modelo_aleatorio, observacoes
+
+
+@pytest.mark.parametrize('ativacao', [th.nn.Tanh, th.nn.ReLU])
+def test_mesmas_acoes_e_valores_do_ppo(ativacao):
+    model, vec_env = modelo_aleatorio(ativacao)
+    politica = PoliticaFundida.de_arrays(empacotar(model, arrays_normalizador(vec_env)))
+    obs = observacoes(vec_env)
+    obs_sb3 = vec_env.normalize_obs(obs)
+    acoes, valores = politica.agir(obs)
+    np.testing.assert_array_equal(acoes, model.predict(obs_sb3, deterministic=True)[0])
+    with th.no_grad():
+        esperado = model.policy.predict_values(th.as_tensor(obs_sb3)).numpy()[:, 0]
+    np.testing.assert_allclose(valores, esperado, rtol=1e-4, atol=1e-4)
+    vec_env.close()
+
+
+def test_arquivos_e_npz_dao_a_mesma_politica(tmp_path):
+    model, vec_env = modelo_aleatorio()
+    model.save(str(tmp_path / "modelo.zip"))
+    vec_env.save(str(tmp_path / "vec_normalize.pkl"))
+    de_arquivos = PoliticaFundida.de_arquivos(str(tmp_path / "modelo.zip"), str(tmp_path / "vec_normalize.pkl"))
+    de_npz = PoliticaFundida.de_npz(exportar(str(tmp_path / "modelo.zip"), str(tmp_path / "vec_normalize.pkl"),
+                                             str(tmp_path / "p.npz")))
+    obs = observacoes(vec_env, n=64)
+    np.testing.assert_array_equal(de_arquivos.agir(obs)[0], de_npz.agir(obs)[0])
+    esperado = model.predict(vec_env.normalize_obs(obs), deterministic=True)[0]
+    np.testing.assert_array_equal(de_arquivos.agir(obs)[0], esperado)
+    vec_env.close()
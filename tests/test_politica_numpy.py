@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import torch as th
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import MockFootballEnv, monitorar
+from politica_numpy import PoliticaNumpy, arrays_normalizador, conferir, empacotar, exportar
+
+
+def modelo_aleatorio(ativacao=th.nn.Tanh, seed=0):
+    # Política sem treino e um VecNormalize com média/variância sorteadas (longe de 0/1)
+    fabricas = [lambda: monitorar(MockFootballEnv(seed=seed))]
+    vec_env = VecNormalize(DummyVecEnv(fabricas), norm_obs=True, norm_reward=False, clip_obs=10.)
+    model = PPO("MlpPolicy", vec_env, seed=seed, device="cpu", policy_kwargs=dict(activation_fn=ativacao))
+    rng = np.random.default_rng(seed)
+    dim = vec_env.observation_space.shape[0]
+    vec_env.obs_rms.mean = rng.normal(size=dim)
+    vec_env.obs_rms.var = rng.uniform(0.01, 4.0, size=dim)
+    return model, vec_env
+
+
+def observacoes(vec_env, n=512, seed=1):
+    # Em volta da média, com algumas linhas bem fora da faixa (caem no clip)
+    rng = np.random.default_rng(seed)
+    desvio = np.sqrt(vec_env.obs_rms.var)
+    obs = vec_env.obs_rms.mean + desvio * rng.standard_normal((n, len(desvio)))
+    obs[:16] *= 50
+    return obs.astype(np.float32)
+
+
+@pytest.mark.parametrize('ativacao', [th.nn.Tanh, th.nn.ReLU])
+def test_mesmas_acoes_e_valores_do_ppo(ativacao):
+    model, vec_env = modelo_aleatorio(ativacao)
+    politica = PoliticaNumpy(empacotar(model, arrays_normalizador(vec_env)))
+    obs = observacoes(vec_env)
+    obs_sb3 = vec_env.normalize_obs(obs)
+    np.testing.assert_array_equal(politica.agir(obs), model.predict(obs_sb3, deterministic=True)[0])
+    with th.no_grad():
+        valores = model.policy.predict_values(th.as_tensor(obs_sb3)).numpy()[:, 0]
+    np.testing.assert_allclose(politica.valor(obs), valores, rtol=1e-4, atol=1e-4)
+    vec_env.close()
+
+
+def test_exportar_e_conferir(tmp_path):
+    model, vec_env = modelo_aleatorio()
+    model.save(str(tmp_path / "modelo.zip"))
+    vec_env.save(str(tmp_path / "vec_normalize.pkl"))
+    destino = exportar(str(tmp_path / "modelo.zip"), str(tmp_path / "vec_normalize.pkl"), str(tmp_path / "p.npz"))
+    politica = PoliticaNumpy.carregar(destino)
+    assert politica.meta['normalizado'] and politica.dim_obs == vec_env.observation_space.shape[0]
+    assert conferir(destino, str(tmp_path / "modelo.zip"), str(tmp_path / "vec_normalize.pkl")) == 1.0
+    vec_env.close()
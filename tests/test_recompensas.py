@@ -0,0 +1,82 @@
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from ambientes import DIM_QUADRO, MockFootballEnv, monitorar
+from recompensas import DONO_DIREITA, DONO_ESQUERDA, PasseAoVazio, Transicao, VecRewardShaping
+
+PASSE, PARADO = 11, 0
+SEM_DONO, NOSSO, RIVAL = 0, 1, 2
+
+
+def _quadros(donos):
+    quadro = np.zeros((len(donos), DIM_QUADRO), dtype=np.float32)
+    quadro[:, 94] = np.equal(donos, SEM_DONO)
+    quadro[:, DONO_ESQUERDA] = np.equal(donos, NOSSO)
+    quadro[:, DONO_DIREITA] = np.equal(donos, RIVAL)
+    return quadro
+
+
+def _jogar(termo, acoes, donos, dones=None, dono_inicial=NOSSO):
+    # acoes/donos/dones: (passos, envs). Devolve a recompensa do termo a cada passo
+    passos, n_envs = np.shape(acoes)
+    dones = np.zeros((passos, n_envs), dtype=bool) if dones is None else np.asarray(dones)
+    termo.preparar(n_envs)
+    antes = _quadros(np.full(n_envs, dono_inicial))
+    saida = []
+    for t in range(passos):
+        depois = _quadros(donos[t])
+        saida.append(termo(Transicao(antes, depois, np.asarray(acoes[t]), dones[t], n_esquerda=2)))
+        antes = depois
+    return np.array(saida)
+
+
+def test_passe_ao_vazio_maquina_de_estados():
+    S, N, R = SEM_DONO, NOSSO, RIVAL
+    # Colunas: chegou no companheiro | rival pegou | não saiu do pé | ninguém dominou | done no meio
+    acoes = [[PASSE] * 5] + [[PARADO] * 5] * 5
+    donos = [[S, S, N, S, S],
+             [S, S, N, S, S],
+             [N, R, N, S, R],
+             [N, R, N, S, R],
+             [N, R, N, S, R],
+             [N, R, N, S, R]]
+    dones = np.zeros((6, 5), dtype=bool)
+    dones[1, 4] = True
+    termo = PasseAoVazio(1.0, espera=3)
+    r = _jogar(termo, acoes, donos, dones)
+    esperado = np.zeros((6, 5), dtype=np.float32)
+    esperado[2, 1] = -1   # o rival dominou a bola que estava no ar
+    esperado[4, 3] = -1   # no ar por mais de `espera` passos
+    np.testing.assert_array_equal(r, esperado)
+    # Nada pendente no fim: cada passe teve um desfecho só
+    np.testing.assert_array_equal(termo._pendente, -1)
+
+
+def test_passe_sem_a_bola_nao_conta():
+    r = _jogar(PasseAoVazio(1.0, espera=3), [[PASSE]] + [[PARADO]] * 3, [[RIVAL]] * 4, dono_inicial=RIVAL)
+    np.testing.assert_array_equal(r, 0)
+
+
+def test_segundo_passe_pendente_nao_reinicia_a_contagem():
+    # A bola ainda no pé no passo 2: o segundo passe não zera a espera do primeiro
+    acoes = [[PASSE], [PARADO], [PASSE], [PARADO], [PARADO], [PARADO], [PARADO]]
+    donos = [[NOSSO], [NOSSO], [SEM_DONO], [SEM_DONO], [SEM_DONO], [SEM_DONO], [SEM_DONO]]
+    r = _jogar(PasseAoVazio(1.0, espera=3), acoes, donos)
+    np.testing.assert_array_equal(r[:, 0], [0, 0, 0, 0, -1, 0, 0])
+
+
+def test_etapa_soma_no_motor_e_registra_os_termos():
+    venv = DummyVecEnv([lambda i=i: monitorar(MockFootballEnv(seed=i, duracao=20)) for i in range(2)])
+    etapa = VecRewardShaping(venv, {'posse': 0.5, 'passe_ao_vazio': (0.1, {'espera': 5})},
+                             jogadores=(2, 1))
+    etapa.reset()
+    total = 0.0
+    for _ in range(25):
+        etapa.step_async(np.full(2, PASSE))
+        _, rews, _, _ = etapa.step_wait()
+        total += float(rews.sum())
+    assert etapa.passos == 50
+    assert set(etapa.somas) == {'posse', 'passe_ao_vazio', 'motor'}
+    # O que sai do step é o motor mais a contribuição (já com peso) de cada termo
+    np.testing.assert_allclose(total, sum(etapa.somas.values()), rtol=1e-5, atol=1e-5)
+    etapa.close()
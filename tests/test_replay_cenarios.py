@@ -0,0 +1,49 @@
+from functools import partial
+
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecNormalize
+
+from ambientes import MockFootballEnv, monitorar
+from replay_cenarios import BancoCenarios, ReplayCenarios, VecReplayCenarios, _motor
+from rollout_compacto import compactar_rollout
+from vec_env_paralelo import SharedMemoryVecEnv
+
+
+def env_replay(seed):
+    env = MockFootballEnv(env_name='5_vs_5', seed=seed, duracao=120)
+    return monitorar(ReplayCenarios(env, intervalo=5, recuo=10, horizonte=40))
+
+
+def test_foto_do_motor_sem_argumento():
+    # Como o GetStateWrapper do gfootball: get_state() sem argumento
+    env = ReplayCenarios(MockFootballEnv(seed=0))
+    env.reset()
+    for _ in range(10):
+        env.step(1)
+    motor = _motor(env)
+    estado = motor.get_state()
+    for _ in range(5):
+        env.step(1)
+    assert motor.get_state() != estado
+    motor.set_state(estado)
+    assert motor.get_state() == estado
+
+
+def test_replay_com_rollout_compacto_no_mock():
+    # Episódio de replay começa com 4 quadros diferentes (set_state + passos parados)
+    banco = BancoCenarios(seed=0)
+    fabricas = [partial(env_replay, i) for i in range(4)]
+    venv = VecNormalize(VecReplayCenarios(SharedMemoryVecEnv(fabricas, n_workers=2, copiar_obs=False), banco,
+                                          fracao=0.5), norm_obs=True, norm_reward=False)
+    try:
+        model = PPO("MlpPolicy", venv, n_steps=256, batch_size=256, n_epochs=1, device="cpu", seed=0)
+        buffer = compactar_rollout(model, verbose=0)
+        model.learn(total_timesteps=256 * 4 * 4)
+        assert len(banco.adicionados) > 0
+        assert len(banco.recentes) > 0
+        assert buffer._pilhas and np.any(buffer.pilha_inicial[:, :2] >= 0)
+        # Só os ambientes de replay (os 2 primeiros) começam com a pilha de quadros diferentes
+        assert np.all(buffer.pilha_inicial[:, 2:] < 0)
+    finally:
+        venv.close()
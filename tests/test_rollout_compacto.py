@@ -0,0 +1,66 @@
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import DIM_QUADRO, N_QUADROS, MockFootballEnv, monitorar
+from rollout_compacto import RolloutBufferCompacto, compactar_rollout
+
+
+def _vec_normalize(n_envs=2):
+    fabricas = [lambda i=i: monitorar(MockFootballEnv(seed=i, duracao=30)) for i in range(n_envs)]
+    return VecNormalize(DummyVecEnv(fabricas), norm_obs=True, norm_reward=False, clip_obs=10.)
+
+
+def test_buffer_num_vec_normalize_novo():
+    # Sem nenhum reset ainda o VecNormalize não tem old_obs
+    vec_env = _vec_normalize()
+    assert not hasattr(vec_env, 'old_obs')
+    buffer = RolloutBufferCompacto(16, vec_env.observation_space, vec_env.action_space, n_envs=2,
+                                   obter_env=lambda: vec_env)
+    assert buffer._pendente is None
+    vec_env.close()
+
+
+def test_learn_curto_com_vec_normalize_novo():
+    vec_env = _vec_normalize()
+    model = PPO("MlpPolicy", vec_env, n_steps=1024, batch_size=256, n_epochs=1, seed=0, verbose=0)
+    buffer = compactar_rollout(model, verbose=0)
+    # Três rollouts: fins de episódio (duracao=30), o reset do buffer entre eles e colunas
+    # one-hot que quase não variam (escala do VecNormalize enorme)
+    model.learn(total_timesteps=3 * 1024 * 2)
+    assert model.rollout_buffer is buffer
+    assert model.num_timesteps == 3 * 1024 * 2
+    vec_env.close()
+
+
+def test_pilha_inicial_diferente_volta_igual():
+    # Um episódio que começa com quatro quadros diferentes (como o replay_cenarios)
+    # no meio do rollout: os lotes têm que trazer a mesma observação que entrou
+    buffer_size, n_envs, d = 8, 2, DIM_QUADRO
+    espaco = spaces.Box(-np.inf, np.inf, (N_QUADROS * d,), np.float32)
+    buffer = RolloutBufferCompacto(buffer_size, espaco, spaces.Discrete(19), n_envs=n_envs)
+    rng = np.random.default_rng(0)
+    pilhas = [list(rng.normal(size=(N_QUADROS, d)).astype(np.float32)) for _ in range(n_envs)]
+    entradas = np.zeros((buffer_size, n_envs, N_QUADROS * d), dtype=np.float32)
+    for t in range(buffer_size):
+        inicio = np.zeros(n_envs, dtype=bool)
+        for e in range(n_envs):
+            if (e, t) == (0, 3):
+                pilhas[e] = list(rng.normal(size=(N_QUADROS, d)).astype(np.float32))
+                inicio[e] = True
+            elif (e, t) == (1, 5):
+                pilhas[e] = [rng.normal(size=d).astype(np.float32)] * N_QUADROS
+                inicio[e] = True
+            elif t:
+                pilhas[e] = pilhas[e][1:] + [rng.normal(size=d).astype(np.float32)]
+            entradas[t, e] = np.concatenate(pilhas[e])
+        buffer.add(entradas[t], np.zeros((n_envs, 1)), np.zeros(n_envs), inicio, th.zeros(n_envs),
+                   th.zeros(n_envs))
+    buffer.compute_returns_and_advantage(th.zeros(n_envs), np.zeros(n_envs))
+    next(buffer.get(batch_size=4))
+    assert len(buffer._pilhas) == 1
+    indices = np.arange(buffer_size * n_envs)
+    esperado = entradas.transpose(1, 0, 2).reshape(-1, N_QUADROS * d)
+    np.testing.assert_array_equal(buffer.observacoes(indices), esperado)
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+from ambientes import MockFootballEnv, monitorar
+from politica_fundida import PoliticaFundida
+from servidor_inferencia import ClienteInferencia, ModeloServido, ServidorInferencia
+
+
+def _salvar_modelo(pasta):
+    fabricas = [lambda i=i: monitorar(MockFootballEnv(seed=i, duracao=30)) for i in range(2)]
+    vec_env = VecNormalize(DummyVecEnv(fabricas), norm_obs=True, norm_reward=False, clip_obs=10.)
+    model = PPO("MlpPolicy", vec_env, n_steps=64, batch_size=64, n_epochs=1, seed=0, verbose=0)
+    model.learn(total_timesteps=128)  # só para o normalizador sair do zero
+    model.save(str(pasta / "modelo.zip"))
+    vec_env.save(str(pasta / "vec_normalize.pkl"))
+    vec_env.close()
+    return str(pasta / "modelo.zip"), str(pasta / "vec_normalize.pkl")
+
+
+def _obs(n, dim, seed=0):
+    return np.random.default_rng(seed).uniform(0, 1, (n, dim)).astype(np.float32)
+
+
+def test_lote_com_larguras_diferentes_nao_derruba_o_laco(tmp_path):
+    modelo, normalizador = _salvar_modelo(tmp_path)
+
+    async def rodar():
+        servido = ModeloServido('padrao', modelo, normalizador, janela_s=0.05, lote_max=1024,
+                                executor=ThreadPoolExecutor(max_workers=1))
+        laco = asyncio.create_task(servido.laco())
+        dim = servido.dim_obs
+        # Os dois caem no mesmo lote e o concatenate falha
+        resultados = await asyncio.gather(servido.pedir(_obs(2, dim), True), servido.pedir(_obs(3, dim + 1), True),
+                                          return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in resultados)
+        acoes, _, _ = await asyncio.wait_for(servido.pedir(_obs(4, dim), True), 5)
+        assert not laco.done()
+        laco.cancel()
+        return acoes, dim
+
+    acoes, dim = asyncio.run(rodar())
+    esperado = PoliticaFundida.de_arquivos(modelo, normalizador).agir(_obs(4, dim))[0]
+    np.testing.assert_array_equal(acoes, esperado)
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    modelo, normalizador = _salvar_modelo(tmp_path)
+    caminho_socket = str(tmp_path / "inferencia.sock")
+    servidor = ServidorInferencia({'padrao': (modelo, normalizador)}, caminho_socket=caminho_socket)
+    loop = asyncio.new_event_loop()
+    tarefa = loop.create_task(servidor.rodar())
+
+    def rodar():
+        try:
+            loop.run_until_complete(tarefa)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    yield caminho_socket, PoliticaFundida.de_arquivos(modelo, normalizador)
+    loop.call_soon_threadsafe(tarefa.cancel)
+    thread.join(timeout=10)
+    loop.close()
+
+
+def test_cliente_recebe_erro_e_continua(servidor):
+    caminho_socket, politica = servidor
+    cliente = ClienteInferencia(caminho_socket)
+    dim = cliente.info()['padrao']['dim_obs']
+    with pytest.raises(RuntimeError, match="dimensão"):
+        cliente.agir(_obs(3, dim + 5))
+    obs = _obs(8, dim, seed=1)
+    acoes, valores = cliente.agir(obs)
+    esperado_acoes, esperado_valores = politica.agir(obs)
+    np.testing.assert_array_equal(acoes, esperado_acoes)
+    np.testing.assert_allclose(valores, esperado_valores, rtol=1e-5, atol=1e-5)
+    cliente.close()
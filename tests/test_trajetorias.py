@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from trajetorias import GravadorTrajetorias, LeitorTrajetorias
+
+
+def _gravar(pasta, comprimir, passos=20, n_envs=3):
+    # 7 linhas por chunk: os lotes de 3 ambientes atravessam a borda dos chunks
+    rng = np.random.default_rng(0)
+    obs = rng.normal(size=(passos, n_envs, 5)).astype(np.float32)
+    acoes = rng.integers(0, 19, size=(passos, n_envs))
+    recompensas = rng.normal(size=(passos, n_envs)).astype(np.float32)
+    dones = rng.random((passos, n_envs)) < 0.2
+    gols = rng.integers(-1, 2, size=(passos, n_envs)).astype(np.int8)
+    with GravadorTrajetorias(str(pasta), n_envs, linhas_por_chunk=7, comprimir=comprimir) as gravador:
+        for t in range(passos):
+            gravador.adicionar(obs[t], acoes[t], recompensas[t], dones[t], gol=gols[t])
+    return obs.reshape(-1, 5), acoes.reshape(-1), recompensas.reshape(-1), dones.reshape(-1), gols.reshape(-1)
+
+
+@pytest.mark.parametrize('comprimir', [True, False])
+def test_ida_e_volta_pelos_chunks(tmp_path, comprimir):
+    obs, acoes, recompensas, dones, gols = _gravar(tmp_path, comprimir)
+    leitor = LeitorTrajetorias(str(tmp_path), chunks_em_cache=2)
+    assert len(leitor) == len(obs) == 60
+    assert len(leitor.meta['chunks']) == 9
+    np.testing.assert_array_equal(leitor['obs'][:], obs)
+    np.testing.assert_array_equal(leitor['obs'][5:23], obs[5:23])
+    np.testing.assert_array_equal(leitor['acao'][::4], acoes[::4])
+    np.testing.assert_array_equal(leitor['recompensa'][[59, 0, 13, 14, 13]], recompensas[[59, 0, 13, 14, 13]])
+    np.testing.assert_array_equal(leitor['done'][dones], dones[dones])
+    assert leitor['gol'][-1] == gols[-1]
+    assert leitor['obs'].shape == (60, 5)
+
+
+def test_episodios_e_resumo(tmp_path):
+    _, _, recompensas, dones, gols = _gravar(tmp_path, comprimir=True)
+    leitor = LeitorTrajetorias(str(tmp_path))
+    # Refaz os ids na mão: um id por ambiente no começo, um novo a cada done
+    n_envs = 3
+    atual, proximo = list(range(n_envs)), n_envs
+    ids = []
+    for t in range(len(dones) // n_envs):
+        for e in range(n_envs):
+            ids.append(atual[e])
+        for e in range(n_envs):
+            if dones[t * n_envs + e]:
+                atual[e], proximo = proximo, proximo + 1
+    ids = np.array(ids)
+    np.testing.assert_array_equal(leitor['episodio'][:], ids)
+
+    resumo = leitor.resumo_episodios()
+    fechados = np.unique(ids[dones])
+    np.testing.assert_array_equal(resumo['episodio'], fechados)
+    for j, e in enumerate(fechados):
+        sel = ids == e
+        np.testing.assert_allclose(resumo['retorno'][j], recompensas[sel].sum(), rtol=1e-6)
+        assert resumo['passos'][j] == sel.sum()
+        assert resumo['gols_pro'][j] == (gols[sel] > 0).sum()
+        assert resumo['gols_contra'][j] == (gols[sel] < 0).sum()
+        np.testing.assert_array_equal(leitor.episodio(int(e), ['recompensa'])['recompensa'], recompensas[sel])
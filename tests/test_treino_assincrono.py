@@ -0,0 +1,51 @@
+import multiprocessing as mp
+
+import pytest
+import torch
+
+from treino_assincrono import _ator, _receber, atraso_versoes, vtrace
+
+
+def test_vtrace_tres_passos_na_mao():
+    # rho = (0.5, 2, 1) cortado em 1; o último passo fecha o episódio (desconto 0)
+    log_rhos = torch.log(torch.tensor([[0.5], [2.0], [1.0]]))
+    descontos = torch.tensor([[0.9], [0.9], [0.0]])
+    recompensas = torch.tensor([[1.0], [0.0], [2.0]])
+    valores = torch.tensor([[0.5], [1.0], [1.5]])
+    valor_final = torch.tensor([3.0])
+    vs, vantagens = vtrace(log_rhos, descontos, recompensas, valores, valor_final)
+    # deltas = 0.5*(1 + 0.9*1 - 0.5), 1*(0 + 0.9*1.5 - 1), 1*(2 - 1.5) = 0.7, 0.35, 0.5
+    # vs - V  = 0.7 + 0.9*0.5*0.8, 0.35 + 0.9*1*0.5, 0.5 = 1.06, 0.8, 0.5
+    torch.testing.assert_close(vs, torch.tensor([[1.56], [1.8], [2.0]]))
+    # vantagem = rho_cortado * (r + desconto * vs_seguinte - V)
+    torch.testing.assert_close(vantagens, torch.tensor([[1.06], [0.8], [0.5]]))
+
+
+def test_vtrace_sem_correcao_vira_retorno_de_n_passos():
+    descontos = torch.full((3, 1), 0.5)
+    recompensas = torch.tensor([[1.0], [1.0], [1.0]])
+    valores = torch.zeros(3, 1)
+    vs, _ = vtrace(torch.zeros(3, 1), descontos, recompensas, valores, torch.tensor([8.0]))
+    torch.testing.assert_close(vs[0], torch.tensor([1 + 0.5 + 0.25 + 0.125 * 8.0]))
+
+
+def test_atraso_de_unroll_novo_e_zero():
+    # Publicação inicial: versão 2. Cada atualização publica de novo (+2)
+    assert atraso_versoes(2, 0) == 0
+    for atualizacoes in (1, 5, 40):
+        assert atraso_versoes(2 * (atualizacoes + 1), atualizacoes) == 0
+    assert atraso_versoes(2, 3) == 3
+    assert atraso_versoes(8, 5) == 2
+
+
+def test_ator_morto_nao_trava_o_aprendiz():
+    ctx = mp.get_context('spawn')
+    fila_espacos, fila_config, fila_unrolls, fila_erros = ctx.Queue(), ctx.Queue(), ctx.Queue(), ctx.Queue()
+    versao, parar = ctx.RawValue('q', 0), ctx.Event()
+    # Fábrica inválida: o ator morre antes de mandar os espaços
+    ator = ctx.Process(target=_ator, daemon=True, args=(0, [None], {}, versao, fila_espacos, fila_config,
+                                                         fila_unrolls, fila_erros, parar))
+    ator.start()
+    with pytest.raises(RuntimeError, match="(?s)Erro no ator 0.*TypeError"):
+        _receber(fila_espacos, [ator], fila_erros, espera_s=0.2)
+    ator.join()
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from conftest import SRC
+
+# O resource_tracker é outro processo: o aviso dele só aparece no stderr do interpretador
+ROTEIRO = textwrap.dedent("""
+    from functools import partial
+    import numpy as np
+    from ambientes import criar_env
+    from vec_env_paralelo import SharedMemoryVecEnv
+
+    if __name__ == "__main__":
+        venv = SharedMemoryVecEnv([partial(criar_env, mock=True, seed=i) for i in range(2)], n_workers=2)
+        venv.reset()
+        for _ in range(5):
+            venv.step(np.zeros(2, dtype=np.int64))
+        venv.close()
+        print("fechado")
+""")
+
+
+def test_close_sem_aviso_do_resource_tracker(tmp_path):
+    roteiro = tmp_path / "roteiro.py"
+    roteiro.write_text(ROTEIRO)
+    env = dict(os.environ, PYTHONPATH=SRC)
+    r = subprocess.run([sys.executable, str(roteiro)], capture_output=True, text=True, env=env, timeout=300)
+    assert r.returncode == 0, r.stderr
+    assert "fechado" in r.stdout
+    assert "KeyError" not in r.stderr
+    assert "leaked shared_memory" not in r.stderr